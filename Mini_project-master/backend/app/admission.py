@@ -0,0 +1,254 @@
+import asyncio
+import concurrent.futures
+import logging
+import os
+import time
+
+from app import dataset_store
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------
+# Admission control for heavy endpoints
+# ----------------------------
+# Every heavy request first reserves its estimated peak memory against this
+# worker's budget and takes one of a fixed number of CPU slots. A request that
+# doesn't fit waits (in arrival order) for up to ADMISSION_QUEUE_TIMEOUT_SECONDS;
+# after that, or when too many requests are already waiting, it gets a 429 with
+# Retry-After instead of pushing the worker into the OOM killer. A request
+# estimated above the whole budget could never run and gets a 413.
+#
+# The estimate is the upload size times a per-format expansion factor (how much
+# bigger the parsed DataFrame and the analysis working copies get than the file),
+# or the stored Arrow size times STORED_DATASET_FACTOR for dataset_id requests.
+# State is per process, so the budget is per uvicorn worker. Background job
+# threads reserve from the same budget through admit_from_thread().
+
+_MB = 1024 * 1024
+
+
+def _default_memory_budget_mb() -> int:
+    """Half the machine's memory, shared out between the uvicorn workers."""
+    try:
+        total = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, ValueError, OSError):
+        return 2048
+    workers = max(1, int(os.environ.get("WEB_CONCURRENCY", "1")))
+    return max(256, total // 2 // workers // _MB)
+
+
+# --- Configuration (overridable through the environment) ---
+# A budget of 0 turns the memory check off; 0 CPU slots turns the CPU limit off
+ADMISSION_MEMORY_BUDGET_MB = int(os.environ.get("ADMISSION_MEMORY_BUDGET_MB", str(_default_memory_budget_mb())))
+ADMISSION_CPU_SLOTS = int(os.environ.get("ADMISSION_CPU_SLOTS", str(os.cpu_count() or 1)))
+ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.environ.get("ADMISSION_QUEUE_TIMEOUT_SECONDS", "10"))
+ADMISSION_MAX_WAITING = int(os.environ.get("ADMISSION_MAX_WAITING", "32"))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.environ.get("ADMISSION_RETRY_AFTER_SECONDS", "5"))
+
+# Peak memory per byte of upload while it is parsed and analysed, by file type
+MEMORY_FACTORS = {
+    ".csv": 6,
+    ".json": 8,
+    ".xlsx": 15,   # zip-compressed XML
+    ".xls": 6,
+    ".parquet": 10,  # compressed columns
+    ".feather": 4,
+    ".h5": 3,
+}
+DEFAULT_MEMORY_FACTOR = 8
+STORED_DATASET_FACTOR = 3
+MIN_REQUEST_BYTES = 16 * _MB
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request can't be admitted; retry_after is None when retrying won't help."""
+    def __init__(self, message: str, status_code: int = 429, retry_after: int = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def estimate_upload_bytes(size: int, file_name: str) -> int:
+    """Expected peak memory for parsing and analysing an upload of `size` bytes."""
+    extension = os.path.splitext(file_name or "")[1].lower()
+    return max(MIN_REQUEST_BYTES, int((size or 0) * MEMORY_FACTORS.get(extension, DEFAULT_MEMORY_FACTOR)))
+
+
+def estimate_dataset_bytes(dataset_id: str) -> int:
+    """Expected peak memory for analysing a stored dataset (the minimum for unknown ids)."""
+    try:
+        stored = dataset_store.get_metadata(dataset_id)["bytes"]
+    except (KeyError, ValueError):
+        return MIN_REQUEST_BYTES
+    return max(MIN_REQUEST_BYTES, int(stored * STORED_DATASET_FACTOR))
+
+
+class Ticket:
+    """
+    An admitted request's reservation. release() is idempotent and must run on the
+    event loop, unless the ticket came from admit_from_thread().
+    """
+    def __init__(self, controller: "AdmissionController", nbytes: int, cpu: bool):
+        self._controller = controller
+        self.nbytes = nbytes
+        self._cpu = cpu
+        self._released = False
+        self._loop = None  # set for tickets released from other threads
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            if self._loop is None:
+                self._controller._release(self.nbytes, self._cpu)
+            elif not self._loop.is_closed():
+                self._loop.call_soon_threadsafe(self._controller._release, self.nbytes, self._cpu)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+
+class AdmissionController:
+    def __init__(self, memory_budget_bytes: int, cpu_slots: int, queue_timeout: float,
+                 max_waiting: int, retry_after: int):
+        self.memory_budget = memory_budget_bytes
+        self.cpu_slots = cpu_slots
+        self.queue_timeout = queue_timeout
+        self.max_waiting = max_waiting
+        self.retry_after = retry_after
+        self.reserved_bytes = 0
+        self.busy_slots = 0
+        self._waiters = []  # one asyncio.Event per waiting request, in arrival order
+
+    def _fits(self, nbytes: int) -> bool:
+        memory_ok = not self.memory_budget or self.reserved_bytes + nbytes <= self.memory_budget
+        cpu_ok = not self.cpu_slots or self.busy_slots < self.cpu_slots
+        return memory_ok and cpu_ok
+
+    def _reject(self, route: str, reason: str, message: str, status_code: int = 429):
+        metrics.registry.inc("dap_admission_rejected_total", 1, {"route": route, "reason": reason},
+                             "Requests turned away by admission control.")
+        logger.warning("Rejected %s request (%s): %s", route, reason, message)
+        raise AdmissionRejected(message, status_code=status_code,
+                                retry_after=self.retry_after if status_code == 429 else None)
+
+    async def admit(self, route: str, nbytes: int) -> Ticket:
+        """
+        Waits until the request's memory estimate and a CPU slot are available and
+        returns its Ticket; raises AdmissionRejected when that doesn't happen in time.
+        """
+        if self.memory_budget and nbytes > self.memory_budget:
+            self._reject(route, "too_large",
+                         f"This request needs about {nbytes // _MB} MB, more than the "
+                         f"{self.memory_budget // _MB} MB a worker may use.", status_code=413)
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        if self._waiters or not self._fits(nbytes):
+            await self._wait_turn(route, nbytes, start + self.queue_timeout)
+        else:
+            self._take(nbytes)
+        metrics.registry.observe("dap_admission_wait_seconds", loop.time() - start, {"route": route},
+                                 "Time requests waited for admission.")
+        return Ticket(self, nbytes, bool(self.cpu_slots))
+
+    async def _wait_turn(self, route: str, nbytes: int, deadline: float):
+        """Queues the request; requests are admitted in arrival order, so a big one isn't starved."""
+        if len(self._waiters) >= self.max_waiting:
+            self._reject(route, "queue_full", "Too many requests are waiting; try again shortly.")
+        loop = asyncio.get_running_loop()
+        turn = asyncio.Event()
+        self._waiters.append(turn)
+        try:
+            while not (self._waiters[0] is turn and self._fits(nbytes)):
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    self._reject(route, "timeout", "The server is busy with other large requests; try again shortly.")
+                turn.clear()
+                # Not asyncio.wait_for: it can swallow a cancellation that arrives as the
+                # event is set, which would admit a request nobody releases
+                deadline_handle = loop.call_later(remaining, turn.set)
+                try:
+                    await turn.wait()
+                finally:
+                    deadline_handle.cancel()
+            self._take(nbytes)
+        finally:
+            self._waiters.remove(turn)
+            # Admitted, rejected or cancelled: the next request in line checks again
+            self._wake_next()
+
+    def admit_from_thread(self, loop, route: str, nbytes: int, on_wait=None) -> Ticket:
+        """
+        admit() for worker threads; `loop` is the event loop this controller serves.
+        Blocks until the request is admitted: a full queue or a timed-out wait is
+        retried after retry_after seconds, so a background job waits instead of
+        failing, but a request above the whole budget still raises (413).
+        on_wait() is called about once a second while waiting and may raise to give up.
+        """
+        while True:
+            future = asyncio.run_coroutine_threadsafe(self.admit(route, nbytes), loop)
+            try:
+                while True:
+                    try:
+                        ticket = future.result(timeout=1)
+                        break
+                    except concurrent.futures.TimeoutError:
+                        if on_wait is not None:
+                            on_wait()
+            except AdmissionRejected as e:
+                if e.status_code != 429:
+                    raise
+                retry_at = time.monotonic() + (e.retry_after or 0)
+                while time.monotonic() < retry_at:
+                    if on_wait is not None:
+                        on_wait()
+                    time.sleep(min(1.0, max(0.0, retry_at - time.monotonic())))
+                continue
+            except BaseException:
+                # Given up while queued: the request may still get in, so hand its ticket straight back
+                future.add_done_callback(_release_admitted)
+                raise
+            ticket._loop = loop
+            return ticket
+
+    def _take(self, nbytes: int):
+        self.reserved_bytes += nbytes
+        if self.cpu_slots:
+            self.busy_slots += 1
+
+    def _wake_next(self):
+        if self._waiters:
+            self._waiters[0].set()
+
+    def _release(self, nbytes: int, cpu: bool):
+        self.reserved_bytes -= nbytes
+        if cpu:
+            self.busy_slots -= 1
+        self._wake_next()
+
+    def stats(self) -> dict:
+        return {
+            "memoryBudgetMb": self.memory_budget // _MB,
+            "reservedMb": round(self.reserved_bytes / _MB, 1),
+            "cpuSlots": self.cpu_slots,
+            "busySlots": self.busy_slots,
+            "waiting": len(self._waiters),
+        }
+
+
+def _release_admitted(future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().release()
+
+
+admission_controller = AdmissionController(
+    memory_budget_bytes=ADMISSION_MEMORY_BUDGET_MB * _MB,
+    cpu_slots=ADMISSION_CPU_SLOTS,
+    queue_timeout=ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    max_waiting=ADMISSION_MAX_WAITING,
+    retry_after=ADMISSION_RETRY_AFTER_SECONDS,
+)
@@ -1,77 +1,101 @@
-import pandas as pd
-import io
+import functools
+import logging
 import os
-import traceback
 from dotenv import load_dotenv
-from langchain_groq import ChatGroq
-from langchain_experimental.agents.agent_toolkits import create_pandas_dataframe_agent
-from app.analysis_utils import read_uploaded_file_to_df
+from app import dataset_store
+from app.sandbox import create_sandboxed_tool
+from app.sql_query import create_sql_tool
+from app.metrics import span
+
+# LangChain and the Groq client take about a second to import, so they are only
+# loaded when the first agent is created (or by the startup warm-up in main.py)
+AGENT_IMPORTS = (
+    "langchain_core.callbacks",
+    "langchain_groq",
+    "langchain_experimental.agents.agent_toolkits",
+)
+
+logger = logging.getLogger(__name__)
 
 # Load environment variables
 load_dotenv(dotenv_path="../.env")
 
-# Check if API key is set
-if not os.environ.get("GROQ_API_KEY"):
-    raise EnvironmentError(
-        "GROQ_API_KEY not set or empty. Get a free key at https://console.groq.com and add it to .env"
-    )
+# Run agent-generated code in the sandbox process pool (set AGENT_SANDBOX=0 to run it in-process)
+AGENT_SANDBOX = os.environ.get("AGENT_SANDBOX", "1") != "0"
+# Give the agent a DuckDB SQL tool over the stored dataset (set AGENT_SQL_TOOL=0 to disable)
+AGENT_SQL_TOOL = os.environ.get("AGENT_SQL_TOOL", "1") != "0"
+
+
+class LLMNotConfigured(EnvironmentError):
+    """Raised by create_agent when no LLM API key is configured."""
+
+
+def check_llm_configured():
+    # Checked per agent, not at import, so the analytics endpoints work without a key
+    if not os.environ.get("GROQ_API_KEY"):
+        raise LLMNotConfigured(
+            "GROQ_API_KEY not set or empty. Get a free key at https://console.groq.com and add it to .env"
+        )
 
 def create_agent(file_contents: bytes, file_name: str):
     """
     Creates a Pandas DataFrame Agent using Groq (FREE & FAST).
+    Raises LLMNotConfigured if GROQ_API_KEY is missing.
     """
+    check_llm_configured()
     try:
-        print("=" * 50)
-        print("Step 1: Reading file into DataFrame...")
-        df = read_uploaded_file_to_df(file_contents, file_name)
-        print(f"✓ DataFrame created successfully. Shape: {df.shape}")
-        print(f"Columns: {list(df.columns)}")
-        
-        print("Step 2: Creating LLM (Groq - Free & Super Fast)...")
-        # Groq is MUCH faster than Ollama and great at quantitative analysis
-        llm = ChatGroq(
-            model="llama-3.3-70b-versatile",  # Powerful model for analysis
-            temperature=0,
-            max_tokens=8000
-        )
-        print("✓ LLM created successfully")
-        
-        print("Step 3: Creating Pandas DataFrame Agent...")
-        agent = create_pandas_dataframe_agent(
-            llm,
-            df,
-            verbose=True,
-            allow_dangerous_code=True,
-            handle_parsing_errors=True,
-            max_iterations=10,  # Allow multiple steps for complex analysis
-            max_execution_time=60  # 60 seconds timeout
-        )
-        print("✓ Agent created successfully")
-        print("=" * 50)
-        return agent
+        from langchain_groq import ChatGroq
+        from langchain_experimental.agents.agent_toolkits import create_pandas_dataframe_agent
+
+        with span("agent.create", bytes=len(file_contents)) as attrs:
+            logger.info("Step 1: Reading file into DataFrame...")
+            dataset_id = dataset_store.put_dataset(file_contents, file_name)
+            df = dataset_store.get_dataframe(dataset_id)
+            attrs["rows"] = len(df)
+            logger.info("DataFrame created. Shape: %s, columns: %s", df.shape, list(df.columns))
+
+            logger.info("Step 2: Creating LLM (Groq - Free & Super Fast)...")
+            # Groq is MUCH faster than Ollama and great at quantitative analysis
+            llm = ChatGroq(
+                model="llama-3.3-70b-versatile",  # Powerful model for analysis
+                temperature=0,
+                max_tokens=8000,
+                streaming=True  # Lets stream_agent forward tokens as they arrive
+            )
+
+            logger.info("Step 3: Creating Pandas DataFrame Agent...")
+            agent = create_pandas_dataframe_agent(
+                llm,
+                df,
+                # LangChain's verbose mode prints every step to stdout; only enable it when debugging
+                verbose=logger.isEnabledFor(logging.DEBUG),
+                allow_dangerous_code=True,
+                handle_parsing_errors=True,
+                max_iterations=10,  # Allow multiple steps for complex analysis
+                max_execution_time=60,  # 60 seconds timeout
+                # One SQL query often replaces several rounds of generated pandas code
+                extra_tools=[create_sql_tool(dataset_id)] if AGENT_SQL_TOOL else []
+            )
+
+            if AGENT_SANDBOX:
+                # Swap the in-process REPL for one backed by the sandbox pool,
+                # so generated code can't block or exhaust this worker
+                agent.tools = [create_sandboxed_tool(dataset_id)] + agent.tools[1:]
+                logger.info("Agent code will run in the sandbox pool (dataset %s)", dataset_id)
+            logger.info("Agent created successfully")
+            return agent
         
     except Exception as e:
-        print("=" * 50)
-        print("ERROR CREATING AGENT:")
-        print(f"Error type: {type(e).__name__}")
-        print(f"Error message: {str(e)}")
-        print("\nFull traceback:")
-        traceback.print_exc()
-        print("=" * 50)
+        logger.exception("Error creating agent: %s: %s", type(e).__name__, e)
         return None
 
-def query_agent(agent, user_question: str) -> str:
-    """
-    Asks the agent a question and gets a precise quantitative answer.
-    """
-    if agent is None:
-        return "Error: The AI agent could not be created."
-        
-    try:
-        print(f"\n🤔 Question: {user_question}")
-        
-        # Enhanced prompt specifically for quantitative analysis
-        prompt = f"""You are an expert quantitative data analyst. Analyze the DataFrame and answer this question with PRECISE calculations.
+_SQL_HINT = "- For counts, filters, group-by aggregates and top-N questions, prefer one `sql_query` call over pandas code\n"
+
+
+def _build_prompt(user_question: str) -> str:
+    """Wraps the user's question in the quantitative-analysis instructions."""
+    # Enhanced prompt specifically for quantitative analysis
+    return f"""You are an expert quantitative data analyst. Analyze the DataFrame and answer this question with PRECISE calculations.
 
 Question: {user_question}
 
@@ -82,25 +106,110 @@ Instructions:
 - Format numbers clearly with proper decimals
 - If doing multiple calculations, show each step
 - For aggregations, use .groupby(), .agg(), etc.
-- Verify your calculations are correct
+{_SQL_HINT if AGENT_SQL_TOOL else ""}- Verify your calculations are correct
 
 If asked to create charts or plots, respond: "I can only provide numerical analysis, not visualizations."
 
 Provide the answer with the actual computed values."""
+
+
+def _extract_answer(answer) -> str:
+    if isinstance(answer, dict):
+        return answer.get('output', str(answer))
+    return str(answer)
+
+
+def query_agent(agent, user_question: str) -> str:
+    """
+    Asks the agent a question and gets a precise quantitative answer.
+    """
+    if agent is None:
+        return "Error: The AI agent could not be created."
+        
+    try:
+        logger.info("Question: %s", user_question)
         
-        print("🔄 Processing your question with Groq...")
-        answer = agent.invoke(prompt)
+        with span("agent.query"):
+            answer = agent.invoke(_build_prompt(user_question))
         
         # Extract the answer
-        if isinstance(answer, dict):
-            result = answer.get('output', str(answer))
-        else:
-            result = str(answer)
-        
-        print(f"✅ Answer generated")
-        return result
+        return _extract_answer(answer)
         
     except Exception as e:
-        print(f"❌ Error querying agent: {e}")
-        traceback.print_exc()
-        return f"Sorry, I encountered an error: {e}"
\ No newline at end of file
+        logger.exception("Error querying agent: %s", e)
+        return f"Sorry, I encountered an error: {e}"
+
+
+class AgentCancelled(Exception):
+    """Raised from the streaming callbacks once the client has gone away."""
+
+
+@functools.lru_cache(maxsize=None)
+def _streaming_handler_class():
+    """Builds the callback handler class on first use, so langchain_core is imported lazily."""
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    class _StreamingCallbackHandler(BaseCallbackHandler):
+        """Forwards tokens and agent steps to `emit`, and aborts the run when cancelled."""
+        raise_error = True
+
+        def __init__(self, emit, cancel_event):
+            self.emit = emit
+            self.cancel_event = cancel_event
+
+        def _check_cancelled(self):
+            if self.cancel_event.is_set():
+                raise AgentCancelled("Client disconnected.")
+
+        def on_chat_model_start(self, serialized, messages, **kwargs):
+            self._check_cancelled()
+
+        def on_llm_start(self, serialized, prompts, **kwargs):
+            self._check_cancelled()
+
+        def on_llm_new_token(self, token: str, **kwargs):
+            self._check_cancelled()
+            if token:
+                self.emit({"type": "token", "token": token})
+
+        def on_agent_action(self, action, **kwargs):
+            self._check_cancelled()
+            self.emit({"type": "step", "tool": action.tool, "input": str(action.tool_input)})
+
+        def on_tool_start(self, serialized, input_str, **kwargs):
+            self._check_cancelled()
+
+        def on_tool_end(self, output, **kwargs):
+            self.emit({"type": "observation", "output": str(output)})
+
+    return _StreamingCallbackHandler
+
+
+def stream_agent(agent, user_question: str, emit, cancel_event) -> None:
+    """
+    Runs the agent like `query_agent`, but reports progress through `emit(event)`
+    as it happens: "token", "step" and "observation" events, then exactly one of
+    "final", "error" or "cancelled". Setting `cancel_event` stops the run at the
+    next LLM token or tool call.
+
+    This blocks, so call it from a worker thread, not the event loop.
+    """
+    if agent is None:
+        emit({"type": "error", "detail": "The AI agent could not be created."})
+        return
+
+    handler = _streaming_handler_class()(emit, cancel_event)
+    try:
+        logger.info("Question (streaming): %s", user_question)
+        with span("agent.stream"):
+            answer = agent.invoke(_build_prompt(user_question), config={"callbacks": [handler]})
+        emit({"type": "final", "answer": _extract_answer(answer)})
+    except AgentCancelled:
+        logger.info("Streaming question cancelled by client")
+        emit({"type": "cancelled"})
+    except Exception as e:
+        if cancel_event.is_set():
+            emit({"type": "cancelled"})
+            return
+        logger.exception("Error querying agent: %s", e)
+        emit({"type": "error", "detail": f"Sorry, I encountered an error: {e}"})
@@ -0,0 +1,257 @@
+"""
+Batch pipeline runner: applies one workflow pipeline to many files.
+
+Usage (from the backend/ directory):
+
+    python -m app.batch --pipeline pipeline.json --output out/ data/*.csv more_data/
+
+Directories are expanded to the supported files they contain. The pipeline is
+compiled once, sent once to every worker process, and the files are spread over
+the pool. Each file's final result is written to the output directory as
+Parquet (DataFrame results) or JSON (dict results), and one line per file is
+appended to manifest.ndjson as soon as that file finishes, failures included.
+The exit code is 1 if any file failed.
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from app.core.workflow.workflow import WorkflowExecutor
+
+# --- Configuration (overridable through the environment) ---
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", str(os.cpu_count() or 1)))
+BATCH_OUTPUT_DIR = os.environ.get("BATCH_OUTPUT_DIR", os.path.join(tempfile.gettempdir(), "dap_batch"))
+
+SUPPORTED_EXTENSIONS = (".csv", ".xlsx", ".xls", ".json", ".parquet", ".feather", ".h5")
+MANIFEST_FILE = "manifest.ndjson"
+
+logger = logging.getLogger(__name__)
+
+
+def compile_pipeline(pipeline: dict) -> WorkflowExecutor:
+    """Validates the pipeline graph and instantiates its nodes; raises ValueError if it is invalid."""
+    if not isinstance(pipeline, dict):
+        raise ValueError("Pipeline JSON must be an object with 'nodes' and 'edges'.")
+    executor = WorkflowExecutor(nodes=pipeline.get('nodes', []), edges=pipeline.get('edges', []))
+    if not any(node.node_type == 'load_csv' for node in executor.node_instances.values()):
+        raise ValueError("Batch pipelines need a 'load_csv' node to receive each file.")
+    return executor
+
+
+def collect_inputs(paths: list) -> list:
+    """Expands directories into the supported files they contain (sorted), keeping files as given."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                full_path = os.path.join(path, name)
+                if os.path.isfile(full_path) and os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS:
+                    files.append(full_path)
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            raise ValueError(f"Input not found: {path}")
+    return files
+
+
+def _output_stems(files: list) -> list:
+    """Output names from the input file names, made unique when two inputs share a name."""
+    seen = {}
+    stems = []
+    for path in files:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        count = seen.get(stem, 0)
+        seen[stem] = count + 1
+        stems.append(stem if count == 0 else f"{stem}-{count}")
+    return stems
+
+
+def _write_atomic(path: str, write):
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _write_result(result, output_dir: str, stem: str) -> tuple:
+    """Writes a pipeline result; returns (output file name, row count or None)."""
+    if isinstance(result, pd.DataFrame):
+        import pyarrow.parquet as pq
+        from app.dataset_store import to_arrow_table
+
+        name = f"{stem}.parquet"
+        table = to_arrow_table(result)
+        _write_atomic(os.path.join(output_dir, name), lambda p: pq.write_table(table, p))
+        return name, len(result)
+
+    from fastapi.encoders import jsonable_encoder
+
+    name = f"{stem}.json"
+
+    def write_json(path):
+        with open(path, "w") as f:
+            json.dump(jsonable_encoder(result), f)
+
+    _write_atomic(os.path.join(output_dir, name), write_json)
+    return name, None
+
+
+# ----------------------------
+# Worker process side
+# ----------------------------
+_worker_executor = None
+
+
+def _init_worker(executor: WorkflowExecutor):
+    # The compiled pipeline arrives once per worker, not once per file
+    global _worker_executor
+    _worker_executor = executor
+
+
+def _process_file(path: str, output_dir: str, stem: str, executor: WorkflowExecutor = None) -> dict:
+    """
+    Runs the pipeline (the worker's, unless one is given) over one file.
+    Never raises: failures are reported in the returned manifest entry.
+    """
+    executor = executor or _worker_executor
+    start = time.perf_counter()
+    entry = {"file": path, "status": "succeeded", "output": None, "rows": None, "error": None}
+    try:
+        with open(path, "rb") as f:
+            contents = f.read()
+        result = executor.bind(file_contents=contents, file_name=os.path.basename(path)).execute()
+        entry["output"], entry["rows"] = _write_result(result, output_dir, stem)
+    except Exception as e:
+        entry["status"] = "failed"
+        entry["error"] = f"{type(e).__name__}: {e}"
+    entry["seconds"] = round(time.perf_counter() - start, 3)
+    return entry
+
+
+# ----------------------------
+# Driver
+# ----------------------------
+def run_batch(pipeline, files: list, output_dir: str, workers: int = None, progress=None) -> dict:
+    """
+    Runs the pipeline (JSON dict or compile_pipeline() result) over every file and
+    returns a summary. Entries are appended to <output_dir>/manifest.ndjson as
+    files finish. If given, progress(file, completed, total) is called after each
+    file; it may raise to stop the batch.
+    """
+    executor = pipeline if isinstance(pipeline, WorkflowExecutor) else compile_pipeline(pipeline)
+    os.makedirs(output_dir, exist_ok=True)
+    workers = max(1, min(workers or BATCH_WORKERS, len(files) or 1))
+    stems = _output_stems(files)
+    manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+    counts = {"succeeded": 0, "failed": 0}
+    start = time.perf_counter()
+
+    with open(manifest_path, "a") as manifest:
+        def record(entry, completed):
+            counts[entry["status"]] += 1
+            manifest.write(json.dumps(entry) + "\n")
+            manifest.flush()
+            if entry["status"] == "failed":
+                logger.warning("Batch file failed: %s (%s)", entry["file"], entry["error"])
+            if progress is not None:
+                progress(entry["file"], completed, len(files))
+
+        if workers == 1:
+            for completed, (path, stem) in enumerate(zip(files, stems), 1):
+                record(_process_file(path, output_dir, stem, executor), completed)
+        else:
+            pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(executor,))
+            try:
+                futures = {pool.submit(_process_file, path, output_dir, stem): path
+                           for path, stem in zip(files, stems)}
+                for completed, future in enumerate(as_completed(futures), 1):
+                    try:
+                        entry = future.result()
+                    except Exception as e:
+                        # The worker itself died (e.g. killed by the OS for memory)
+                        entry = {"file": futures[future], "status": "failed", "output": None, "rows": None,
+                                 "error": f"{type(e).__name__}: {e}", "seconds": None}
+                    record(entry, completed)
+            finally:
+                # Also reached when progress() stops the batch: drop the files not started yet
+                pool.shutdown(wait=True, cancel_futures=True)
+
+    return {
+        "outputDir": output_dir,
+        "manifest": manifest_path,
+        "files": len(files),
+        "succeeded": counts["succeeded"],
+        "failed": counts["failed"],
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+
+
+def remove_stale_outputs(max_age: float, root: str = None) -> int:
+    """
+    Deletes finished batch directories under root (BATCH_OUTPUT_DIR) whose results
+    were last written more than max_age seconds ago; returns how many were removed.
+    A directory that still has its inputs/ belongs to a batch that is queued or
+    running (the job deletes them when it ends) and is always kept.
+    """
+    root = root or BATCH_OUTPUT_DIR
+    try:
+        names = os.listdir(root)
+    except FileNotFoundError:
+        return 0
+    removed = 0
+    cutoff = time.time() - max_age
+    for name in names:
+        batch_dir = os.path.join(root, name)
+        if os.path.exists(os.path.join(batch_dir, "inputs")):
+            continue
+        paths = (batch_dir, os.path.join(batch_dir, "results"), os.path.join(batch_dir, "results", MANIFEST_FILE))
+        try:
+            modified = [os.path.getmtime(path) for path in paths if os.path.exists(path)]
+        except OSError:
+            continue  # removed meanwhile
+        if os.path.isdir(batch_dir) and modified and max(modified) < cutoff:
+            shutil.rmtree(batch_dir, ignore_errors=True)
+            removed += 1
+    if removed:
+        logger.info("Removed %d stale batch output directories", removed)
+    return removed
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run a workflow pipeline over many files.")
+    parser.add_argument("inputs", nargs="+", help="Input files and/or directories")
+    parser.add_argument("--pipeline", required=True, help="Pipeline JSON file (same format as /workflow/run/)")
+    parser.add_argument("--output", required=True, help="Output directory for results and manifest.ndjson")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    with open(args.pipeline) as f:
+        pipeline = json.load(f)
+    files = collect_inputs(args.inputs)
+    if not files:
+        print("No input files found.", file=sys.stderr)
+        return 1
+
+    def report(path, completed, total):
+        print(f"[{completed}/{total}] {path}", file=sys.stderr)
+
+    summary = run_batch(pipeline, files, args.output, workers=args.workers, progress=report)
+    print(json.dumps(summary))
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
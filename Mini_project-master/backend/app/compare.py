@@ -0,0 +1,301 @@
+import logging
+import os
+import re
+import time
+
+import numpy as np
+import pandas as pd
+
+from app import dataset_store
+from app.incremental import hash_rows
+from app.metrics import span
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------
+# Dataset comparison
+# ----------------------------
+# Two versions of a dataset are diffed without merging them:
+#   - rows are reduced to 64-bit fingerprints of their shared columns, and the
+#     added / removed rows are the multiset difference of the two fingerprint
+#     counts (hash tables, so linear in the row count)
+#   - with a key, each side's key fingerprints are indexed once; rows whose key
+#     is on both sides but whose fingerprint differs are the changed ones, and
+#     only those rows are compared column by column
+#   - every shared column is profiled on both sides; null-rate changes and the
+#     population stability index (PSI) of its distribution flag the shifts
+# The key is taken from the request or detected: an id-like column that is
+# unique on both sides, else the first unique integer or text column. A key
+# column whose type differs between the sides (int 1 vs text "1") is matched on
+# its text form and flagged in schema.typeChanged.
+
+# --- Configuration (overridable through the environment) ---
+COMPARE_EXAMPLE_ROWS = int(os.environ.get("COMPARE_EXAMPLE_ROWS", "20"))
+COMPARE_TOP_CATEGORIES = int(os.environ.get("COMPARE_TOP_CATEGORIES", "20"))
+COMPARE_PSI_THRESHOLD = float(os.environ.get("COMPARE_PSI_THRESHOLD", "0.2"))
+COMPARE_NULL_RATE_THRESHOLD = float(os.environ.get("COMPARE_NULL_RATE_THRESHOLD", "0.05"))
+
+_PSI_BINS = 10
+_PSI_FLOOR = 1e-4  # keeps empty bins from making the PSI infinite
+_ID_NAME = re.compile(r"(^|[\s_\-])id$|^id[\s_\-]|^id$", re.IGNORECASE)
+
+
+def _schema_drift(base: pd.DataFrame, new: pd.DataFrame) -> dict:
+    base_columns, new_columns = list(base.columns), list(new.columns)
+    common = [c for c in base_columns if c in new.columns]
+    return {
+        "added": [c for c in new_columns if c not in base.columns],
+        "removed": [c for c in base_columns if c not in new.columns],
+        "typeChanged": [
+            {"column": c, "from": str(base[c].dtype), "to": str(new[c].dtype)}
+            for c in common if str(base[c].dtype) != str(new[c].dtype)
+        ],
+        "reordered": common != [c for c in new_columns if c in base.columns],
+    }
+
+
+def _is_unique_key(series: pd.Series) -> bool:
+    return not series.hasnans and series.is_unique
+
+
+def detect_key(base: pd.DataFrame, new: pd.DataFrame, columns: list):
+    """A shared column that identifies rows on both sides, or None."""
+    candidates = [c for c in columns if _ID_NAME.search(str(c))]
+    candidates += [c for c in columns if c not in candidates and (
+        pd.api.types.is_integer_dtype(base[c]) or pd.api.types.is_string_dtype(base[c]))]
+    for column in candidates:
+        if _is_unique_key(base[column]) and _is_unique_key(new[column]):
+            return [column]
+    return None
+
+
+def _examples(df: pd.DataFrame, mask: np.ndarray) -> list:
+    positions = np.flatnonzero(mask)[:COMPARE_EXAMPLE_ROWS]
+    return df.iloc[positions].replace({np.nan: None}).to_dict(orient='records')
+
+
+def _json_value(value):
+    if pd.isna(value):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _hashes(df: pd.DataFrame, columns: list) -> np.ndarray:
+    return hash_rows(df[columns]) if columns else np.zeros(len(df), dtype='uint64')
+
+
+def _extra_occurrences(hashes: np.ndarray, other_counts: pd.Series) -> np.ndarray:
+    """Marks each fingerprint's occurrences beyond the number of times it appears on the other side."""
+    occurrence = pd.Series(hashes).groupby(hashes).cumcount().to_numpy()
+    return occurrence >= other_counts.reindex(hashes, fill_value=0).to_numpy()
+
+
+def _diff_without_key(base_hashes: np.ndarray, new_hashes: np.ndarray) -> dict:
+    """Multiset difference of the row fingerprints."""
+    base_counts = pd.Series(base_hashes).value_counts()
+    new_counts = pd.Series(new_hashes).value_counts()
+    added_mask = _extra_occurrences(new_hashes, base_counts)
+    removed_mask = _extra_occurrences(base_hashes, new_counts)
+    return {
+        "added": int(added_mask.sum()),
+        "removed": int(removed_mask.sum()),
+        "changed": None,
+        "addedMask": added_mask,
+        "removedMask": removed_mask,
+    }
+
+
+def _comparable_keys(base: pd.DataFrame, new: pd.DataFrame, key: list):
+    """Both sides' key columns, as text where their types differ and aren't both numeric."""
+    base_keys, new_keys = base[key].copy(deep=False), new[key].copy(deep=False)
+    for column in key:
+        numeric = all(pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s)
+                      for s in (base[column], new[column]))
+        if str(base[column].dtype) != str(new[column].dtype) and not numeric:
+            base_keys[column] = base[column].astype(str)
+            new_keys[column] = new[column].astype(str)
+    return base_keys, new_keys
+
+
+def _diff_with_key(base: pd.DataFrame, new: pd.DataFrame, key: list, columns: list) -> dict:
+    base_key_values, new_key_values = _comparable_keys(base, new, key)
+    base_keys = pd.Index(hash_rows(base_key_values))
+    new_keys = hash_rows(new_key_values)
+    if not base_keys.is_unique or not pd.Index(new_keys).is_unique:
+        raise ValueError(f"Key {key} does not identify rows uniquely in both datasets.")
+
+    # Position of each new row's key in the base dataset (-1: not there)
+    matches = base_keys.get_indexer(new_keys)
+    # Matched rows share their key, so only the other columns are fingerprinted
+    value_columns = [c for c in columns if c not in key]
+    base_hashes, new_hashes = _hashes(base, value_columns), _hashes(new, value_columns)
+    matched = matches >= 0
+    changed = matched.copy()
+    changed[matched] = base_hashes[matches[matched]] != new_hashes[matched]
+    removed_mask = np.ones(len(base), dtype=bool)
+    removed_mask[matches[matched]] = False
+
+    # Only the changed rows are compared column by column
+    new_positions = np.flatnonzero(changed)
+    base_positions = matches[new_positions]
+    changed_columns = {}
+    column_changes = {}
+    for column in value_columns:
+        differs = (hash_rows(base[[column]].iloc[base_positions]) !=
+                   hash_rows(new[[column]].iloc[new_positions]))
+        if differs.any():
+            changed_columns[column] = int(differs.sum())
+            column_changes[column] = differs
+
+    examples = []
+    for i, (b, n) in enumerate(zip(base_positions[:COMPARE_EXAMPLE_ROWS], new_positions[:COMPARE_EXAMPLE_ROWS])):
+        examples.append({
+            "key": {k: _json_value(new[k].iloc[n]) for k in key},
+            "changes": {
+                column: {"from": _json_value(base[column].iloc[b]), "to": _json_value(new[column].iloc[n])}
+                for column, differs in column_changes.items() if differs[i]
+            },
+        })
+
+    return {
+        "added": int((~matched).sum()),
+        "removed": int(removed_mask.sum()),
+        "changed": int(changed.sum()),
+        "changedColumns": changed_columns,
+        "changedExamples": examples,
+        "addedMask": ~matched,
+        "removedMask": removed_mask,
+    }
+
+
+def _shares(counts: np.ndarray) -> np.ndarray:
+    total = counts.sum()
+    shares = counts / total if total else np.zeros(len(counts))
+    return np.maximum(shares, _PSI_FLOOR)
+
+
+def _psi(base_counts: np.ndarray, new_counts: np.ndarray) -> float:
+    base_shares, new_shares = _shares(base_counts), _shares(new_counts)
+    return float(np.sum((new_shares - base_shares) * np.log(new_shares / base_shares)))
+
+
+def _profile(series: pd.Series) -> dict:
+    rows = len(series)
+    profile = {"nullRate": float(series.isna().mean()) if rows else 0.0, "distinct": int(series.nunique())}
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        values = series.astype('float64')
+        profile.update({
+            "mean": _json_value(values.mean()),
+            "std": _json_value(values.std()),
+            "min": _json_value(values.min()),
+            "max": _json_value(values.max()),
+        })
+    return profile
+
+
+def _distribution_shift(base: pd.Series, new: pd.Series) -> float:
+    """PSI of new against base: base deciles for numbers, base top categories (+ other) otherwise."""
+    numeric = all(pd.api.types.is_numeric_dtype(s) and not pd.api.types.is_bool_dtype(s) for s in (base, new))
+    if numeric:
+        base_values = base.dropna().to_numpy(dtype='float64')
+        new_values = new.dropna().to_numpy(dtype='float64')
+        if not len(base_values) or not len(new_values):
+            return 0.0
+        edges = np.unique(np.quantile(base_values, np.linspace(0, 1, _PSI_BINS + 1)[1:-1]))
+        bins = len(edges) + 1
+        base_counts = np.bincount(np.searchsorted(edges, base_values, side='right'), minlength=bins)
+        new_counts = np.bincount(np.searchsorted(edges, new_values, side='right'), minlength=bins)
+        return _psi(base_counts, new_counts)
+
+    base_freq = base.astype(str).where(base.notna()).value_counts()
+    new_freq = new.astype(str).where(new.notna()).value_counts()
+    top = base_freq.index[:COMPARE_TOP_CATEGORIES]
+    base_top = base_freq.reindex(top, fill_value=0).to_numpy()
+    new_top = new_freq.reindex(top, fill_value=0).to_numpy()
+    base_counts = np.append(base_top, base_freq.sum() - base_top.sum())
+    new_counts = np.append(new_top, new_freq.sum() - new_top.sum())
+    return _psi(base_counts, new_counts)
+
+
+def _column_shifts(base: pd.DataFrame, new: pd.DataFrame, columns: list) -> list:
+    shifts = []
+    for column in columns:
+        base_profile, new_profile = _profile(base[column]), _profile(new[column])
+        null_rate_delta = new_profile["nullRate"] - base_profile["nullRate"]
+        psi = _distribution_shift(base[column], new[column])
+        shifts.append({
+            "column": column,
+            "base": base_profile,
+            "new": new_profile,
+            "nullRateDelta": round(null_rate_delta, 6),
+            "psi": round(psi, 6),
+            "shifted": bool(psi >= COMPARE_PSI_THRESHOLD or abs(null_rate_delta) >= COMPARE_NULL_RATE_THRESHOLD),
+        })
+    return shifts
+
+
+def compare_frames(base: pd.DataFrame, new: pd.DataFrame, key: list = None) -> dict:
+    """
+    Diffs two versions of a dataset: schema drift, added / removed / changed rows
+    (changed needs a key, given or detected) and per-column null-rate and
+    distribution shifts. Raises ValueError for an unknown or non-unique key.
+    """
+    start = time.perf_counter()
+    schema = _schema_drift(base, new)
+    # Columns with a changed type still count as shared; their values hash differently
+    columns = [c for c in base.columns if c in new.columns]
+
+    if key:
+        missing = [k for k in key if k not in columns]
+        if missing:
+            raise ValueError(f"Key columns must exist in both datasets: {missing}.")
+        key_detected = False
+    else:
+        key = detect_key(base, new, columns)
+        key_detected = key is not None
+    for change in schema["typeChanged"]:
+        if key and change["column"] in key:
+            change["key"] = True
+
+    with span("compare.rows", rows=len(base) + len(new)):
+        if key:
+            diff = _diff_with_key(base, new, key, columns)
+        else:
+            diff = _diff_without_key(_hashes(base, columns), _hashes(new, columns))
+
+    with span("compare.columns", columns=len(columns)):
+        column_shifts = _column_shifts(base, new, columns)
+
+    unchanged = len(new) - diff["added"] - (diff["changed"] or 0)
+    return {
+        "schema": schema,
+        "rows": {
+            "base": len(base),
+            "new": len(new),
+            "key": key,
+            "keyDetected": key_detected,
+            "added": diff["added"],
+            "removed": diff["removed"],
+            "changed": diff["changed"],
+            "unchanged": unchanged,
+            "changedColumns": diff.get("changedColumns", {}),
+        },
+        "examples": {
+            "added": _examples(new, diff["addedMask"]),
+            "removed": _examples(base, diff["removedMask"]),
+            "changed": diff.get("changedExamples", []),
+        },
+        "columns": column_shifts,
+        "shiftedColumns": [shift["column"] for shift in column_shifts if shift["shifted"]],
+        "elapsedMs": round((time.perf_counter() - start) * 1000, 3),
+    }
+
+
+def compare_datasets(base_id: str, new_id: str, key: list = None) -> dict:
+    """Diffs two stored datasets (see compare_frames); raises KeyError for unknown ids."""
+    base_meta = dataset_store.get_metadata(base_id)
+    new_meta = dataset_store.get_metadata(new_id)
+    result = compare_frames(dataset_store.get_dataframe(base_id), dataset_store.get_dataframe(new_id), key)
+    result["base"] = {"datasetId": base_id, "fileName": base_meta["fileName"]}
+    result["new"] = {"datasetId": new_id, "fileName": new_meta["fileName"]}
+    return result
@@ -2,12 +2,20 @@
 from .workflow.nodes.load_csv_node import LoadCSVNode
 from .workflow.nodes.clean_data_node import CleanDataNode
 from .workflow.nodes.analyze_data_node import AnalyzeDataNode
+from .workflow.nodes.filter_node import FilterNode
+from .workflow.nodes.select_columns_node import SelectColumnsNode
+from .workflow.nodes.group_by_node import GroupByNode
+from .workflow.nodes.join_node import JoinNode
 
 # --- This is the "phonebook" mapping the string name to the Python class ---
 NODE_REGISTRY = {
     "load_csv": LoadCSVNode,
     "clean_data": CleanDataNode,
     "analyze_data": AnalyzeDataNode,
+    "filter": FilterNode,
+    "select_columns": SelectColumnsNode,
+    "group_by": GroupByNode,
+    "join": JoinNode,
 }
 
 def get_node_class(node_type: str):
@@ -8,9 +8,12 @@ class NodeBase(ABC):
     This acts as a contract, ensuring that every node we create
     has the same foundational structure.
     """
-    def __init__(self, node_id: str, node_type: str):
+    def __init__(self, node_id: str, node_type: str, params: dict = None):
         self.node_id = node_id
         self.node_type = node_type
+        # Node settings from the pipeline JSON ('data.params'); validate them in
+        # __init__ so a bad pipeline fails before any node runs
+        self.params = params or {}
         self.data = None # To store the result after execution
 
     @abstractmethod
@@ -25,4 +28,11 @@ class NodeBase(ABC):
         It must return a pandas DataFrame.
         """
         pass
-    
\ No newline at end of file
+
+    def _column_list(self, key: str) -> list:
+        """Reads a required param holding one column name or a list of them."""
+        value = self.params.get(key)
+        columns = [value] if isinstance(value, str) else value
+        if not columns or not isinstance(columns, list) or not all(isinstance(c, str) for c in columns):
+            raise ValueError(f"[{self.node_id}] '{self.node_type}' node needs '{key}': a column name or a list of them.")
+        return columns
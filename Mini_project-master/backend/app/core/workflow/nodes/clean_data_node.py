@@ -1,9 +1,12 @@
+import logging
 import pandas as pd
 from ..node_base import NodeBase  # <-- THIS LINE IS FIXED (uses '..')
 
+logger = logging.getLogger(__name__)
+
 class CleanDataNode(NodeBase):
-    def __init__(self, node_id: str, node_type: str):
-        super().__init__(node_id, node_type)
+    def __init__(self, node_id: str, node_type: str, params: dict = None):
+        super().__init__(node_id, node_type, params)
 
     def execute(self, inputs: dict) -> pd.DataFrame:
         input_df = inputs.get('input_1')
@@ -11,10 +14,10 @@ class CleanDataNode(NodeBase):
         if input_df is None:
             raise ValueError(f"[{self.node_id}] No input DataFrame provided.")
         
-        print(f"[{self.node_id}] Cleaning data. Shape before: {input_df.shape}")
+        logger.info("[%s] Cleaning data. Shape before: %s", self.node_id, input_df.shape)
         
         self.data = input_df.drop_duplicates()
         
-        print(f"[{self.node_id}] Cleaning data. Shape after: {self.data.shape}")
+        logger.info("[%s] Cleaning data. Shape after: %s", self.node_id, self.data.shape)
         
         return self.data
\ No newline at end of file
@@ -0,0 +1,149 @@
+import ast
+import logging
+import re
+import pandas as pd
+from ..node_base import NodeBase
+
+logger = logging.getLogger(__name__)
+
+# Everything an expression may contain; anything else (attribute access, calls,
+# subscripts, lambdas, '@' variables, ...) is rejected before it is evaluated
+_ALLOWED_NODES = (
+    ast.Expression, ast.Compare, ast.BoolOp, ast.UnaryOp, ast.BinOp, ast.Name, ast.Constant,
+    ast.List, ast.Tuple, ast.Load,
+    ast.And, ast.Or, ast.Not, ast.USub, ast.UAdd, ast.Invert,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.BitAnd, ast.BitOr,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn,
+)
+# The only calls allowed: column.isna() and friends, and column.str.contains('text') and friends
+NULL_METHODS = ("isna", "notna", "isnull", "notnull")
+STR_METHODS = ("contains", "startswith", "endswith")
+
+_BACKTICKED = re.compile(r"`([^`]*)`")
+
+
+def _is_literal(node) -> bool:
+    """A constant, or a list / tuple (or negation) built only from constants."""
+    if isinstance(node, ast.Constant):
+        return True
+    if isinstance(node, (ast.List, ast.Tuple)):
+        return all(_is_literal(element) for element in node.elts)
+    if isinstance(node, ast.UnaryOp):
+        return _is_literal(node.operand)
+    return False
+
+
+def _is_sequence(node) -> bool:
+    return isinstance(node, (ast.List, ast.Tuple)) or (
+        isinstance(node, ast.Constant) and isinstance(node.value, (str, bytes)))
+
+
+def _parse_expression(node_id: str, expression: str):
+    """
+    Parses a filter expression and checks it only compares columns and constants.
+    Returns the column names it references and those it multiplies (which must be
+    numeric, since 'text' * n repeats the text). Raises ValueError otherwise.
+    """
+    # `column name` is pandas syntax for names with spaces; swap in plain placeholders to parse it
+    quoted = {}
+
+    def placeholder(match):
+        name = f"_column_{len(quoted)}"
+        quoted[name] = match.group(1)
+        return name
+
+    try:
+        tree = ast.parse(_BACKTICKED.sub(placeholder, expression), mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"[{node_id}] Invalid filter expression '{expression}': {e.msg}")
+
+    def reject(what):
+        raise ValueError(f"[{node_id}] Filter expressions may only compare columns and constants; "
+                         f"{what} is not allowed in '{expression}'.")
+
+    columns = set()
+    multiplied = set()
+
+    def column(node):
+        if not isinstance(node, ast.Name) or node.id.startswith('__'):
+            reject("this method call")
+        columns.add(quoted.get(node.id, node.id))
+
+    def check(node):
+        if isinstance(node, ast.Call):
+            # column.isna() / column.str.contains('x', case=False)
+            func = node.func
+            if isinstance(func, ast.Attribute) and func.attr in NULL_METHODS and not node.args and not node.keywords:
+                column(func.value)
+                return
+            if (isinstance(func, ast.Attribute) and func.attr in STR_METHODS
+                    and isinstance(func.value, ast.Attribute) and func.value.attr == 'str'
+                    and all(isinstance(arg, ast.Constant) for arg in node.args)
+                    and all(isinstance(kw.value, ast.Constant) and kw.arg for kw in node.keywords)):
+                column(func.value.value)
+                return
+            reject("this method call")
+        if not isinstance(node, _ALLOWED_NODES):
+            reject(f"'{type(node).__name__}'")
+        if isinstance(node, ast.BinOp):
+            # 'x' * 10**9 or [0] * 10**9 would build a huge value before any row is compared
+            if _is_literal(node.left) and _is_literal(node.right):
+                reject("arithmetic on constants only")
+            if isinstance(node.op, ast.Mult):
+                if _is_sequence(node.left) or _is_sequence(node.right):
+                    reject("repeating text or lists")
+                multiplied.update(quoted.get(operand.id, operand.id) for operand in (node.left, node.right)
+                                  if isinstance(operand, ast.Name))
+        if isinstance(node, ast.Name):
+            if node.id.startswith('__'):
+                reject(f"the name '{node.id}'")
+            columns.add(quoted.get(node.id, node.id))
+        for child in ast.iter_child_nodes(node):
+            check(child)
+
+    check(tree)
+    return columns, multiplied
+
+
+class FilterNode(NodeBase):
+    """
+    Keeps the rows matching a boolean expression over the columns, e.g.
+    params = {"expression": "amount > 100 and region == 'EU'"}.
+    Column names with spaces go in backticks: "`unit price` < 5".
+    Expressions may use comparisons, 'and'/'or'/'not', arithmetic, 'in' lists,
+    column.isna() / column.notna() and column.str.contains / startswith / endswith
+    with constant arguments; nothing else is accepted.
+    The expression is evaluated column-wise (with numexpr when it is installed).
+    """
+    def __init__(self, node_id: str, node_type: str, params: dict = None):
+        super().__init__(node_id, node_type, params)
+        expression = self.params.get('expression')
+        if not isinstance(expression, str) or not expression.strip():
+            raise ValueError(f"[{node_id}] Filter node needs a non-empty 'expression' param.")
+        self.columns, self.multiplied = _parse_expression(node_id, expression)
+        self.expression = expression
+
+    def execute(self, inputs: dict) -> pd.DataFrame:
+        input_df = inputs.get('input_1')
+
+        if input_df is None:
+            raise ValueError(f"[{self.node_id}] No input DataFrame provided.")
+        # Every name must be a column, so nothing else can be looked up during evaluation
+        unknown = sorted(c for c in self.columns if c not in input_df.columns)
+        if unknown:
+            raise ValueError(f"[{self.node_id}] Filter expression references unknown columns: {unknown}.")
+        not_numeric = sorted(c for c in self.multiplied
+                             if not pd.api.types.is_numeric_dtype(input_df[c]) or pd.api.types.is_bool_dtype(input_df[c]))
+        if not_numeric:
+            raise ValueError(f"[{self.node_id}] Filter expression multiplies non-numeric columns: {not_numeric}.")
+
+        try:
+            mask = input_df.eval(self.expression)
+        except Exception as e:
+            raise ValueError(f"[{self.node_id}] Invalid filter expression '{self.expression}': {e}")
+        if not isinstance(mask, pd.Series) or not pd.api.types.is_bool_dtype(mask):
+            raise ValueError(f"[{self.node_id}] Filter expression '{self.expression}' must evaluate to true/false per row.")
+
+        self.data = input_df[mask.fillna(False).to_numpy(dtype=bool)]
+        logger.info("[%s] Filter kept %d of %d rows", self.node_id, len(self.data), len(input_df))
+        return self.data
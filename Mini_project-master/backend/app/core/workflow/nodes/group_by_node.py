@@ -0,0 +1,53 @@
+import logging
+import pandas as pd
+from ..node_base import NodeBase
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_AGGREGATIONS = ("sum", "mean", "median", "min", "max", "count", "nunique", "std", "first", "last")
+
+class GroupByNode(NodeBase):
+    """
+    Groups rows by one or more columns and aggregates others, e.g.
+    params = {"by": ["region"], "aggregations": {"amount": ["sum", "mean"], "id": "count"}}.
+    Output columns are named "<column>_<aggregation>". Without aggregations the
+    node returns the row count of each group as "count".
+    """
+    def __init__(self, node_id: str, node_type: str, params: dict = None):
+        super().__init__(node_id, node_type, params)
+        self.by = self._column_list('by')
+        self.sort = bool(self.params.get('sort', True))
+
+        aggregations = self.params.get('aggregations') or {}
+        if not isinstance(aggregations, dict):
+            raise ValueError(f"[{node_id}] 'aggregations' must map columns to an aggregation or a list of them.")
+        # Named aggregation: output name -> (column, function)
+        self.named = {}
+        for column, funcs in aggregations.items():
+            for func in [funcs] if isinstance(funcs, str) else list(funcs):
+                if func not in SUPPORTED_AGGREGATIONS:
+                    raise ValueError(
+                        f"[{node_id}] Unsupported aggregation '{func}'. Use any of: {', '.join(SUPPORTED_AGGREGATIONS)}."
+                    )
+                self.named[f"{column}_{func}"] = (column, func)
+
+    def execute(self, inputs: dict) -> pd.DataFrame:
+        input_df = inputs.get('input_1')
+
+        if input_df is None:
+            raise ValueError(f"[{self.node_id}] No input DataFrame provided.")
+
+        needed = self.by + [column for column, _ in self.named.values()]
+        missing = [c for c in dict.fromkeys(needed) if c not in input_df.columns]
+        if missing:
+            raise ValueError(f"[{self.node_id}] Columns not found: {missing}.")
+
+        # One hash-grouping pass computes every aggregation
+        grouped = input_df.groupby(self.by, sort=self.sort, dropna=False, observed=True)
+        if self.named:
+            self.data = grouped.agg(**self.named).reset_index()
+        else:
+            self.data = grouped.size().reset_index(name='count')
+
+        logger.info("[%s] Grouped %d rows into %d groups", self.node_id, len(input_df), len(self.data))
+        return self.data
@@ -0,0 +1,121 @@
+import logging
+import os
+import pandas as pd
+from ..node_base import NodeBase
+
+logger = logging.getLogger(__name__)
+
+# Both inputs must have at least this many rows before 'auto' considers a sort-merge join
+JOIN_SORT_MERGE_MIN_ROWS = int(os.environ.get("JOIN_SORT_MERGE_MIN_ROWS", "100000"))
+
+JOIN_TYPES = ("inner", "left", "right", "outer")
+STRATEGIES = ("auto", "hash", "sort_merge")
+
+
+def _has_repeats(sorted_keys: pd.Series) -> bool:
+    """Whether a sorted key column repeats a value (neighbouring equal values)."""
+    values = sorted_keys.to_numpy()
+    return bool((values[1:] == values[:-1]).any())
+
+
+class JoinNode(NodeBase):
+    """
+    Joins two inputs: the left one on handle 'input_1' and the right one on 'input_2'.
+    params = {"on": "customer_id", "how": "inner"} or {"left_on": [...], "right_on": [...]},
+    plus optional "suffixes" (default ["_x", "_y"]) and "strategy":
+
+    - "hash": pandas' hash join (factorizes the keys of both sides).
+    - "sort_merge": merges the inputs along a single sorted key (sorting them
+      first if needed) without a hash table; output rows follow key order.
+    - "auto" (default): sort-merge when both inputs are large, already sorted on
+      a single numeric or datetime key and repeat keys on both sides (many-to-many),
+      hash join otherwise. pandas' hash join already benefits from sorted unique
+      keys, so that is the only case where skipping the hash table measures faster.
+    """
+    def __init__(self, node_id: str, node_type: str, params: dict = None):
+        super().__init__(node_id, node_type, params)
+        if 'on' in self.params:
+            self.left_on = self.right_on = self._column_list('on')
+        elif 'left_on' in self.params and 'right_on' in self.params:
+            self.left_on = self._column_list('left_on')
+            self.right_on = self._column_list('right_on')
+            if len(self.left_on) != len(self.right_on):
+                raise ValueError(f"[{node_id}] 'left_on' and 'right_on' must have the same number of columns.")
+        else:
+            raise ValueError(f"[{node_id}] Join node needs 'on', or both 'left_on' and 'right_on'.")
+
+        self.how = self.params.get('how', 'inner')
+        if self.how not in JOIN_TYPES:
+            raise ValueError(f"[{node_id}] Unknown join type '{self.how}'. Use one of: {', '.join(JOIN_TYPES)}.")
+        self.strategy = self.params.get('strategy', 'auto')
+        if self.strategy not in STRATEGIES:
+            raise ValueError(f"[{node_id}] Unknown join strategy '{self.strategy}'. Use one of: {', '.join(STRATEGIES)}.")
+        self.suffixes = tuple(self.params.get('suffixes', ("_x", "_y")))
+        if len(self.suffixes) != 2:
+            raise ValueError(f"[{node_id}] 'suffixes' must hold two strings.")
+        self.used_strategy = None
+
+    def _sort_merge_key(self, left: pd.DataFrame, right: pd.DataFrame):
+        """The single join key if it supports a sort-merge join, else None."""
+        if self.left_on != self.right_on or len(self.left_on) != 1:
+            return None
+        key = self.left_on[0]
+        for side in (left[key], right[key]):
+            if not (pd.api.types.is_numeric_dtype(side) or pd.api.types.is_datetime64_any_dtype(side)):
+                return None
+            if pd.api.types.is_bool_dtype(side) or side.hasnans:
+                return None
+        return key
+
+    def _choose_strategy(self, left: pd.DataFrame, right: pd.DataFrame, key) -> str:
+        if self.strategy != 'auto':
+            return self.strategy
+        if key is None or min(len(left), len(right)) < JOIN_SORT_MERGE_MIN_ROWS:
+            # Small or lopsided inputs: hashing the keys is cheaper than any sort
+            return 'hash'
+        if not (left[key].is_monotonic_increasing and right[key].is_monotonic_increasing):
+            return 'hash'
+        return 'sort_merge' if _has_repeats(left[key]) and _has_repeats(right[key]) else 'hash'
+
+    def _sort_merge(self, left: pd.DataFrame, right: pd.DataFrame, key: str) -> pd.DataFrame:
+        if not left[key].is_monotonic_increasing:
+            left = left.sort_values(key, kind='stable')
+        if not right[key].is_monotonic_increasing:
+            right = right.sort_values(key, kind='stable')
+        # Joining two monotonic indexes walks both in step, without a hash table
+        lsuffix, rsuffix = self.suffixes
+        joined = left.set_index(key).join(right.set_index(key), how=self.how,
+                                          lsuffix=lsuffix, rsuffix=rsuffix).reset_index()
+        # Same column order as pd.merge: left columns (key in place), then the right ones
+        overlap = set(left.columns) & set(right.columns) - {key}
+        columns = [c if c not in overlap else f"{c}{lsuffix}" for c in left.columns]
+        columns += [c if c not in overlap else f"{c}{rsuffix}" for c in right.columns if c != key]
+        return joined[columns]
+
+    def execute(self, inputs: dict) -> pd.DataFrame:
+        left = inputs.get('input_1')
+        right = inputs.get('input_2')
+
+        if left is None or right is None:
+            raise ValueError(f"[{self.node_id}] Join node needs inputs on both 'input_1' (left) and 'input_2' (right).")
+        missing = [c for c in self.left_on if c not in left.columns] + [c for c in self.right_on if c not in right.columns]
+        if missing:
+            raise ValueError(f"[{self.node_id}] Join columns not found: {missing}.")
+
+        key = self._sort_merge_key(left, right)
+        strategy = self._choose_strategy(left, right, key)
+        if strategy == 'sort_merge' and key is None:
+            raise ValueError(
+                f"[{self.node_id}] Sort-merge joins need a single 'on' column that is numeric or datetime and has no nulls."
+            )
+
+        if strategy == 'sort_merge':
+            self.data = self._sort_merge(left, right, key)
+        else:
+            self.data = pd.merge(left, right, how=self.how, left_on=self.left_on, right_on=self.right_on,
+                                 suffixes=self.suffixes, sort=False)
+        self.used_strategy = strategy
+
+        logger.info("[%s] %s join (%s) of %d x %d rows -> %d rows", self.node_id, self.how, strategy,
+                    len(left), len(right), len(self.data))
+        return self.data
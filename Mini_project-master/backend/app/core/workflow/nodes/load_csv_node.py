@@ -1,23 +1,34 @@
+import logging
 import pandas as pd
 import io
 from ..node_base import NodeBase
 from app.analysis_utils import read_uploaded_file_to_df # <-- 1. IMPORT NEW HELPER
+from app import dataset_store
+
+logger = logging.getLogger(__name__)
 
 class LoadCSVNode(NodeBase):
-    def __init__(self, node_id: str, node_type: str):
-        super().__init__(node_id, node_type)
+    def __init__(self, node_id: str, node_type: str, params: dict = None):
+        super().__init__(node_id, node_type, params)
 
     def execute(self, inputs: dict) -> pd.DataFrame:
         """
-        Reads the user's uploaded file contents into a pandas DataFrame.
+        Reads the user's uploaded file contents into a pandas DataFrame,
+        or attaches to an already stored dataset when a 'dataset_id' is given.
         """
+        dataset_id = inputs.get('dataset_id')
+        if dataset_id is not None:
+            logger.info("[%s] Attaching stored dataset: %s...", self.node_id, dataset_id)
+            self.data = dataset_store.get_dataframe(dataset_id)
+            return self.data
+
         file_contents = inputs.get('file_contents')
         file_name = inputs.get('file_name') # <-- 2. GET THE FILENAME
         
         if file_contents is None or file_name is None:
             raise ValueError(f"[{self.node_id}] No file contents or filename provided for Load node.")
         
-        print(f"[{self.node_id}] Loading data from user-uploaded file: {file_name}...")
+        logger.info("[%s] Loading data from user-uploaded file: %s...", self.node_id, file_name)
         
         # --- 3. THIS IS THE CHANGE ---
         self.data = read_uploaded_file_to_df(file_contents, file_name)
@@ -0,0 +1,32 @@
+import logging
+import pandas as pd
+from ..node_base import NodeBase
+
+logger = logging.getLogger(__name__)
+
+class SelectColumnsNode(NodeBase):
+    """
+    Keeps (and orders) the given columns, optionally renaming them:
+    params = {"columns": ["region", "amount"], "rename": {"amount": "revenue"}}.
+    """
+    def __init__(self, node_id: str, node_type: str, params: dict = None):
+        super().__init__(node_id, node_type, params)
+        self.columns = self._column_list('columns')
+        self.rename = self.params.get('rename') or {}
+        if not isinstance(self.rename, dict):
+            raise ValueError(f"[{node_id}] 'rename' must map old column names to new ones.")
+
+    def execute(self, inputs: dict) -> pd.DataFrame:
+        input_df = inputs.get('input_1')
+
+        if input_df is None:
+            raise ValueError(f"[{self.node_id}] No input DataFrame provided.")
+
+        missing = [c for c in self.columns if c not in input_df.columns]
+        if missing:
+            raise ValueError(f"[{self.node_id}] Columns not found: {missing}.")
+
+        self.data = input_df[self.columns]
+        if self.rename:
+            self.data = self.data.rename(columns=self.rename)
+        return self.data
@@ -1,19 +1,30 @@
-import networkx as nx
+import copy
 import pandas as pd
 from ..registry import get_node_class  # Import from parent 'core' directory (go up one level with ..)
 from fastapi.encoders import jsonable_encoder
 import json
+import logging
+from app.metrics import span
+
+logger = logging.getLogger(__name__)
 
 class WorkflowExecutor:
-    def __init__(self, nodes: list, edges: list, file_contents: bytes, file_name: str): # <-- 1. ADD file_name
+    def __init__(self, nodes: list, edges: list, file_contents: bytes = None, file_name: str = None, dataset_id: str = None): # <-- 1. ADD file_name
+        # Validation, node instantiation and ordering happen once here; bind()
+        # reuses them to run the same pipeline over other inputs
         self.graph = self._build_graph(nodes, edges)
+        self.nodes = nodes
         self.node_instances = self._instantiate_nodes(nodes)
+        self.execution_order = self._execution_order()
         self.file_contents = file_contents
         self.file_name = file_name # <-- 2. STORE file_name
+        self.dataset_id = dataset_id # Already stored dataset; takes precedence over file_contents
         self.execution_results = {}
 
     # ... (Your _build_graph and _instantiate_nodes functions are unchanged) ...
-    def _build_graph(self, nodes: list, edges: list) -> nx.DiGraph:
+    def _build_graph(self, nodes: list, edges: list):
+        import networkx as nx  # Imported on first use to keep API startup fast
+
         graph = nx.DiGraph()
         for node in nodes:
             graph.add_node(node['id'], **node)
@@ -34,22 +45,71 @@ class WorkflowExecutor:
             if not node_type:
                  raise ValueError(f"Node {node_id} is missing 'node_type' in 'data' field.")
             
+            params = node_data.get('data', {}).get('params') or {}
+            if not isinstance(params, dict):
+                raise ValueError(f"Node {node_id} has invalid 'params'; expected an object.")
+
             node_class = get_node_class(node_type)
-            instances[node_id] = node_class(node_id=node_id, node_type=node_type)
+            instances[node_id] = node_class(node_id=node_id, node_type=node_type, params=params)
         return instances
 
 
-    def run(self) -> str:
+    def _execution_order(self) -> list:
+        import networkx as nx
+
         execution_order = list(nx.topological_sort(self.graph))
+        if not execution_order:
+            raise ValueError("Workflow has no nodes.")
+        return execution_order
+
+    def bind(self, file_contents: bytes = None, file_name: str = None, dataset_id: str = None) -> "WorkflowExecutor":
+        """
+        Returns a copy of this compiled pipeline that runs over another input. The
+        graph and order are shared; the nodes are rebuilt (from a copy of their
+        params), since a node keeps its output in self.data while it runs.
+        """
+        bound = copy.copy(self)
+        bound.node_instances = self._instantiate_nodes(copy.deepcopy(self.nodes))
+        bound.file_contents = file_contents
+        bound.file_name = file_name
+        bound.dataset_id = dataset_id
+        bound.execution_results = {}
+        return bound
+
+    def run(self, progress=None) -> str:
+        """
+        Executes the nodes in topological order and returns the final node's result as JSON.
+        If given, progress(node_id, completed, total) is called before each node;
+        it may raise to abort the run early.
+        """
+        final_result = self.execute(progress)
+
+        if isinstance(final_result, dict):
+            encoded_result = jsonable_encoder(final_result)
+            return json.dumps(encoded_result)
+
+        if isinstance(final_result, pd.DataFrame):
+            return final_result.to_json(orient='records')
+        
+        logger.warning("Final result is an unknown type: %s", type(final_result))
+        return json.dumps(jsonable_encoder(final_result))
+
+    def execute(self, progress=None):
+        """Like run(), but returns the final node's result as is (a DataFrame or a dict)."""
+        execution_order = self.execution_order
         
-        print(f"Execution order: {execution_order}")
+        logger.info("Execution order: %s", execution_order)
 
-        for node_id in execution_order:
+        for index, node_id in enumerate(execution_order):
+            if progress is not None:
+                progress(node_id, index, len(execution_order))
             node_instance = self.node_instances[node_id]
             inputs_for_this_node = {}
 
             if node_instance.node_type == 'load_csv':
-                if self.file_contents is None:
+                if self.dataset_id is not None:
+                    inputs_for_this_node['dataset_id'] = self.dataset_id
+                elif self.file_contents is None:
                     raise ValueError("Workflow started but no file was provided.")
                 inputs_for_this_node['file_contents'] = self.file_contents
                 inputs_for_this_node['file_name'] = self.file_name # <-- 3. PASS file_name
@@ -65,21 +125,15 @@ class WorkflowExecutor:
                     input_handle_id = 'input_1' if target_handle == 'input' else target_handle
                     inputs_for_this_node[input_handle_id] = parent_result
 
-            print(f"--- Executing Node: {node_instance.node_type} ({node_id}) ---")
-            result = node_instance.execute(inputs_for_this_node)
+            logger.info("Executing node: %s (%s)", node_instance.node_type, node_id)
+            with span(f"workflow.{node_instance.node_type}", node_id=node_id) as attrs:
+                result = node_instance.execute(inputs_for_this_node)
+                if isinstance(result, pd.DataFrame):
+                    attrs["rows"] = len(result)
             
             self.execution_results[node_id] = result
 
-        final_result = self.execution_results.get(execution_order[-1])
-        
-        if isinstance(final_result, dict):
-            print("Final result is a dict, using jsonable_encoder...")
-            encoded_result = jsonable_encoder(final_result)
-            return json.dumps(encoded_result)
+        if progress is not None:
+            progress("done", len(execution_order), len(execution_order))
 
-        if isinstance(final_result, pd.DataFrame):
-            print("Final result is a DataFrame, using pandas .to_json()...")
-            return final_result.to_json(orient='records')
-        
-        print(f"Final result is an unknown type: {type(final_result)}")
-        return json.dumps(jsonable_encoder(final_result))
\ No newline at end of file
+        return self.execution_results.get(execution_order[-1])
\ No newline at end of file
@@ -0,0 +1,446 @@
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: appends are then only serialised within one process
+    fcntl = None
+
+# ----------------------------
+# Shared dataset store
+# ----------------------------
+# Every parsed dataset is written once as Arrow IPC files in a directory shared by
+# all uvicorn workers (tmpfs at /dev/shm when available). Workers, analysis
+# functions, workflow nodes and sandbox processes attach to it by memory-mapping
+# those files, so a dataset is parsed once and its Arrow data held once per machine.
+# DataFrames converted from it are per process: numeric columns without nulls
+# can share the mapped buffers, but strings, booleans and nullable columns are
+# copies, so each process caches its conversions (see get_dataframe).
+#
+# Layout:
+#   <root>/<dataset_id>/meta.json
+#   <root>/<dataset_id>/part-00000.arrow
+#   <root>/<dataset_id>/part-00001.arrow      (one per append)
+#   <root>/<dataset_id>/<name>.pkl            (sidecars, e.g. incremental aggregates)
+#   <root>/<dataset_id>/<name>.npy            (array sidecars, written once, e.g. row hashes)
+#
+# Uploads are content-addressed and immutable. Appending to one first forks it
+# into a mutable dataset with a random id (parts are hard-linked, not copied).
+#
+# Once uploads take more than DATASET_STORE_MAX_MB, the least recently used ones
+# are evicted (a dataset's directory mtime records its last use). Forks are user
+# state that can't be rebuilt from an upload: they are never evicted and don't
+# count against the budget; they go when deleted through the API.
+
+def _default_root() -> str:
+    base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(base, "dap_datasets")
+
+
+DATASET_STORE_DIR = os.environ.get("DATASET_STORE_DIR", _default_root())
+DATASET_STORE_MAX_MB = int(os.environ.get("DATASET_STORE_MAX_MB", "4096"))
+DATASET_ATTACH_MAX = int(os.environ.get("DATASET_ATTACH_MAX", "16"))
+DATASET_FRAME_CACHE_MB = int(os.environ.get("DATASET_FRAME_CACHE_MB", "1024"))
+
+_META_FILE = "meta.json"
+# Seconds between two last-use updates of one dataset by one process
+_ACCESS_RESOLUTION = 60
+_accessed = {}
+
+# Per-process LRU of attached (memory-mapped) tables: dataset_id -> (version, table).
+# An entry keeps its files mapped, so entries of datasets that were changed,
+# deleted or evicted (by any worker) are dropped as soon as that is noticed.
+_attached = OrderedDict()
+_attached_lock = threading.Lock()
+
+# Per-process LRU of converted DataFrames, bounded by DATASET_FRAME_CACHE_MB:
+# dataset_id -> (version, frame, size in bytes)
+_frames = OrderedDict()
+_frames_lock = threading.Lock()
+
+
+def _dataset_dir(dataset_id: str) -> str:
+    if not dataset_id or not all(c.isalnum() or c in "-_" for c in dataset_id):
+        raise ValueError(f"Invalid dataset id: '{dataset_id}'.")
+    return os.path.join(DATASET_STORE_DIR, dataset_id)
+
+
+def dataset_id_for(file_contents: bytes) -> str:
+    """Datasets are content-addressed, so every worker maps the same upload to the same id."""
+    return hashlib.sha256(file_contents).hexdigest()[:32]
+
+
+def to_arrow_table(df: pd.DataFrame):
+    """Converts a DataFrame to Arrow, stringifying mixed-type object columns Arrow rejects."""
+    import pyarrow as pa
+
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        df = df.copy()
+        for col in df.select_dtypes(include='object').columns:
+            try:
+                pa.array(df[col])
+            except (pa.ArrowInvalid, pa.ArrowTypeError):
+                df[col] = df[col].astype(str).where(df[col].notna(), None)
+        return pa.Table.from_pandas(df, preserve_index=False)
+
+
+def _write_arrow(table, path: str):
+    import pyarrow as pa
+
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def has_dataset(dataset_id: str) -> bool:
+    if not os.path.exists(os.path.join(_dataset_dir(dataset_id), _META_FILE)):
+        return False
+    _mark_used(dataset_id)
+    return True
+
+
+def _mark_used(dataset_id: str):
+    """Records that the dataset was used (its directory's mtime), for eviction."""
+    now = time.time()
+    if now - _accessed.get(dataset_id, 0) < _ACCESS_RESOLUTION:
+        return
+    _accessed[dataset_id] = now
+    try:
+        os.utime(_dataset_dir(dataset_id))
+    except FileNotFoundError:
+        pass
+
+
+def get_metadata(dataset_id: str) -> dict:
+    meta_path = os.path.join(_dataset_dir(dataset_id), _META_FILE)
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        raise KeyError(f"Dataset '{dataset_id}' not found.")
+
+
+def put_dataframe(df: pd.DataFrame, dataset_id: str, file_name: str) -> str:
+    """
+    Stores an already parsed DataFrame under dataset_id. The directory is
+    built aside and renamed into place, so concurrent writers are safe.
+    """
+    if has_dataset(dataset_id):
+        return dataset_id
+
+    table = to_arrow_table(df)
+    os.makedirs(DATASET_STORE_DIR, exist_ok=True)
+    tmp_dir = os.path.join(DATASET_STORE_DIR, f".tmp-{dataset_id}-{uuid.uuid4().hex}")
+    os.makedirs(tmp_dir)
+    try:
+        part = "part-00000.arrow"
+        _write_arrow(table, os.path.join(tmp_dir, part))
+        meta = {
+            "datasetId": dataset_id,
+            "fileName": file_name,
+            "rows": table.num_rows,
+            "columns": table.column_names,
+            "parts": [part],
+            "bytes": os.path.getsize(os.path.join(tmp_dir, part)),
+            "createdAt": time.time(),
+            "version": 1,
+            "mutable": False,
+        }
+        with open(os.path.join(tmp_dir, _META_FILE), "w") as f:
+            json.dump(meta, f)
+        try:
+            os.rename(tmp_dir, _dataset_dir(dataset_id))
+        except OSError:
+            # Another worker stored the same content first
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    _evict_if_needed(keep=dataset_id)
+    return dataset_id
+
+
+def put_dataset(file_contents: bytes, file_name: str) -> str:
+    """Parses an upload (unless it is already stored) and returns its dataset id."""
+    from app.analysis_utils import read_uploaded_file_to_df
+
+    dataset_id = dataset_id_for(file_contents)
+    if has_dataset(dataset_id):
+        return dataset_id
+    df = read_uploaded_file_to_df(file_contents, file_name)
+    return put_dataframe(df, dataset_id, file_name)
+
+
+def get_part_paths(dataset_id: str) -> list:
+    meta = get_metadata(dataset_id)
+    return [os.path.join(_dataset_dir(dataset_id), part) for part in meta["parts"]]
+
+
+def get_table(dataset_id: str):
+    """
+    Returns the dataset as a pyarrow Table backed by memory-mapped files.
+    The mapping is created once per process and reused until the dataset changes.
+    """
+    return _attach(dataset_id)[1]
+
+
+def _attach(dataset_id: str) -> tuple:
+    """(version, memory-mapped table) of a dataset, from the per-process cache when current."""
+    import pyarrow as pa
+
+    try:
+        meta = get_metadata(dataset_id)
+    except KeyError:
+        _detach(dataset_id)
+        raise
+    _mark_used(dataset_id)
+    with _attached_lock:
+        cached = _attached.get(dataset_id)
+        if cached is not None:
+            if cached[0] == meta["version"]:
+                _attached.move_to_end(dataset_id)
+                return cached
+            del _attached[dataset_id]
+
+    tables = []
+    for path in get_part_paths(dataset_id):
+        source = pa.memory_map(path, "r")
+        tables.append(pa.ipc.open_file(source).read_all())
+    table = tables[0] if len(tables) == 1 else pa.concat_tables(tables)
+
+    with _attached_lock:
+        _attached[dataset_id] = (meta["version"], table)
+        _attached.move_to_end(dataset_id)
+    _prune_attached()
+    return meta["version"], table
+
+
+def _detach(dataset_id: str):
+    _accessed.pop(dataset_id, None)
+    with _attached_lock:
+        _attached.pop(dataset_id, None)
+    with _frames_lock:
+        _frames.pop(dataset_id, None)
+
+
+def _prune_attached():
+    """Unmaps datasets deleted by other workers, then the least recently used beyond DATASET_ATTACH_MAX."""
+    with _attached_lock:
+        entries = list(_attached.items())
+    for dataset_id, (version, _) in entries:
+        try:
+            current = get_metadata(dataset_id)["version"]
+        except (KeyError, ValueError):
+            current = None
+        if current != version:
+            _detach(dataset_id)
+    with _attached_lock:
+        evicted = []
+        while len(_attached) > DATASET_ATTACH_MAX:
+            evicted.append(_attached.popitem(last=False)[0])
+    # A cached frame may still reference the mapped buffers
+    with _frames_lock:
+        for dataset_id in evicted:
+            _frames.pop(dataset_id, None)
+
+
+def get_dataframe(dataset_id: str) -> pd.DataFrame:
+    """
+    Returns the dataset as a DataFrame. Converting from Arrow copies string,
+    boolean and nullable columns, so the converted frame is cached per process
+    and dataset version. Callers get a shallow copy: with copy-on-write (always on
+    from pandas 3.0, hence the pin in requirements.txt), changes they make never
+    reach the cached frame.
+    """
+    version, table = _attach(dataset_id)
+    with _frames_lock:
+        cached = _frames.get(dataset_id)
+        if cached is not None and cached[0] == version:
+            _frames.move_to_end(dataset_id)
+            return cached[1].copy(deep=False)
+
+    frame = table.to_pandas(split_blocks=True)
+    size = table.nbytes
+    budget = DATASET_FRAME_CACHE_MB * 1024 * 1024
+    if size <= budget:
+        with _frames_lock:
+            _frames[dataset_id] = (version, frame, size)
+            _frames.move_to_end(dataset_id)
+            total = sum(entry[2] for entry in _frames.values())
+            while total > budget:
+                _, (_, _, evicted) = _frames.popitem(last=False)
+                total -= evicted
+    return frame.copy(deep=False)
+
+
+def _write_metadata(dataset_id: str, meta: dict):
+    meta_path = os.path.join(_dataset_dir(dataset_id), _META_FILE)
+    tmp_path = f"{meta_path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+
+@contextmanager
+def dataset_lock(dataset_id: str):
+    """Serialises writers of one dataset across all worker processes."""
+    lock_path = os.path.join(_dataset_dir(dataset_id), ".lock")
+    with open(lock_path, "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def fork_dataset(dataset_id: str) -> str:
+    """Creates a mutable copy of a dataset under a new random id and returns that id."""
+    source_dir = _dataset_dir(dataset_id)
+    meta = get_metadata(dataset_id)
+    new_id = uuid.uuid4().hex
+    tmp_dir = os.path.join(DATASET_STORE_DIR, f".tmp-{new_id}")
+    os.makedirs(tmp_dir)
+    try:
+        for name in os.listdir(source_dir):
+            if name == _META_FILE or name.startswith("."):
+                continue
+            source = os.path.join(source_dir, name)
+            try:
+                # Parts are never modified after being written, so sharing them is safe
+                os.link(source, os.path.join(tmp_dir, name))
+            except OSError:
+                shutil.copy2(source, os.path.join(tmp_dir, name))
+        meta.update({"datasetId": new_id, "forkedFrom": dataset_id, "mutable": True,
+                     "createdAt": time.time(), "version": 1})
+        with open(os.path.join(tmp_dir, _META_FILE), "w") as f:
+            json.dump(meta, f)
+        os.rename(tmp_dir, _dataset_dir(new_id))
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    return new_id
+
+
+def append_dataframe(dataset_id: str, df: pd.DataFrame):
+    """
+    Appends rows to a mutable dataset as a new part file. Columns must match the
+    dataset's; values are cast to its schema. Returns the updated metadata and the
+    appended rows as stored. Call this while holding dataset_lock(dataset_id).
+    """
+    import pyarrow as pa
+
+    meta = get_metadata(dataset_id)
+    if not meta.get("mutable"):
+        raise ValueError(f"Dataset '{dataset_id}' is immutable; fork it before appending.")
+
+    missing = [c for c in meta["columns"] if c not in df.columns]
+    extra = [c for c in df.columns if c not in meta["columns"]]
+    if missing or extra:
+        raise ValueError(f"Appended columns don't match the dataset (missing: {missing}, unexpected: {extra}).")
+
+    schema = get_table(dataset_id).schema.remove_metadata()
+    try:
+        table = to_arrow_table(df[meta["columns"]]).cast(schema)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+        raise ValueError(f"Appended values don't match the dataset's column types: {e}")
+
+    part = f"part-{len(meta['parts']):05d}.arrow"
+    part_path = os.path.join(_dataset_dir(dataset_id), part)
+    _write_arrow(table, part_path)
+
+    meta["parts"].append(part)
+    meta["rows"] += table.num_rows
+    meta["bytes"] += os.path.getsize(part_path)
+    meta["version"] += 1
+    _write_metadata(dataset_id, meta)
+    return meta, table.to_pandas()
+
+
+def read_sidecar(dataset_id: str, name: str):
+    """Loads a pickled object stored next to the dataset, or None if there is none."""
+    try:
+        with open(os.path.join(_dataset_dir(dataset_id), f"{name}.pkl"), "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def write_sidecar(dataset_id: str, name: str, value):
+    path = os.path.join(_dataset_dir(dataset_id), f"{name}.pkl")
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+
+def read_sidecar_array(dataset_id: str, name: str) -> np.ndarray:
+    """Memory-maps an array sidecar (read-only); raises KeyError if there is none."""
+    try:
+        return np.load(os.path.join(_dataset_dir(dataset_id), f"{name}.npy"), mmap_mode='r', allow_pickle=False)
+    except FileNotFoundError:
+        raise KeyError(f"Dataset '{dataset_id}' has no sidecar '{name}'.")
+
+
+def write_sidecar_array(dataset_id: str, name: str, values: np.ndarray):
+    """Stores an array next to the dataset. Array sidecars are never modified (only deleted), so forks share them."""
+    path = os.path.join(_dataset_dir(dataset_id), f"{name}.npy")
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, values, allow_pickle=False)
+    os.replace(tmp_path, path)
+
+
+def delete_sidecar_array(dataset_id: str, name: str):
+    try:
+        os.remove(os.path.join(_dataset_dir(dataset_id), f"{name}.npy"))
+    except FileNotFoundError:
+        pass
+
+
+def delete_dataset(dataset_id: str):
+    _detach(dataset_id)
+    shutil.rmtree(_dataset_dir(dataset_id), ignore_errors=True)
+
+
+def _evict_if_needed(keep: str = None):
+    """Drops the least recently used uploads once they take more than DATASET_STORE_MAX_MB."""
+    budget = DATASET_STORE_MAX_MB * 1024 * 1024
+    entries = []
+    for name in os.listdir(DATASET_STORE_DIR):
+        if name.startswith("."):
+            continue
+        try:
+            meta = get_metadata(name)
+            last_used = os.path.getmtime(_dataset_dir(name))
+        except (KeyError, ValueError, OSError):
+            continue
+        if meta.get("mutable"):
+            continue
+        entries.append((last_used, meta.get("bytes", 0), name))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= budget:
+            break
+        if name == keep:
+            continue
+        delete_dataset(name)
+        total -= size
@@ -0,0 +1,224 @@
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import uuid
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------
+# Fast Excel ingestion
+# ----------------------------
+# The workbook is parsed exactly once, with calamine when it is installed and
+# otherwise with openpyxl's read-only streaming reader. The header row is
+# detected on that same parse, and the cleaned result is cached as Parquet
+# (keyed by the file's content hash) so later reads of the same workbook skip
+# the Excel parser entirely.
+
+EXCEL_CACHE_DIR = os.environ.get(
+    "EXCEL_CACHE_DIR", os.path.join(tempfile.gettempdir(), "dap_excel_cache")
+)
+EXCEL_CACHE_MAX_FILES = int(os.environ.get("EXCEL_CACHE_MAX_FILES", "256"))
+
+# Only the first rows are searched for the header
+HEADER_SEARCH_ROWS = 10
+
+
+def _has_calamine() -> bool:
+    try:
+        import python_calamine  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def _read_raw_sheet(file_contents: bytes, extension: str) -> pd.DataFrame:
+    """Reads the first sheet with no header handling, in a single pass."""
+    if _has_calamine():
+        # calamine reads .xls and .xlsx and is much faster than openpyxl/xlrd
+        return pd.read_excel(io.BytesIO(file_contents), sheet_name=0, header=None, engine='calamine')
+
+    if extension == '.xlsx':
+        from openpyxl import load_workbook
+
+        workbook = load_workbook(io.BytesIO(file_contents), read_only=True, data_only=True)
+        try:
+            rows = list(workbook.worksheets[0].iter_rows(values_only=True))
+        finally:
+            workbook.close()
+        return pd.DataFrame(rows)
+
+    return pd.read_excel(io.BytesIO(file_contents), sheet_name=0, header=None, engine='xlrd')
+
+
+def _detect_header_row(raw: pd.DataFrame) -> int:
+    """Returns the first of the leading rows that is at least 30% (or 2 cells) filled."""
+    if raw.empty:
+        return 0
+    filled = raw.head(HEADER_SEARCH_ROWS).notna().sum(axis=1).to_numpy()
+    threshold = max(2, len(raw.columns) * 0.3)
+    candidates = (filled >= threshold).nonzero()[0]
+    return int(candidates[0]) if len(candidates) else 0
+
+
+def clean_column_names(columns) -> list:
+    """Stringifies and strips names, fills blanks with Unnamed_<i> and suffixes duplicates."""
+    names = pd.Series(list(columns), dtype=object)
+    blank = names.isna()
+    names = names.astype(str).str.strip()
+    blank |= names.isin(['', 'nan', 'None'])
+    names[blank] = [f'Unnamed_{i}' for i in names.index[blank]]
+
+    # Duplicates become name, name_1, name_2, ...
+    occurrence = names.groupby(names).cumcount()
+    duplicate = occurrence > 0
+    names[duplicate] = names[duplicate] + '_' + occurrence[duplicate].astype(str)
+    return names.tolist()
+
+
+def _frame_from_raw(raw: pd.DataFrame) -> pd.DataFrame:
+    """Turns a header=None sheet into a frame whose columns come from the detected header row."""
+    if raw.empty:
+        return raw
+    header_idx = _detect_header_row(raw)
+    df = raw.iloc[header_idx + 1:].copy()
+    df.columns = raw.iloc[header_idx].tolist()
+    # Columns held the header text too, so let pandas re-infer their real dtypes
+    return df.infer_objects()
+
+
+def _read_excel_with_pandas(file_contents: bytes, file_name: str, extension: str) -> pd.DataFrame:
+    """The original pd.read_excel-based reader, kept as a fallback for unusual workbooks."""
+    # Excel files must be read from bytes
+    # Determine the engine to use
+    if extension == '.xlsx':
+        engine = 'openpyxl'
+    else:
+        # For .xls files, try to use xlrd, but fallback to openpyxl or None
+        engine = None
+        try:
+            import xlrd
+            engine = 'xlrd'
+        except ImportError:
+            # xlrd not installed, try openpyxl or let pandas choose
+            engine = 'openpyxl'  # openpyxl can sometimes handle .xls
+
+    # Try multiple approaches to read the Excel file
+    df = None
+    last_error = None
+
+    # Approach 1: Try reading with header=0 (standard approach)
+    try:
+        df = pd.read_excel(io.BytesIO(file_contents), sheet_name=0, header=0, engine=engine)
+    except Exception as e1:
+        last_error = e1
+        # Approach 2: Try reading without header, then detect it
+        try:
+            df_temp = pd.read_excel(io.BytesIO(file_contents), sheet_name=0, header=None, engine=engine)
+            df = _frame_from_raw(df_temp)
+            last_error = None
+        except Exception as e2:
+            last_error = e2
+            # Approach 3: Try with openpyxl engine regardless of extension
+            try:
+                df = pd.read_excel(io.BytesIO(file_contents), sheet_name=0, header=0, engine='openpyxl')
+                last_error = None
+            except Exception as e3:
+                last_error = e3
+                # Approach 4: Try without specifying engine (let pandas decide)
+                try:
+                    df = pd.read_excel(io.BytesIO(file_contents), sheet_name=0, header=0)
+                    last_error = None
+                except Exception as e4:
+                    last_error = e4
+
+    if df is None:
+        error_msg = str(last_error) if last_error else "Unknown error"
+        # Provide more helpful error message
+        if 'tokenizing' in error_msg.lower():
+            raise ValueError(
+                f"Error reading Excel file '{file_name}'. The file may have formatting issues "
+                f"such as merged cells, inconsistent rows, or empty header rows. "
+                f"Please check the file structure. Original error: {error_msg}"
+            )
+        else:
+            raise ValueError(
+                f"Error reading Excel file '{file_name}': {error_msg}. "
+                f"Please ensure the file is a valid Excel file (.xls or .xlsx) and not corrupted."
+            )
+    return df
+
+
+def _cache_path(file_contents: bytes) -> str:
+    digest = hashlib.sha256(file_contents).hexdigest()[:32]
+    return os.path.join(EXCEL_CACHE_DIR, f"{digest}.parquet")
+
+
+def _write_cache(df: pd.DataFrame, path: str):
+    """Best effort: sheets Arrow can't represent exactly (mixed-type columns) are not cached."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        os.makedirs(EXCEL_CACHE_DIR, exist_ok=True)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, OSError) as e:
+        logger.warning("Skipping Excel cache for %s: %s", os.path.basename(path), e)
+        return
+    _evict_cache()
+
+
+def _evict_cache():
+    entries = [
+        os.path.join(EXCEL_CACHE_DIR, name)
+        for name in os.listdir(EXCEL_CACHE_DIR) if name.endswith('.parquet')
+    ]
+    if len(entries) <= EXCEL_CACHE_MAX_FILES:
+        return
+    entries.sort(key=os.path.getmtime)
+    for path in entries[:len(entries) - EXCEL_CACHE_MAX_FILES]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def read_excel(file_contents: bytes, file_name: str, extension: str) -> pd.DataFrame:
+    """
+    Reads the first sheet of an .xls/.xlsx workbook into a cleaned DataFrame:
+    header row detected, empty rows/columns dropped and column names made unique.
+    """
+    cache_path = _cache_path(file_contents)
+    if os.path.exists(cache_path):
+        try:
+            return pd.read_parquet(cache_path)
+        except Exception as e:
+            logger.warning("Ignoring unreadable Excel cache entry %s: %s", cache_path, e)
+
+    try:
+        df = _frame_from_raw(_read_raw_sheet(file_contents, extension))
+    except Exception as e:
+        logger.warning("Fast Excel reader failed for %s (%s); falling back to pandas.read_excel", file_name, e)
+        df = _read_excel_with_pandas(file_contents, file_name, extension)
+
+    # Clean up the dataframe: remove completely empty rows and columns
+    df = df.dropna(how='all').dropna(axis=1, how='all')
+
+    # If dataframe is empty after cleanup, the file might have issues
+    if df.empty:
+        raise ValueError("Excel file appears to be empty or contains no valid data rows.")
+
+    # Reset index and ensure column names are valid (no NaN column names, no duplicates)
+    df = df.reset_index(drop=True)
+    df.columns = clean_column_names(df.columns)
+
+    _write_cache(df, cache_path)
+    return df
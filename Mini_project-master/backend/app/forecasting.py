@@ -0,0 +1,167 @@
+import logging
+import os
+import threading
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------
+# Tiered forecasting with a time budget
+# ----------------------------
+# Models are tried from cheapest to most expensive:
+#   1. seasonal naive     - repeats the last season; needs one full season
+#   2. Holt-Winters       - additive, optionally damped trend; smoothing parameters picked by a
+#                           small grid search run as one vectorized recursion
+#   3. SARIMA             - statsmodels (1,1,1)x(1,1,1,m); only when the series has at
+#                           least two seasons and the time left in the budget covers
+#                           the expected fit time
+# A more expensive model is kept only if its one-step-ahead in-sample error beats
+# the cheaper one's. Every result reports the model used and the time it took.
+
+# --- Configuration (overridable through the environment) ---
+FORECAST_BUDGET_SECONDS = float(os.environ.get("FORECAST_BUDGET_SECONDS", "3"))
+FORECAST_SARIMA = os.environ.get("FORECAST_SARIMA", "1").lower() not in ("0", "false", "no")
+
+SEASONAL_NAIVE = "seasonal_naive"
+HOLT_WINTERS = "holt_winters"
+SARIMA = "sarima"
+
+# Holt-Winters grid: every combination is fitted in the same pass
+_HW_ALPHAS = np.array([0.1, 0.3, 0.5, 0.8])
+_HW_BETAS = np.array([0.01, 0.1, 0.3])
+_HW_GAMMAS = np.array([0.05, 0.2, 0.5])
+_HW_PHIS = np.array([0.9, 0.98, 1.0])
+
+# Observed SARIMA fit times per seasonal period (seconds, moving average), per process
+_sarima_costs = {}
+_sarima_costs_lock = threading.Lock()
+_SARIMA_COST_GUESS = 1.0
+
+
+def budget_deadline(budget: float = None) -> float:
+    """Absolute deadline (time.time()) for a request starting now; shared by worker processes."""
+    return time.time() + (FORECAST_BUDGET_SECONDS if budget is None else budget)
+
+
+def _seasonal_naive(y: np.ndarray, m: int, steps: int):
+    n = len(y)
+    forecast = y[n - m + (np.arange(steps) % m)]
+    fitted_errors = y[m:] - y[:-m]
+    return forecast, float(np.mean(fitted_errors ** 2)) if len(fitted_errors) else np.inf
+
+
+def _holt_winters(y: np.ndarray, m: int, steps: int):
+    """Additive damped Holt-Winters; returns (forecast, one-step MSE, params) of the best grid point."""
+    alpha, beta, gamma, phi = (g.ravel() for g in np.meshgrid(_HW_ALPHAS, _HW_BETAS, _HW_GAMMAS, _HW_PHIS))
+    grid = len(alpha)
+
+    first, second = y[:m].mean(), y[m:2 * m].mean()
+    level = np.full(grid, first)
+    trend = np.full(grid, (second - first) / m)
+    season = np.tile(y[:m] - first, (grid, 1))
+    sse = np.zeros(grid)
+
+    for t in range(len(y)):
+        i = t % m
+        s = season[:, i]
+        damped = phi * trend
+        error = y[t] - (level + damped + s)
+        if t >= m:
+            # The first season only initialises the seasonal indices
+            sse += error * error
+        new_level = alpha * (y[t] - s) + (1 - alpha) * (level + damped)
+        trend = beta * (new_level - level) + (1 - beta) * damped
+        season[:, i] = gamma * (y[t] - new_level) + (1 - gamma) * s
+        level = new_level
+
+    best = int(np.argmin(sse))
+    h = np.arange(1, steps + 1)
+    # Damped trend: sum of phi^1..phi^h
+    damping = np.cumsum(phi[best] ** h)
+    idx = (len(y) + h - 1) % m
+    forecast = level[best] + damping * trend[best] + season[best, idx]
+    params = {"alpha": float(alpha[best]), "beta": float(beta[best]),
+              "gamma": float(gamma[best]), "phi": float(phi[best])}
+    return forecast, float(sse[best] / (len(y) - m)), params
+
+
+def _expected_sarima_cost(m: int) -> float:
+    with _sarima_costs_lock:
+        return _sarima_costs.get(m, _SARIMA_COST_GUESS * max(1.0, m / 12))
+
+
+def _record_sarima_cost(m: int, seconds: float):
+    with _sarima_costs_lock:
+        previous = _sarima_costs.get(m)
+        _sarima_costs[m] = seconds if previous is None else 0.7 * previous + 0.3 * seconds
+
+
+def _sarima(series: pd.Series, m: int, steps: int):
+    # statsmodels is only needed for this tier
+    from statsmodels.tsa.arima.model import ARIMA
+
+    start = time.perf_counter()
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        model = ARIMA(series, order=(1, 1, 1), seasonal_order=(1, 1, 1, m))
+        model_fit = model.fit()
+        forecast = model_fit.forecast(steps=steps)
+    _record_sarima_cost(m, time.perf_counter() - start)
+    # The first season and a step are consumed by differencing
+    residuals = np.asarray(model_fit.resid)[m + 1:]
+    return np.asarray(forecast), float(np.mean(residuals ** 2)) if len(residuals) else np.inf
+
+
+def forecast_series(series: pd.Series, freq: str = 'ME', seasonal_period: int = 12, steps: int = 12,
+                    deadline: float = None) -> dict:
+    """
+    Forecasts `steps` periods of a regularly spaced series within the time left
+    until `deadline`. Returns {"model", "elapsedMs", "points", "error"} where
+    points are ECharts-ready {"name": date, "value": float} items; model is None
+    (and error set) when no forecast could be made.
+    """
+    start = time.perf_counter()
+    deadline = budget_deadline() if deadline is None else deadline
+    m = seasonal_period
+    result = {"model": None, "elapsedMs": 0.0, "points": [], "error": None}
+
+    y = series.to_numpy(dtype='float64')
+    if len(y) < m or len(y) < 2:
+        result["error"] = f"Need at least {max(m, 2)} periods to forecast, got {len(y)}."
+        return result
+    if not np.isfinite(y).all():
+        result["error"] = "Series contains missing or infinite values."
+        return result
+
+    model, (forecast, mse) = SEASONAL_NAIVE, _seasonal_naive(y, m, steps)
+    if len(y) >= 2 * m:
+        hw_forecast, hw_mse, params = _holt_winters(y, m, steps)
+        if hw_mse <= mse:
+            model, forecast, mse = HOLT_WINTERS, hw_forecast, hw_mse
+            result["params"] = params
+
+        remaining = deadline - time.time()
+        if FORECAST_SARIMA and remaining >= _expected_sarima_cost(m):
+            try:
+                # A copy, so setting the frequency leaves the caller's index alone
+                indexed = pd.Series(y, index=pd.DatetimeIndex(series.index, freq=freq))
+                sarima_forecast, sarima_mse = _sarima(indexed, m, steps)
+                if np.isfinite(sarima_forecast).all() and sarima_mse <= mse:
+                    model, forecast, mse = SARIMA, sarima_forecast, sarima_mse
+                    result.pop("params", None)
+            except Exception as e:
+                # The cheaper model's forecast stands; say why SARIMA was dropped
+                logger.warning("SARIMA fit failed, keeping %s: %s", model, e)
+                result["error"] = f"SARIMA failed: {e}"
+
+    offset = pd.tseries.frequencies.to_offset(freq)
+    future = pd.date_range(series.index[-1] + offset, periods=steps, freq=offset)
+    result["model"] = model
+    result["points"] = [{"name": date.strftime('%Y-%m-%d'), "value": float(value)}
+                        for date, value in zip(future, forecast)]
+    result["elapsedMs"] = round((time.perf_counter() - start) * 1000, 3)
+    return result
@@ -0,0 +1,336 @@
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+
+from app import dataset_store
+from app.analysis_utils import (
+    find_date_column,
+    build_time_series_payload,
+    get_correlations,
+)
+from app.metrics import span
+
+# ----------------------------
+# Incremental (append-only) dashboard aggregates
+# ----------------------------
+# Everything the dashboard shows is kept as a mergeable partial aggregate next to
+# the dataset, so an append only has to scan the new rows:
+#   - row and per-column null counts              (sums)
+#   - duplicate rows                              (set of row hashes)
+#   - categorical value distributions             (value -> count)
+#   - monthly record counts of the date column    (month -> count)
+#   - correlations                                (pairwise n, Σx, Σy, Σx², Σy², Σxy)
+# Outlier insights depend on quantiles, which don't merge exactly, so they are
+# left out of the incremental dashboard.
+#
+# The row hashes grow with the dataset, so they aren't pickled with the rest.
+# They are kept as sorted .npy parts, memory-mapped when loaded: an append looks
+# its hashes up in each part (binary search) and writes the unseen ones as a new
+# part. The newest parts are merged while a part is no bigger than the one after
+# it (like a binary counter), so there are O(log n) parts and every hash is
+# rewritten O(log n) times; INCREMENTAL_HASH_PARTS_MAX caps the count outright.
+
+# --- Configuration (overridable through the environment) ---
+INCREMENTAL_HASH_PARTS_MAX = int(os.environ.get("INCREMENTAL_HASH_PARTS_MAX", "16"))
+
+AGGREGATES_SIDECAR = "aggregates"
+HASHES_SIDECAR = "aggregates-hashes"
+
+
+def hash_rows(df: pd.DataFrame) -> np.ndarray:
+    """Hashes whole rows; numeric columns are hashed as float64 so 1 and 1.0 match across batches."""
+    normalized = df.copy(deep=False)
+    for col in normalized.select_dtypes(include=np.number).columns:
+        normalized[col] = normalized[col].astype('float64')
+    return pd.util.hash_pandas_object(normalized, index=False).to_numpy()
+
+
+def _correlation_sums(values: np.ndarray, shift: np.ndarray) -> dict:
+    """
+    Pairwise-complete moment sums, matching DataFrame.corr()'s handling of nulls.
+    Values are shifted by the base batch's means to keep the sums well conditioned.
+    """
+    mask = ~np.isnan(values)
+    x = np.where(mask, values - shift, 0.0)
+    m = mask.astype('float64')
+    return {
+        "n": m.T @ m,
+        "sx": x.T @ m,          # sx[i, j] = Σ x_i over rows where x_i and x_j are present
+        "sxx": (x * x).T @ m,
+        "sxy": x.T @ x,
+    }
+
+
+class DashboardAggregates:
+    def __init__(self, columns, dtypes, numeric_cols, categorical_cols, object_col_count, date_col):
+        self.columns = list(columns)
+        self.dtypes = dict(dtypes)
+        self.numeric_cols = list(numeric_cols)
+        self.categorical_cols = list(categorical_cols)
+        # get_kpis counts text columns before the date column is parsed
+        self.object_col_count = object_col_count
+        self.date_col = date_col
+        self.rows = 0
+        self.null_counts = pd.Series(0, index=self.columns, dtype='int64')
+        self.unique_rows = 0
+        self.hash_parts = []       # names of the sidecar parts holding the saved row hashes
+        self.hash_arrays = []      # their sorted hashes (not pickled)
+        self.unsaved_hashes = []   # sorted hashes added since the last save
+        self.value_counts = {col: pd.Series(dtype='int64') for col in self.categorical_cols}
+        self.monthly_counts = pd.Series(dtype='int64')
+        self.shift = None
+        self.corr_sums = None
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, time_column: str = None) -> "DashboardAggregates":
+        # Parse the date column on a shallow copy, as run_full_analysis does before
+        # the dictionary and distribution sections, but hash the rows as stored
+        parsed = df.copy(deep=False)
+        date_col = find_date_column(parsed, time_column)
+        aggregates = cls(
+            columns=df.columns,
+            dtypes={col: str(dtype) for col, dtype in parsed.dtypes.items()},
+            numeric_cols=df.select_dtypes(include=np.number).columns,
+            categorical_cols=parsed.select_dtypes(include='object').columns,
+            object_col_count=len(df.select_dtypes(include='object').columns),
+            date_col=date_col,
+        )
+        numeric = df[aggregates.numeric_cols].to_numpy(dtype='float64', na_value=np.nan)
+        aggregates.shift = np.nan_to_num(np.nanmean(numeric, axis=0)) if len(df) else np.zeros(numeric.shape[1])
+        aggregates.update(df, dates=parsed[date_col] if date_col is not None else None)
+        return aggregates
+
+    def update(self, df: pd.DataFrame, dates: pd.Series = None):
+        """
+        Folds a batch of new rows into the aggregates; cost is proportional to len(df).
+        dates may carry the batch's already parsed date column.
+        """
+        self.rows += len(df)
+        self.null_counts = self.null_counts.add(df[self.columns].isnull().sum(), fill_value=0).astype('int64')
+
+        hashes = np.unique(hash_rows(df[self.columns]))
+        fresh = hashes[~self._seen(hashes)]
+        self.unique_rows += len(fresh)
+        if len(fresh):
+            self.unsaved_hashes.append(fresh)
+
+        for col in self.categorical_cols:
+            counts = df[col].value_counts()
+            self.value_counts[col] = self.value_counts[col].add(counts, fill_value=0).astype('int64')
+
+        if self.date_col is not None:
+            if dates is None:
+                dates = pd.to_datetime(df[self.date_col], errors='coerce')
+            months = dates.dropna().dt.to_period('M').value_counts()
+            self.monthly_counts = self.monthly_counts.add(months, fill_value=0).astype('int64')
+
+        numeric = df[self.numeric_cols].to_numpy(dtype='float64', na_value=np.nan)
+        sums = _correlation_sums(numeric, self.shift)
+        if self.corr_sums is None:
+            self.corr_sums = sums
+        else:
+            for key, value in sums.items():
+                self.corr_sums[key] += value
+
+    def _seen(self, hashes: np.ndarray) -> np.ndarray:
+        """Which of the (sorted) hashes are already known; a binary search per part."""
+        seen = np.zeros(len(hashes), dtype=bool)
+        for part in self.hash_arrays + self.unsaved_hashes:
+            positions = np.minimum(np.searchsorted(part, hashes), len(part) - 1)
+            seen |= part[positions] == hashes
+        return seen
+
+    def __getstate__(self):
+        # Row hashes are saved separately as sidecar parts (see _save_aggregates)
+        state = self.__dict__.copy()
+        del state["hash_arrays"], state["unsaved_hashes"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.hash_arrays = []
+        self.unsaved_hashes = []
+
+    # --- Dashboard sections, in the same shapes analysis_utils produces ---
+    @property
+    def duplicates(self) -> int:
+        return self.rows - self.unique_rows
+
+    def kpis(self) -> dict:
+        total_cells = self.rows * len(self.columns)
+        missing_values = int(self.null_counts.sum())
+        data_quality_score = ((total_cells - missing_values) / total_cells) * 100 if total_cells > 0 else 0
+        anomalies = self.duplicates
+        anomalies_percent = (anomalies / self.rows) * 100 if self.rows > 0 else 0
+        return {
+            "totalRecords": f"{self.rows:,}",
+            "totalRecordsDelta": "Incremental refresh",
+            "dataQuality": f"{data_quality_score:.1f}%",
+            "dataQualityDelta": f"{missing_values:,} missing",
+            "columns": f"{len(self.columns)}",
+            "columnsDelta": f"{self.object_col_count} Cat, {len(self.numeric_cols)} Num",
+            "anomalies": f"{anomalies:,}",
+            "anomaliesDelta": f"{anomalies_percent:.1f}% duplicate",
+            "anomaliesDeltaType": "negative" if anomalies > 0 else "positive"
+        }
+
+    def correlation_matrix(self) -> pd.DataFrame:
+        s = self.corr_sums
+        n = s["n"]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = n * s["sxy"] - s["sx"] * s["sx"].T
+            var_x = n * s["sxx"] - s["sx"] ** 2
+            corr = cov / np.sqrt(var_x * var_x.T)
+        corr[n < 2] = np.nan
+        return pd.DataFrame(corr, index=self.numeric_cols, columns=self.numeric_cols)
+
+    def correlation_payload(self) -> dict:
+        if not self.numeric_cols:
+            return {"columns": [], "data": []}
+        matrix = self.correlation_matrix()
+        columns = matrix.columns.tolist()
+        values = matrix.to_numpy()
+        data = [[i, j, round(values[i, j], 3)] for i in range(len(columns)) for j in range(len(columns))]
+        return {"columns": columns, "data": data}
+
+    def insights(self, kpis: dict) -> list:
+        insights = [
+            {"id": "i1", "insight": f"Analysis complete for {kpis['totalRecords']} records."},
+            {"id": "i2", "insight": f"Data Quality Score is {kpis['dataQuality']}. Check 'Data Health' for details on missing values."},
+        ]
+        if self.duplicates > 0:
+            insights.append({"id": "i3", "insight": f"Found {kpis['anomalies']} duplicate rows. Recommend running 'Deduplication' process."})
+        if self.numeric_cols:
+            for i, insight in enumerate(get_correlations(self.correlation_matrix()), 1):
+                insights.append({"id": f"c{i}", "insight": insight})
+        return insights
+
+    def dictionary(self) -> list:
+        return [
+            {
+                "id": col,
+                "columnName": col,
+                "columnType": self.dtypes[col],
+                "metric": f"{(self.null_counts[col] / self.rows) * 100 if self.rows > 0 else 0:.1f}% missing"
+            }
+            for col in self.columns
+        ]
+
+    def column_distribution(self, target_column: str = None) -> dict:
+        col = target_column
+        if col is None:
+            if not self.categorical_cols:
+                return {"columnName": "N/A", "chartData": []}
+            col = self.categorical_cols[0]
+        if col not in self.value_counts:
+            raise ValueError(
+                f"Column '{col}' has no incremental distribution; tracked columns: {self.categorical_cols}."
+            )
+        counts = self.value_counts[col].nlargest(10)
+        return {
+            "columnName": col,
+            "chartData": [{"name": str(key), "value": int(val)} for key, val in counts.items()]
+        }
+
+    def time_series(self, target_column: str = None) -> dict:
+        if target_column is not None and target_column != self.date_col:
+            raise ValueError(
+                f"Time column '{target_column}' is not tracked incrementally; tracked column: '{self.date_col}'."
+            )
+        if self.date_col is None or self.monthly_counts.empty:
+            return {"timeColumn": None, "seriesData": [], "xAxisData": []}
+        # Fill the gaps between months, as resample('ME') does
+        months = self.monthly_counts.sort_index()
+        full_range = pd.period_range(months.index.min(), months.index.max(), freq='M')
+        monthly = months.reindex(full_range, fill_value=0)
+        monthly.index = monthly.index.to_timestamp(how='end').normalize()
+        return build_time_series_payload(self.date_col, monthly)
+
+    def data_health(self) -> list:
+        missing_values = int(self.null_counts.sum())
+        total_cells = self.rows * len(self.columns)
+        completeness = (total_cells - missing_values) / total_cells * 100 if total_cells > 0 else 0
+        duplicates = self.duplicates
+        duplicate_percent = (duplicates / self.rows) * 100 if self.rows > 0 else 0
+        return [
+            {"metric": "Completeness", "value": f"{completeness:.1f}%", "status": "positive" if completeness > 95 else "neutral"},
+            {"metric": "Uniqueness", "value": f"{(100 - duplicate_percent):.1f}%", "status": "positive" if duplicate_percent == 0 else "negative"},
+            {"metric": "Total Duplicates", "value": f"{duplicates:,}", "status": "positive" if duplicates == 0 else "negative"},
+            {"metric": "Missing Values", "value": f"{missing_values:,}", "status": "positive" if missing_values == 0 else "negative"},
+        ]
+
+    def dashboard(self, col_dist_target: str = None, col_time_target: str = None) -> dict:
+        kpis = self.kpis()
+        return {
+            "kpiData": kpis,
+            "insights": self.insights(kpis),
+            "dictionary": self.dictionary(),
+            "columnDist": self.column_distribution(col_dist_target),
+            "timeSeries": self.time_series(col_time_target),
+            "dataHealth": self.data_health(),
+            "correlationMatrix": self.correlation_payload(),
+        }
+
+
+def _load_or_build_aggregates(dataset_id: str, time_column: str = None) -> DashboardAggregates:
+    aggregates = dataset_store.read_sidecar(dataset_id, AGGREGATES_SIDECAR)
+    if aggregates is None:
+        # First append: one full pass to seed the aggregates
+        with span("incremental.seed", rows=dataset_store.get_metadata(dataset_id)["rows"]):
+            aggregates = DashboardAggregates.from_dataframe(dataset_store.get_dataframe(dataset_id), time_column)
+    else:
+        aggregates.hash_arrays = [dataset_store.read_sidecar_array(dataset_id, part)
+                                  for part in aggregates.hash_parts]
+    return aggregates
+
+
+def _save_aggregates(dataset_id: str, aggregates: DashboardAggregates):
+    """
+    Writes the hashes added since the last save as a new part, merging the newest
+    parts as described above, then the aggregates that list the parts. Merged-away
+    parts are only deleted once nothing lists them.
+    """
+    parts = list(zip(aggregates.hash_parts, aggregates.hash_arrays))
+    if aggregates.unsaved_hashes:
+        parts.append((None, np.sort(np.concatenate(aggregates.unsaved_hashes))))
+    merged_away = []
+    while len(parts) > 1 and (len(parts) > INCREMENTAL_HASH_PARTS_MAX or len(parts[-2][1]) <= len(parts[-1][1])):
+        (older_name, older), (newer_name, newer) = parts[-2], parts[-1]
+        merged_away += [name for name in (older_name, newer_name) if name is not None]
+        parts[-2:] = [(None, np.sort(np.concatenate([older, newer]), kind='stable'))]
+
+    for i, (name, hashes) in enumerate(parts):
+        if name is None:
+            name = f"{HASHES_SIDECAR}-{uuid.uuid4().hex}"
+            dataset_store.write_sidecar_array(dataset_id, name, hashes)
+            parts[i] = (name, hashes)
+    aggregates.hash_parts = [name for name, _ in parts]
+    aggregates.hash_arrays = [hashes for _, hashes in parts]
+    aggregates.unsaved_hashes = []
+    dataset_store.write_sidecar(dataset_id, AGGREGATES_SIDECAR, aggregates)
+    for name in merged_away:
+        dataset_store.delete_sidecar_array(dataset_id, name)
+
+
+def append_rows(dataset_id: str, new_df: pd.DataFrame, col_dist_target: str = None,
+                col_time_target: str = None) -> dict:
+    """
+    Appends new_df to the dataset and returns the refreshed dashboard, computed from
+    the stored aggregates plus the new rows only. Immutable (uploaded) datasets are
+    forked first, so the returned datasetId may differ from the one passed in.
+    """
+    if not dataset_store.get_metadata(dataset_id).get("mutable"):
+        dataset_id = dataset_store.fork_dataset(dataset_id)
+
+    with dataset_store.dataset_lock(dataset_id):
+        aggregates = _load_or_build_aggregates(dataset_id, col_time_target)
+        with span("incremental.append", rows=len(new_df)):
+            meta, appended = dataset_store.append_dataframe(dataset_id, new_df)
+            aggregates.update(appended)
+            _save_aggregates(dataset_id, aggregates)
+
+    response = {"datasetId": dataset_id, "appendedRows": len(new_df), "totalRows": meta["rows"]}
+    response.update(aggregates.dashboard(col_dist_target, col_time_target))
+    return response
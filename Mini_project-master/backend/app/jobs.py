@@ -0,0 +1,210 @@
+import itertools
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import nullcontext
+
+# --- Configuration (overridable through the environment) ---
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_MAX_QUEUED = int(os.environ.get("JOB_MAX_QUEUED", "100"))
+JOB_RESULT_TTL = float(os.environ.get("JOB_RESULT_TTL", "3600"))
+# Uploads wait here (on disk, not in memory) until their job parses them
+JOB_UPLOAD_DIR = os.environ.get("JOB_UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "dap_job_uploads"))
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised from a job's progress callback once the job has been cancelled."""
+
+
+class JobQueueFull(Exception):
+    """Raised by submit() when JOB_MAX_QUEUED jobs are already waiting."""
+
+
+class Job:
+    def __init__(self, kind: str, func, priority: int, on_expire=None, admit=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.func = func
+        self.priority = priority
+        self.on_expire = on_expire
+        self.admit = admit
+        self.status = QUEUED
+        self.stage = None
+        self.completed = 0
+        self.total = None
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        # Bumped on every change so progress streams know when to send an update
+        self.version = 0
+
+    def report(self, stage: str, completed: int, total: int):
+        """Progress callback handed to the job function."""
+        if self.cancel_event.is_set():
+            raise JobCancelled(f"Job {self.id} was cancelled.")
+        self.stage = stage
+        self.completed = completed
+        self.total = total
+        self.version += 1
+
+    def to_dict(self, include_result: bool = True) -> dict:
+        data = {
+            "jobId": self.id,
+            "kind": self.kind,
+            "priority": self.priority,
+            "status": self.status,
+            "progress": {"stage": self.stage, "completed": self.completed, "total": self.total},
+            "createdAt": self.created_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+            "error": self.error,
+        }
+        if include_result and self.status == SUCCEEDED:
+            data["result"] = self.result
+        return data
+
+
+class JobManager:
+    """
+    Runs long analyses and pipelines outside the HTTP request on a bounded pool
+    of worker threads. Higher priority jobs start first; finished jobs (and their
+    results) are kept for JOB_RESULT_TTL seconds, then their on_expire hook runs.
+
+    Jobs live in the memory of the worker process that accepted them, so clients
+    must poll the same worker (use sticky sessions with several uvicorn workers).
+    """
+    def __init__(self, workers: int = JOB_WORKERS, max_queued: int = JOB_MAX_QUEUED,
+                 result_ttl: float = JOB_RESULT_TTL):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self._jobs = {}
+        self._queue = queue.PriorityQueue()
+        # Jobs still waiting to start; the queue itself also holds cancelled ones
+        self._pending = 0
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def _ensure_workers(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker_loop, name=f"job-worker-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, kind: str, func, priority: int = 0, on_expire=None, admit=None) -> Job:
+        """
+        Queues func(report) to run on the pool. The function receives the job's
+        progress callback report(stage, completed, total), which raises
+        JobCancelled once the job has been cancelled. on_expire() is called when
+        the finished job is dropped, e.g. to delete files its result points to.
+        If given, admit(report) runs on the worker first (as the "admission" stage)
+        and returns a reservation, e.g. an admission Ticket, held while func runs.
+        """
+        self._purge_expired()
+        job = Job(kind, func, priority, on_expire, admit)
+        with self._lock:
+            if self._pending >= self.max_queued:
+                raise JobQueueFull(f"Too many queued jobs ({self.max_queued}). Try again later.")
+            self._pending += 1
+            self._jobs[job.id] = job
+        # PriorityQueue pops the smallest key; the sequence keeps FIFO order within a priority
+        self._queue.put((-priority, next(self._sequence), job.id))
+        self._ensure_workers()
+        return job
+
+    def get(self, job_id: str) -> Job:
+        self._purge_expired()
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            raise KeyError(f"Job '{job_id}' not found or expired.")
+        return job
+
+    def cancel(self, job_id: str) -> Job:
+        """Queued jobs are cancelled immediately; running jobs stop at their next progress report."""
+        job = self.get(job_id)
+        if job.status in FINISHED_STATES:
+            return job
+        job.cancel_event.set()
+        with self._lock:
+            if job.status == QUEUED:
+                self._pending -= 1
+                self._finish(job, CANCELLED)
+        return job
+
+    def _finish(self, job: Job, status: str, result=None, error: str = None):
+        job.status = status
+        job.result = result
+        job.error = error
+        job.func = None
+        job.admit = None
+        job.finished_at = time.time()
+        job.version += 1
+
+    def _purge_expired(self):
+        now = time.time()
+        with self._lock:
+            expired = [
+                job for job in self._jobs.values()
+                if job.finished_at is not None and now - job.finished_at > self.result_ttl
+            ]
+            for job in expired:
+                del self._jobs[job.id]
+        for job in expired:
+            if job.on_expire is not None:
+                try:
+                    job.on_expire()
+                except Exception:
+                    logger.exception("Cleanup of expired job %s (%s) failed", job.id, job.kind)
+
+    def _worker_loop(self):
+        while True:
+            _, _, job_id = self._queue.get()
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None or job.status != QUEUED:
+                    continue
+                self._pending -= 1
+                job.status = RUNNING
+                job.started_at = time.time()
+                job.version += 1
+
+            try:
+                reservation = nullcontext()
+                if job.admit is not None:
+                    job.report("admission", 0, None)
+                    reservation = job.admit(job.report)
+                with reservation:
+                    result = job.func(job.report)
+                self._finish(job, SUCCEEDED, result=result)
+            except JobCancelled:
+                self._finish(job, CANCELLED)
+            except Exception as e:
+                logger.exception("Job %s (%s) failed", job.id, job.kind)
+                if job.cancel_event.is_set():
+                    self._finish(job, CANCELLED)
+                else:
+                    self._finish(job, FAILED, error=str(e))
+
+
+job_manager = JobManager()
@@ -2,14 +2,24 @@
 import os
 import io
 import json
+import shutil
+import uuid
+from typing import List
+import asyncio
+import threading
+import time
 import traceback
+import importlib
 import logging
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse, FileResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from dotenv import load_dotenv
-import uvicorn
 import pandas as pd
 
 # ----------------------------
@@ -32,20 +42,28 @@ import pandas as pd
 # ----------------------------
 from app.analysis_utils import (
     read_uploaded_file_to_df,
-    get_kpis,
-    get_actionable_insights,
-    get_data_dictionary,
-    get_column_distribution,
-    get_time_series_data,
-    get_table_data,
-    get_data_health,
-    get_correlation_matrix
+    run_full_analysis
 )
 
 from app.core.workflow.workflow import WorkflowExecutor
+from app import dataset_store
+from app import metrics
+from app.incremental import append_rows
+from app.timeseries import get_measures_time_series
+from app.jobs import job_manager, JobQueueFull, FINISHED_STATES, JOB_UPLOAD_DIR
+from app import batch
+from app.sql_query import run_query, QueryTimeout
+from app.progressive import stream_progressive_analysis, stream_progressive_upload
+from app.compare import compare_datasets
+from app.admission import (
+    admission_controller,
+    AdmissionRejected,
+    estimate_upload_bytes,
+    estimate_dataset_bytes,
+)
 
 # ai agent factory & query functions (your implementation)
-from app.ai_agent import create_agent, query_agent
+from app.ai_agent import create_agent, query_agent, stream_agent, LLMNotConfigured, AGENT_IMPORTS
 
 # ----------------------------
 # Load environment
@@ -53,13 +71,42 @@ from app.ai_agent import create_agent, query_agent
 # Adjust dotenv_path if needed; this assumes a ../.env relative to backend/
 load_dotenv(dotenv_path="../.env")
 
+# ----------------------------
+# Startup warm-up
+# ----------------------------
+# Heavy subsystems (statsmodels, networkx, LangChain) are imported on first use so
+# a worker starts serving quickly. Set WARMUP_ON_STARTUP=1 to import them in a
+# background thread right after startup instead of on the first request.
+WARMUP_ON_STARTUP = os.environ.get("WARMUP_ON_STARTUP", "0") == "1"
+WARMUP_MODULES = ("networkx", "statsmodels.tsa.arima.model") + AGENT_IMPORTS
+
+logger = logging.getLogger(__name__)
+
+
+def _warm_up():
+    for module in WARMUP_MODULES:
+        start = time.perf_counter()
+        try:
+            importlib.import_module(module)
+            logger.info("Warmed up %s in %.2fs", module, time.perf_counter() - start)
+        except Exception as e:
+            logger.warning("Warm-up import of %s failed: %s", module, e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARMUP_ON_STARTUP:
+        threading.Thread(target=_warm_up, name="warm-up", daemon=True).start()
+    yield
+
 # ----------------------------
 # App & CORS
 # ----------------------------
 app = FastAPI(
     title="Data Analytics Platform API",
     description="API for processing files and running analytics dashboards & pipelines.",
-    version="2.0.0"
+    version="2.0.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -68,8 +115,38 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing", "X-Profile"],
 )
 
+# ----------------------------
+# Request instrumentation
+# ----------------------------
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    """
+    Records per-route latency for /metrics. Requests sent with ?profile=1 or an
+    `X-Profile: 1` header also get their stage breakdown back, as a Server-Timing
+    header and as JSON in an X-Profile header.
+    """
+    profiling = request.query_params.get("profile") == "1" or request.headers.get("x-profile") == "1"
+    token = metrics.start_profile() if profiling else None
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        elapsed = time.perf_counter() - start
+        route = request.scope.get("route")
+        metrics.observe_request(request.method, getattr(route, "path", "unmatched"), status_code, elapsed)
+        profile = metrics.stop_profile(token) if profiling else None
+
+    if profiling:
+        profile.append({"stage": "request", "status": str(status_code), "ms": round(elapsed * 1000, 3)})
+        response.headers["Server-Timing"] = metrics.server_timing_header(profile)
+        response.headers["X-Profile"] = json.dumps(profile, default=str)
+    return response
+
 # ----------------------------
 # In-memory agent storage (keeps the last created agent)
 # ----------------------------
@@ -81,72 +158,344 @@ agent_storage = {"agent": None}
 class QueryRequest(BaseModel):
     question: str
 
+
+class SQLQueryRequest(BaseModel):
+    query: str
+    offset: int = 0
+    limit: int = 100
+
+# ----------------------------
+# Shared dataset store helpers
+# ----------------------------
+def _store_upload(contents: bytes, file_name: str) -> str:
+    """Parses an upload into the shared dataset store (once per content) and returns its id."""
+    dataset_id = dataset_store.dataset_id_for(contents)
+    if not dataset_store.has_dataset(dataset_id):
+        # Use your robust reader (handles csv/xlsx etc.)
+        df = read_uploaded_file_to_df(contents, file_name)
+        dataset_store.put_dataframe(df, dataset_id, file_name)
+    return dataset_id
+
+
+async def _resolve_dataset(file: UploadFile, dataset_id: str) -> str:
+    """Returns the dataset id for a request that sends either a file or a dataset_id."""
+    if dataset_id:
+        if not dataset_store.has_dataset(dataset_id):
+            raise HTTPException(status_code=404, detail=f"Dataset '{dataset_id}' not found.")
+        return dataset_id
+    if file is None:
+        raise HTTPException(status_code=400, detail="Provide either a file or a dataset_id.")
+    contents = await file.read()
+    return await run_in_threadpool(_store_upload, contents, file.filename)
+
+# ----------------------------
+# Admission control (see app.admission)
+# ----------------------------
+def _input_bytes(file: UploadFile = None, dataset_id: str = None) -> int:
+    """Estimated peak memory for one request input (a stored dataset or an upload)."""
+    if dataset_id:
+        return estimate_dataset_bytes(dataset_id)
+    if file is not None:
+        return estimate_upload_bytes(file.size or 0, file.filename)
+    return 0
+
+
+async def _admit(route: str, estimated_bytes: int):
+    """Returns the request's admission ticket, or raises 429 / 413 when it can't run now."""
+    try:
+        return await admission_controller.admit(route, estimated_bytes)
+    except AdmissionRejected as e:
+        headers = {"Retry-After": str(e.retry_after)} if e.retry_after else None
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=headers)
+
+
+@asynccontextmanager
+async def _admitted(route: str, estimated_bytes: int):
+    with await _admit(route, estimated_bytes):
+        yield
+
+# ----------------------------
+# Dataset store endpoints
+# ----------------------------
+@app.post("/api/v1/datasets")
+async def upload_dataset(file: UploadFile = File(...)):
+    try:
+        async with _admitted("datasets", _input_bytes(file)):
+            dataset_id = await _resolve_dataset(file, None)
+        return dataset_store.get_metadata(dataset_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/v1/datasets/{dataset_id}")
+def get_dataset(dataset_id: str):
+    try:
+        return dataset_store.get_metadata(dataset_id)
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.delete("/api/v1/datasets/{dataset_id}")
+def delete_dataset(dataset_id: str):
+    try:
+        dataset_store.get_metadata(dataset_id)
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    dataset_store.delete_dataset(dataset_id)
+    return {"success": True}
+
+@app.post("/api/v1/datasets/{dataset_id}/append")
+async def append_to_dataset(
+    dataset_id: str,
+    file: UploadFile = File(...),
+    col_dist_target: str = Form(None),
+    col_time_target: str = Form(None)
+):
+    """
+    Appends an increment to a stored dataset and returns the refreshed dashboard,
+    updated from stored partial aggregates instead of recomputed over all rows.
+    Appending to an uploaded dataset forks it, so use the returned datasetId afterwards.
+    """
+    try:
+        dataset_store.get_metadata(dataset_id)
+    except (KeyError, ValueError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    try:
+        async with _admitted("append", _input_bytes(file)):
+            contents = await file.read()
+            new_df = await run_in_threadpool(read_uploaded_file_to_df, contents, file.filename)
+            return await run_in_threadpool(append_rows, dataset_id, new_df, col_dist_target, col_time_target)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/v1/datasets/{dataset_id}/sql")
+async def query_dataset(dataset_id: str, request: SQLQueryRequest):
+    """
+    Runs a read-only SQL query (DuckDB dialect) over a stored dataset, available
+    as the table `dataset`, and returns one page of the result. Results are
+    cached, so fetching further pages (offset/limit) doesn't rerun the query.
+    """
+    try:
+        async with _admitted("sql", _input_bytes(dataset_id=dataset_id)):
+            return await run_in_threadpool(run_query, dataset_id, request.query, request.offset, request.limit)
+    except HTTPException:
+        raise
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except QueryTimeout as e:
+        raise HTTPException(status_code=408, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/api/v1/datasets/compare")
+async def compare_dataset_versions(
+    base_file: UploadFile = File(None),
+    new_file: UploadFile = File(None),
+    base_dataset_id: str = Form(None),
+    new_dataset_id: str = Form(None),
+    key: str = Form(None)
+):
+    """
+    Diffs two versions of a dataset (each sent as a file or a dataset id): schema
+    drift, added / removed / changed rows and per-column null-rate and distribution
+    shifts. `key` (comma-separated columns) identifies rows; without it an id-like
+    unique column is used, and changed rows are only reported when one is found.
+    """
+    try:
+        estimated = _input_bytes(base_file, base_dataset_id) + _input_bytes(new_file, new_dataset_id)
+        async with _admitted("compare", estimated):
+            base_id = await _resolve_dataset(base_file, base_dataset_id)
+            new_id = await _resolve_dataset(new_file, new_dataset_id)
+            return await run_in_threadpool(compare_datasets, base_id, new_id, _split_list(key))
+    except HTTPException:
+        raise
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
 # ----------------------------
 # Endpoint 1: analyze file (unchanged logic, uses read_uploaded_file_to_df)
 # ----------------------------
 @app.post("/api/v1/analyze")
 async def analyze_file(
-    file: UploadFile = File(...),
+    file: UploadFile = File(None),
     col_dist_target: str = Form(None),
-    col_time_target: str = Form(None)
+    col_time_target: str = Form(None),
+    dataset_id: str = Form(None)
 ):
     try:
-        contents = await file.read()
-        # Use your robust reader (handles csv/xlsx etc.)
-        df = read_uploaded_file_to_df(contents, file.filename)
-
-        # Run analysis functions
-        kpis = get_kpis(df)
-        correlation_result = get_correlation_matrix(df)
-        time_series_result = get_time_series_data(df, target_column=col_time_target)
-        insights = get_actionable_insights(df, kpis, correlation_result['matrix'])
-
-        response_data = {
-            "kpiData": kpis,
-            "insights": insights,
-            "dictionary": get_data_dictionary(df),
-            "columnDist": get_column_distribution(df, target_column=col_dist_target),
-            "timeSeries": time_series_result,
-            "tableData": get_table_data(df),
-            "dataHealth": get_data_health(df),
-            "correlationMatrix": {
-                "columns": correlation_result['columns'],
-                "data": correlation_result['data']
-            }
-        }
+        async with _admitted("analyze", _input_bytes(file, dataset_id)):
+            dataset_id = await _resolve_dataset(file, dataset_id)
+            df = dataset_store.get_dataframe(dataset_id)
+
+            # Run analysis functions (off the event loop, so queued requests can be turned away meanwhile)
+            response_data = {"datasetId": dataset_id}
+            response_data.update(await run_in_threadpool(
+                run_full_analysis, df, col_dist_target=col_dist_target, col_time_target=col_time_target
+            ))
 
         return response_data
 
+    except HTTPException:
+        raise
     except Exception as e:
         # Print full traceback to console for easier debugging in dev
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+# ----------------------------
+# Progressive analysis (Server-Sent Events)
+# ----------------------------
+@app.post("/api/v1/analyze/progressive")
+async def analyze_file_progressive(
+    request: Request,
+    file: UploadFile = File(None),
+    col_dist_target: str = Form(None),
+    col_time_target: str = Form(None),
+    dataset_id: str = Form(None)
+):
+    """
+    Streams the dashboard as it is computed: an "approximate" event with the KPI,
+    correlation, distribution and data health sections estimated from a stratified
+    sample (with confidence intervals), then one "section" event per exact section
+    and a final "done". Small datasets skip the approximate event.
+
+    The first event is independent of the dataset size only for dataset_id
+    requests. A file is parsed and stored inside the stream: it opens with a
+    "progress" event (stage "parsing") and, for a large CSV, an approximate event
+    sampled from the raw file before the parse (see app.progressive).
+    """
+    if not dataset_id and file is None:
+        raise HTTPException(status_code=400, detail="Provide either a file or a dataset_id.")
+    # The ticket is held until the stream ends
+    ticket = await _admit("analyze_progressive", _input_bytes(file, dataset_id))
+    try:
+        if dataset_id:
+            dataset_id = await _resolve_dataset(None, dataset_id)
+            contents = None
+        else:
+            contents = await file.read()
+    except HTTPException:
+        ticket.release()
+        raise
+    except Exception as e:
+        ticket.release()
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+    def run(emit, cancel_event):
+        if contents is None:
+            stream_progressive_analysis(dataset_id, emit, cancel_event, col_dist_target=col_dist_target,
+                                        col_time_target=col_time_target)
+        else:
+            stream_progressive_upload(contents, file.filename, _store_upload, emit, cancel_event,
+                                      col_dist_target=col_dist_target, col_time_target=col_time_target)
+
+    async def events():
+        with ticket:
+            async for message in _relay_events(request, run, ("done", "error", "cancelled")):
+                yield message
+
+    # The background task covers a stream that is torn down before it starts
+    return _sse_response(events(), background=BackgroundTask(ticket.release))
+
+# ----------------------------
+# Multi-measure time series
+# ----------------------------
+def _split_list(value: str):
+    """Parses a comma-separated form field; empty means "use the default"."""
+    if not value:
+        return None
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+@app.post("/api/v1/timeseries")
+async def time_series(
+    file: UploadFile = File(None),
+    dataset_id: str = Form(None),
+    date_column: str = Form(None),
+    measures: str = Form(None),
+    granularity: str = Form("month"),
+    aggs: str = Form("sum"),
+    forecast: bool = Form(True),
+    forecast_steps: int = Form(None),
+    forecast_budget: float = Form(None)
+):
+    """
+    Aggregates several numeric measures (comma-separated; default all numeric
+    columns) at day, week, month or quarter granularity with any of sum, mean,
+    count, min and max, and forecasts every resulting series in parallel.
+    forecast_budget (seconds) bounds the forecasting time; see app.forecasting.
+    """
+    try:
+        async with _admitted("timeseries", _input_bytes(file, dataset_id)):
+            dataset_id = await _resolve_dataset(file, dataset_id)
+            df = dataset_store.get_dataframe(dataset_id)
+            response_data = {"datasetId": dataset_id}
+            response_data.update(await run_in_threadpool(
+                get_measures_time_series, df, date_column, _split_list(measures), granularity,
+                _split_list(aggs), forecast, forecast_steps, forecast_budget
+            ))
+        return response_data
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
 # ----------------------------
 # Endpoint 2: run workflow (pipeline builder)
 # ----------------------------
 @app.post("/workflow/run/")
 async def run_workflow(
-    file: UploadFile = File(...),
-    pipeline_json: str = Form(...)
+    file: UploadFile = File(None),
+    pipeline_json: str = Form(...),
+    dataset_id: str = Form(None)
 ):
     try:
-        file_contents = await file.read()
-        pipeline_data = json.loads(pipeline_json)
-        nodes_list = pipeline_data.get('nodes', [])
-        edges_list = pipeline_data.get('edges', [])
+        async with _admitted("workflow", _input_bytes(file, dataset_id)):
+            # A stored dataset is attached instead of re-parsing the upload
+            dataset_id = await _resolve_dataset(file, dataset_id)
+            file_name = file.filename if file is not None else dataset_store.get_metadata(dataset_id)["fileName"]
+            pipeline_data = json.loads(pipeline_json)
+            nodes_list = pipeline_data.get('nodes', [])
+            edges_list = pipeline_data.get('edges', [])
 
-        executor = WorkflowExecutor(
-            nodes=nodes_list,
-            edges=edges_list,
-            file_contents=file_contents,
-            file_name=file.filename
-        )
+            executor = WorkflowExecutor(
+                nodes=nodes_list,
+                edges=edges_list,
+                file_contents=None,
+                file_name=file_name,
+                dataset_id=dataset_id
+            )
 
-        result = executor.run()
+            result = await run_in_threadpool(executor.run)
 
         return {"success": True, "result": result}
 
+    except HTTPException:
+        raise
+    except ValueError as e:
+        # Invalid pipeline: cycles, unknown node types, bad node params or expressions
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
@@ -161,20 +510,26 @@ async def chat_with_file(
     question: str = Form(...)
 ):
     try:
-        contents = await file.read()
+        # Only parsing the upload is gated; the LLM calls below mostly wait on the network
+        async with _admitted("chat", _input_bytes(file)):
+            contents = await file.read()
 
-        # Create the agent using your ai_agent.create_agent implementation
-        agent = create_agent(contents, file.filename)
+            # Create the agent using your ai_agent.create_agent implementation
+            agent = await run_in_threadpool(create_agent, contents, file.filename)
         if agent is None:
             raise HTTPException(status_code=500, detail="Could not create AI agent.")
 
         # Store agent in memory for subsequent queries (query_agent endpoint)
         agent_storage["agent"] = agent
 
-        # Query the agent immediately for the returned answer
-        answer = query_agent(agent, question)
+        # Query the agent immediately for the returned answer (off the event loop)
+        answer = await run_in_threadpool(query_agent, agent, question)
         return {"answer": answer}
 
+    except HTTPException:
+        raise
+    except LLMNotConfigured as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error in chat: {e}")
@@ -194,21 +549,361 @@ async def handle_agent_query(request: QueryRequest):
         )
 
     try:
-        answer = query_agent(agent, user_question)
+        answer = await run_in_threadpool(query_agent, agent, user_question)
         return {"answer": answer}
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
 
+# ----------------------------
+# Streaming chat (Server-Sent Events)
+# ----------------------------
+async def _relay_events(request: Request, run, final_events: tuple):
+    """
+    Runs run(emit, cancel_event) in a worker thread and relays its events as SSE
+    messages until one of final_events. When the client disconnects, cancel_event is set.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    cancel_event = threading.Event()
+
+    def emit(event):
+        loop.call_soon_threadsafe(queue.put_nowait, event)
+
+    loop.run_in_executor(None, run, emit, cancel_event)
+    try:
+        while True:
+            try:
+                event = await asyncio.wait_for(queue.get(), timeout=1.0)
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                # Comment line keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+                continue
+
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            if event["type"] in final_events:
+                break
+    finally:
+        # Also reached when the response is torn down because the client went away
+        cancel_event.set()
+
+
+def _agent_event_stream(request: Request, agent, question: str):
+    """Streams an agent run; it is cancelled at its next token or tool call once the client disconnects."""
+    return _relay_events(request, lambda emit, cancel_event: stream_agent(agent, question, emit, cancel_event),
+                         ("final", "error", "cancelled"))
+
+
+def _sse_response(generator, background: BackgroundTask = None) -> StreamingResponse:
+    return StreamingResponse(
+        generator,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=background,
+    )
+
+
+@app.post("/api/v1/chat/stream")
+async def stream_chat_with_file(
+    request: Request,
+    file: UploadFile = File(...),
+    question: str = Form(...)
+):
+    try:
+        async with _admitted("chat", _input_bytes(file)):
+            contents = await file.read()
+            agent = await run_in_threadpool(create_agent, contents, file.filename)
+    except LLMNotConfigured as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if agent is None:
+        raise HTTPException(status_code=500, detail="Could not create AI agent.")
+
+    agent_storage["agent"] = agent
+    return _sse_response(_agent_event_stream(request, agent, question))
+
+
+@app.post("/query_agent/stream")
+async def stream_agent_query(request: Request, query: QueryRequest):
+    agent = agent_storage.get("agent")
+    if agent is None:
+        raise HTTPException(
+            status_code=400,
+            detail="Agent not initialized. Please upload a file first (use /api/v1/chat)."
+        )
+
+    return _sse_response(_agent_event_stream(request, agent, query.question))
+
+# ----------------------------
+# Background jobs (long-running analyses and pipelines)
+# ----------------------------
+class _JobInput:
+    """A job's dataset: a stored dataset_id, or an upload spooled to disk until the job parses it."""
+    def __init__(self, dataset_id: str = None, path: str = None, file_name: str = None):
+        self.dataset_id = dataset_id
+        self.path = path
+        self.file_name = file_name
+
+    def load(self) -> str:
+        """Runs in the job: stores the spooled upload (then deletes it) and returns the dataset id."""
+        if self.dataset_id:
+            return self.dataset_id
+        try:
+            with open(self.path, "rb") as f:
+                contents = f.read()
+            return _store_upload(contents, self.file_name)
+        finally:
+            self.discard()
+
+    def estimated_bytes(self) -> int:
+        if self.dataset_id:
+            return estimate_dataset_bytes(self.dataset_id)
+        return estimate_upload_bytes(os.path.getsize(self.path), self.file_name)
+
+    def discard(self):
+        if self.path:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+
+async def _job_input(file: UploadFile, dataset_id: str) -> _JobInput:
+    """
+    Validates the job's input in the request, but leaves parsing the upload to
+    the job itself so big files don't hold the HTTP request open. Uploads are
+    spooled to JOB_UPLOAD_DIR, so queued jobs don't hold them in memory.
+    """
+    if dataset_id:
+        if not dataset_store.has_dataset(dataset_id):
+            raise HTTPException(status_code=404, detail=f"Dataset '{dataset_id}' not found.")
+        return _JobInput(dataset_id=dataset_id)
+    if file is None:
+        raise HTTPException(status_code=400, detail="Provide either a file or a dataset_id.")
+
+    name = os.path.basename(file.filename or "upload")
+    path = os.path.join(JOB_UPLOAD_DIR, f"{uuid.uuid4().hex}-{name}")
+
+    def spool():
+        os.makedirs(JOB_UPLOAD_DIR, exist_ok=True)
+        with open(path, "wb") as f:
+            shutil.copyfileobj(file.file, f)
+
+    await run_in_threadpool(spool)
+    return _JobInput(path=path, file_name=file.filename)
+
+
+def _submit_job(kind: str, func, priority: int, estimated_bytes: int, on_expire=None) -> dict:
+    """
+    Queues a job; call it from the event loop. The job's worker reserves
+    estimated_bytes from the admission budget before running it, waiting while
+    requests and other jobs hold the memory.
+    """
+    loop = asyncio.get_running_loop()
+
+    def admit(report):
+        return admission_controller.admit_from_thread(loop, f"job_{kind}", estimated_bytes,
+                                                      on_wait=lambda: report("admission", 0, None))
+
+    try:
+        job = job_manager.submit(kind, func, priority=priority, on_expire=on_expire, admit=admit)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return {"jobId": job.id, "status": job.status}
+
+
+def _submit_job_with_input(kind: str, func, priority: int, job_input: _JobInput) -> dict:
+    """Submits a job reading job_input; the spooled upload goes when the job does."""
+    try:
+        return _submit_job(kind, func, priority, job_input.estimated_bytes(), on_expire=job_input.discard)
+    except HTTPException:
+        job_input.discard()
+        raise
+
+
+@app.post("/api/v1/jobs/analyze")
+async def submit_analyze_job(
+    file: UploadFile = File(None),
+    col_dist_target: str = Form(None),
+    col_time_target: str = Form(None),
+    dataset_id: str = Form(None),
+    priority: int = Form(0)
+):
+    job_input = await _job_input(file, dataset_id)
+
+    def work(report):
+        report("load", 0, None)
+        job_dataset_id = job_input.load()
+        df = dataset_store.get_dataframe(job_dataset_id)
+        result = {"datasetId": job_dataset_id}
+        result.update(run_full_analysis(df, col_dist_target=col_dist_target,
+                                        col_time_target=col_time_target, progress=report))
+        return result
+
+    return _submit_job_with_input("analyze", work, priority, job_input)
+
+
+@app.post("/api/v1/jobs/workflow")
+async def submit_workflow_job(
+    file: UploadFile = File(None),
+    pipeline_json: str = Form(...),
+    dataset_id: str = Form(None),
+    priority: int = Form(0)
+):
+    try:
+        pipeline_data = json.loads(pipeline_json)
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid pipeline_json: {e}")
+    job_input = await _job_input(file, dataset_id)
+
+    def work(report):
+        report("load", 0, None)
+        job_dataset_id = job_input.load()
+        executor = WorkflowExecutor(
+            nodes=pipeline_data.get('nodes', []),
+            edges=pipeline_data.get('edges', []),
+            file_contents=None,
+            file_name=dataset_store.get_metadata(job_dataset_id)["fileName"],
+            dataset_id=job_dataset_id
+        )
+        return {"success": True, "result": executor.run(progress=report)}
+
+    return _submit_job_with_input("workflow", work, priority, job_input)
+
+
+@app.post("/api/v1/batch")
+async def submit_batch_job(
+    files: List[UploadFile] = File(...),
+    pipeline_json: str = Form(...),
+    priority: int = Form(0)
+):
+    """
+    Runs one pipeline over every uploaded file as a background job. Poll
+    /api/v1/jobs/{jobId} for progress; the result lists every file's outcome,
+    and outputs are downloaded from /api/v1/batch/{batchId}/files/{name}.
+    """
+    try:
+        executor = batch.compile_pipeline(json.loads(pipeline_json))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid pipeline: {e}")
+
+    batch_id = uuid.uuid4().hex
+    batch_dir = os.path.join(batch.BATCH_OUTPUT_DIR, batch_id)
+    input_dir = os.path.join(batch_dir, "inputs")
+    output_dir = os.path.join(batch_dir, "results")
+    names = {}
+
+    def save_uploads():
+        # Backstop for batches whose job record was lost with a restarted worker
+        batch.remove_stale_outputs(job_manager.result_ttl)
+        os.makedirs(input_dir)
+        for i, upload in enumerate(files):
+            # Prefix keeps same-named uploads apart; the name's extension picks the reader
+            name = os.path.basename(upload.filename or "upload")
+            path = os.path.join(input_dir, f"{i:05d}-{name}")
+            with open(path, "wb") as f:
+                shutil.copyfileobj(upload.file, f)
+            names[path] = name
+
+    await run_in_threadpool(save_uploads)
+    paths = list(names)
+    # The batch parses up to BATCH_WORKERS files at a time
+    estimates = sorted((estimate_upload_bytes(os.path.getsize(path), name) for path, name in names.items()),
+                       reverse=True)
+    estimated_bytes = sum(estimates[:max(1, batch.BATCH_WORKERS)])
+
+    def work(report):
+        # Outputs age from when the batch starts, not from when it was queued
+        os.utime(batch_dir)
+        try:
+            summary = batch.run_batch(executor, paths, output_dir, progress=report)
+        finally:
+            shutil.rmtree(input_dir, ignore_errors=True)
+        with open(summary["manifest"]) as f:
+            entries = [json.loads(line) for line in f]
+        for entry in entries:
+            entry["file"] = names.get(entry["file"], entry["file"])
+        return {"batchId": batch_id, "files": summary["files"], "succeeded": summary["succeeded"],
+                "failed": summary["failed"], "seconds": summary["seconds"], "results": entries}
+
+    def remove_outputs():
+        shutil.rmtree(batch_dir, ignore_errors=True)
+
+    try:
+        # Outputs are downloadable for as long as the job's result is kept
+        response = _submit_job("batch", work, priority, estimated_bytes, on_expire=remove_outputs)
+    except HTTPException:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        raise
+    response["batchId"] = batch_id
+    return response
+
+
+@app.get("/api/v1/batch/{batch_id}/files/{name}")
+def download_batch_output(batch_id: str, name: str):
+    if not batch_id.isalnum() or os.path.basename(name) != name or name.startswith("."):
+        raise HTTPException(status_code=400, detail="Invalid batch id or file name.")
+    path = os.path.join(batch.BATCH_OUTPUT_DIR, batch_id, "results", name)
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail=f"No output '{name}' in batch '{batch_id}'.")
+    return FileResponse(path, filename=name)
+
+
+def _get_job_or_404(job_id: str):
+    try:
+        return job_manager.get(job_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.get("/api/v1/jobs/{job_id}")
+def get_job(job_id: str):
+    return _get_job_or_404(job_id).to_dict()
+
+
+@app.get("/api/v1/jobs/{job_id}/events")
+async def stream_job_progress(request: Request, job_id: str):
+    job = _get_job_or_404(job_id)
+
+    async def events():
+        last_version = -1
+        while not await request.is_disconnected():
+            if job.version != last_version:
+                last_version = job.version
+                finished = job.status in FINISHED_STATES
+                payload = job.to_dict(include_result=finished)
+                yield f"event: {'result' if finished else 'progress'}\ndata: {json.dumps(payload, default=str)}\n\n"
+                if finished:
+                    break
+            await asyncio.sleep(0.25)
+
+    return _sse_response(events())
+
+
+@app.delete("/api/v1/jobs/{job_id}")
+def cancel_job(job_id: str):
+    _get_job_or_404(job_id)
+    return job_manager.cancel(job_id).to_dict(include_result=False)
+
+# ----------------------------
+# Prometheus metrics
+# ----------------------------
+@app.get("/metrics")
+def get_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type="text/plain; version=0.0.4")
+
 # ----------------------------
 # Root health endpoint
 # ----------------------------
 @app.get("/")
 def read_root():
-    return {"status": "Backend server is running!"}
+    return {"status": "Backend server is running!", "admission": admission_controller.stats()}
 
 # ----------------------------
 # Run
 # ----------------------------
 if __name__ == "__main__":
+    import uvicorn
+
     uvicorn.run("app.main:app", host="127.0.0.1", port=8000, reload=True)
\ No newline at end of file
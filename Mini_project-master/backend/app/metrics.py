@@ -0,0 +1,152 @@
+import bisect
+import contextvars
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------
+# Timing spans and Prometheus-style metrics
+# ----------------------------
+# span() times one stage of work (ingestion, an analysis section, a workflow node,
+# an agent call). Every span feeds a latency histogram and, when it carries rows
+# or bytes, throughput counters. All of it is exposed by /metrics. Metrics are per
+# process; with several uvicorn workers, scrape each one or aggregate them downstream.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # name -> {"help", "type", "series": {labels_tuple: Histogram | float}}
+        self._metrics = {}
+
+    def _series(self, name: str, kind: str, help_text: str, labels: dict):
+        metric = self._metrics.setdefault(name, {"help": help_text, "type": kind, "series": {}})
+        return metric["series"], tuple(sorted(labels.items()))
+
+    def observe(self, name: str, value: float, labels: dict, help_text: str = ""):
+        with self._lock:
+            series, key = self._series(name, "histogram", help_text, labels)
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name: str, value: float, labels: dict, help_text: str = ""):
+        with self._lock:
+            series, key = self._series(name, "counter", help_text, labels)
+            series[key] = series.get(key, 0.0) + value
+
+    def render(self) -> str:
+        """Renders every metric in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            for name, metric in sorted(self._metrics.items()):
+                lines.append(f"# HELP {name} {metric['help']}")
+                lines.append(f"# TYPE {name} {metric['type']}")
+                for key, value in sorted(metric["series"].items()):
+                    if metric["type"] == "counter":
+                        lines.append(f"{name}{_format_labels(key)} {value}")
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(value.buckets, value.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(key + (('le', repr(bound)),))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(key + (('le', '+Inf'),))} {value.count}")
+                    lines.append(f"{name}_sum{_format_labels(key)} {value.sum}")
+                    lines.append(f"{name}_count{_format_labels(key)} {value.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def _format_labels(items) -> str:
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label(v)}"' for k, v in items) + "}"
+
+
+registry = MetricsRegistry()
+
+# Active per-request profile (a list of finished spans), or None when profiling is off
+_profile = contextvars.ContextVar("dap_profile", default=None)
+
+
+@contextmanager
+def span(stage: str, **attributes):
+    """
+    Times the enclosed block as one stage. Yields a dict of attributes (e.g. rows,
+    bytes, dataset size) that the block may add to before it finishes.
+    """
+    attrs = dict(attributes)
+    status = "ok"
+    start = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        registry.observe("dap_stage_duration_seconds", elapsed, {"stage": stage, "status": status},
+                         "Duration of instrumented processing stages.")
+        if "rows" in attrs:
+            registry.inc("dap_stage_rows_total", attrs["rows"], {"stage": stage},
+                         "Rows processed by instrumented stages.")
+        if "bytes" in attrs:
+            registry.inc("dap_stage_bytes_total", attrs["bytes"], {"stage": stage},
+                         "Bytes processed by instrumented stages.")
+
+        record = {"stage": stage, "status": status, "ms": round(elapsed * 1000, 3), **attrs}
+        profile = _profile.get()
+        if profile is not None:
+            profile.append(record)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(json.dumps(record, default=str))
+
+
+def observe_request(method: str, route: str, status_code: int, elapsed: float):
+    registry.observe("dap_http_request_duration_seconds", elapsed,
+                     {"method": method, "route": route, "status": str(status_code)},
+                     "HTTP request latency by route.")
+
+
+def start_profile():
+    """Starts collecting spans for the current request; returns a token for stop_profile."""
+    return _profile.set([])
+
+
+def stop_profile(token) -> list:
+    profile = _profile.get()
+    _profile.reset(token)
+    return profile or []
+
+
+def server_timing_header(profile: list) -> str:
+    """Summarises a profile as a Server-Timing header (shown by browser dev tools)."""
+    totals = {}
+    for record in profile:
+        totals[record["stage"]] = totals.get(record["stage"], 0.0) + record["ms"]
+    return ", ".join(
+        f'{stage.replace(" ", "_").replace("/", "_")};dur={ms:.1f}' for stage, ms in totals.items()
+    )
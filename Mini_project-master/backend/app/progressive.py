@@ -0,0 +1,378 @@
+import io
+import logging
+import math
+import os
+
+import numpy as np
+import pandas as pd
+
+from app import dataset_store
+from app.analysis_utils import (
+    get_kpis,
+    get_correlation_matrix,
+    get_column_distribution,
+    run_full_analysis,
+)
+from app.metrics import span
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------
+# Progressive (sample-first) analysis
+# ----------------------------
+# A first dashboard is computed from a stratified sample of the stored dataset:
+# only the sampled rows are taken from the memory-mapped Arrow table and
+# converted to pandas, so it costs about the same for 1 GB as for 10 MB. The
+# sample is stratified on the distribution column (rows sorted by category, then
+# drawn at a fixed stride), so every category keeps its share of the sample.
+#
+# Approximate sections carry 95% confidence intervals:
+#   - missing values / completeness   per-row missing share, normal approximation
+#   - duplicates                      sample duplicates scaled by 1/f² (a pair is only seen
+#                                     when both rows are sampled); Poisson interval
+#   - category counts                 binomial proportion; +-1/f for the stratification column
+#   - correlations                    Fisher z-transform
+# Every interval uses the finite population correction, so it closes as the
+# sample approaches the full dataset.
+#
+# The exact sections then follow one by one from run_full_analysis().
+#
+# That size independence only holds for dataset_id requests. A file upload must
+# be parsed and stored before the stratified sample can be drawn, which takes
+# time proportional to the file. For uploads the stream therefore opens with a
+# "progress" event (stage "parsing") and, for CSV, an approximate event read
+# from evenly spaced blocks of the raw file (see sample_csv_upload): a cluster
+# sample with an estimated row count, so its intervals are only indicative.
+
+# --- Configuration (overridable through the environment) ---
+PROGRESSIVE_SAMPLE_ROWS = int(os.environ.get("PROGRESSIVE_SAMPLE_ROWS", "50000"))
+# Evenly spaced blocks an unparsed CSV upload is sampled from
+PROGRESSIVE_UPLOAD_BLOCKS = int(os.environ.get("PROGRESSIVE_UPLOAD_BLOCKS", "20"))
+
+CONFIDENCE = 0.95
+_Z = 1.959964  # two-sided normal quantile for CONFIDENCE
+APPROXIMATE_SECTIONS = ["kpiData", "correlationMatrix", "columnDist", "dataHealth"]
+
+
+class AnalysisCancelled(Exception):
+    """Raised inside the analysis once the client has gone away."""
+
+
+def _strata_column(table, target_column: str = None):
+    """The column get_column_distribution() will show: the target, else the first text column."""
+    import pyarrow as pa
+
+    if target_column is not None:
+        if target_column not in table.column_names:
+            raise ValueError(f"Column '{target_column}' not found in file.")
+        return target_column
+    for field in table.schema:
+        value_type = field.type.value_type if pa.types.is_dictionary(field.type) else field.type
+        if pa.types.is_string(value_type) or pa.types.is_large_string(value_type):
+            return field.name
+    return None
+
+
+def stratified_sample_indices(n: int, sample_rows: int, strata: np.ndarray = None, seed: int = 0) -> np.ndarray:
+    """
+    Sorted row positions of a proportionally stratified sample: rows are ordered
+    by stratum (randomly within one) and taken at a fixed stride, so each stratum
+    gets its share of the sample up to one row. Without strata it is a simple
+    random sample.
+    """
+    rng = np.random.default_rng(seed)
+    if sample_rows <= 0:
+        return np.array([], dtype=np.int64)
+    order = np.lexsort((rng.random(n), strata)) if strata is not None else rng.permutation(n)
+    positions = (np.arange(sample_rows) * (n / sample_rows) + rng.random() * (n / sample_rows)).astype(np.int64)
+    return np.sort(order[np.minimum(positions, n - 1)])
+
+
+def _fpc(n: int, total: int) -> float:
+    return math.sqrt(max(0.0, 1 - n / total)) if total else 0.0
+
+
+def _interval(estimate: float, margin: float, low: float = 0.0, high: float = math.inf) -> list:
+    return [max(low, estimate - margin), min(high, estimate + margin)]
+
+
+def _approximate_quality(sample: pd.DataFrame, total: int) -> dict:
+    """Estimates of the missing-value and duplicate counts of the full dataset."""
+    n, columns = len(sample), max(len(sample.columns), 1)
+    fpc = _fpc(n, total)
+
+    # Cells of one row aren't independent, so the share is averaged per row
+    row_missing = sample.isnull().sum(axis=1).to_numpy() / columns
+    missing_share = float(row_missing.mean()) if n else 0.0
+    missing_margin = _Z * float(row_missing.std(ddof=1)) / math.sqrt(n) * fpc if n > 1 else 0.0
+
+    f = n / total if total else 1.0
+    sample_duplicates = int(sample.duplicated().sum())
+    duplicates = min(total - 1, sample_duplicates / (f * f)) if total else 0
+    # No duplicate in the sample still leaves room for up to 3 pairs (rule of three)
+    seen = _Z * math.sqrt(sample_duplicates) if sample_duplicates else 3.0
+    duplicates_margin = seen / (f * f) * fpc
+
+    return {
+        "missingShare": missing_share,
+        "missingShareInterval": _interval(missing_share, missing_margin, high=1.0),
+        "missingValues": missing_share * total * len(sample.columns),
+        "duplicates": max(0.0, duplicates),
+        "duplicatesInterval": _interval(duplicates, duplicates_margin, high=max(total - 1, 0)),
+    }
+
+
+def _approximate_kpis(sample: pd.DataFrame, total: int, quality: dict) -> dict:
+    kpis = get_kpis(sample)
+    quality_score = (1 - quality["missingShare"]) * 100
+    quality_low, quality_high = ((1 - share) * 100 for share in reversed(quality["missingShareInterval"]))
+    duplicates = round(quality["duplicates"])
+    missing_values = round(quality["missingValues"])
+    kpis.update({
+        "totalRecords": f"{total:,}",
+        "dataQuality": f"{quality_score:.1f}%",
+        "dataQualityDelta": f"~{missing_values:,} missing",
+        "anomalies": f"~{duplicates:,}",
+        "anomaliesDelta": f"{(duplicates / total * 100 if total else 0):.1f}% duplicate",
+        "anomaliesDeltaType": "negative" if duplicates > 0 else "positive",
+        "intervals": {
+            "dataQuality": [round(quality_low, 2), round(quality_high, 2)],
+            "anomalies": [round(v) for v in quality["duplicatesInterval"]],
+        },
+    })
+    return kpis
+
+
+def _approximate_health(total: int, columns: int, quality: dict) -> list:
+    completeness = (1 - quality["missingShare"]) * 100
+    completeness_interval = [round((1 - share) * 100, 2) for share in reversed(quality["missingShareInterval"])]
+    duplicates = round(quality["duplicates"])
+    duplicates_interval = [round(v) for v in quality["duplicatesInterval"]]
+    duplicate_percent = duplicates / total * 100 if total else 0
+    missing_values = round(quality["missingValues"])
+    missing_interval = [round(total * columns * share) for share in quality["missingShareInterval"]]
+    return [
+        {"metric": "Completeness", "value": f"{completeness:.1f}%",
+         "status": "positive" if completeness > 95 else "neutral", "interval": completeness_interval},
+        {"metric": "Uniqueness", "value": f"{(100 - duplicate_percent):.1f}%",
+         "status": "positive" if duplicates == 0 else "negative",
+         "interval": [round(100 - d / total * 100, 2) if total else 100.0 for d in reversed(duplicates_interval)]},
+        {"metric": "Total Duplicates", "value": f"~{duplicates:,}",
+         "status": "positive" if duplicates == 0 else "negative", "interval": duplicates_interval},
+        {"metric": "Missing Values", "value": f"~{missing_values:,}",
+         "status": "positive" if missing_values == 0 else "negative", "interval": missing_interval},
+    ]
+
+
+def _approximate_distribution(sample: pd.DataFrame, total: int, target_column: str, strata_column: str) -> dict:
+    distribution = get_column_distribution(sample, target_column=target_column)
+    n = len(sample)
+    if not n or not total:
+        return distribution
+    scale = total / n
+    fpc = _fpc(n, total)
+    for item in distribution["chartData"]:
+        count = item["value"]
+        estimate = count * scale
+        if distribution["columnName"] == strata_column:
+            # Proportional allocation: each category's count is off by at most one sampled row
+            margin = scale * fpc
+        else:
+            share = count / n
+            margin = _Z * math.sqrt(share * (1 - share) / n) * fpc * total
+        item["value"] = int(round(estimate))
+        item["interval"] = [int(v) for v in np.round(_interval(estimate, margin, high=total))]
+    return distribution
+
+
+def _approximate_correlation(sample: pd.DataFrame, total: int) -> dict:
+    result = get_correlation_matrix(sample)
+    if not result["columns"]:
+        return {"columns": [], "data": [], "intervals": []}
+    present = sample[result["columns"]].notna().to_numpy(dtype='float64')
+    pairs = present.T @ present  # pairwise-complete rows, as DataFrame.corr() uses
+    fpc = _fpc(len(sample), total)
+
+    intervals = []
+    for i, j, r in result["data"]:
+        n = pairs[i, j]
+        if i == j or n <= 3 or not np.isfinite(r) or abs(r) >= 1:
+            intervals.append([i, j, r, r])
+            continue
+        margin = _Z / math.sqrt(n - 3) * fpc
+        z = math.atanh(r)
+        intervals.append([i, j, round(math.tanh(z - margin), 3), round(math.tanh(z + margin), 3)])
+    return {"columns": result["columns"], "data": result["data"], "intervals": intervals}
+
+
+def approximate_analysis(dataset_id: str, col_dist_target: str = None, sample_rows: int = None,
+                         seed: int = 0) -> dict:
+    """
+    Computes the KPI, correlation, distribution and data health sections of a
+    stored dataset from a stratified sample. Values are estimates for the full
+    dataset; "interval" / "intervals" hold their 95% confidence intervals.
+    """
+    table = dataset_store.get_table(dataset_id)
+    total = table.num_rows
+    sample_rows = min(sample_rows or PROGRESSIVE_SAMPLE_ROWS, total)
+
+    with span("analysis.sample", rows=total) as attrs:
+        strata_column = _strata_column(table, col_dist_target)
+        strata = None
+        if strata_column is not None and total:
+            strata, _ = pd.factorize(table.column(strata_column).to_pandas(), use_na_sentinel=True)
+        indices = stratified_sample_indices(total, sample_rows, strata, seed)
+        # Only the sampled rows leave the memory-mapped table
+        sample = table.take(indices).to_pandas(split_blocks=True)
+        attrs["sample_rows"] = len(sample)
+
+    return {"datasetId": dataset_id, **_approximate_sections(sample, total, col_dist_target, strata_column)}
+
+
+def _approximate_sections(sample: pd.DataFrame, total: int, col_dist_target: str, strata_column: str) -> dict:
+    with span("analysis.approximate", rows=len(sample)):
+        quality = _approximate_quality(sample, total)
+        return {
+            "approximate": True,
+            "confidence": CONFIDENCE,
+            "sampleRows": len(sample),
+            "totalRows": total,
+            "stratifiedOn": strata_column,
+            "kpiData": _approximate_kpis(sample, total, quality),
+            "correlationMatrix": _approximate_correlation(sample, total),
+            "columnDist": _approximate_distribution(sample, total, col_dist_target, strata_column),
+            "dataHealth": _approximate_health(total, len(sample.columns), quality),
+        }
+
+
+def sample_csv_upload(contents: bytes, sample_rows: int, blocks: int = None):
+    """
+    Reads about `sample_rows` rows of a CSV upload without parsing all of it: the
+    header plus whole lines from the start of `blocks` evenly spaced byte ranges.
+    Returns (sample, estimated total rows), or None when the file fits in the sample.
+    The row count is the number of line breaks, so quoted multi-line fields inflate it.
+    """
+    blocks = max(1, blocks or PROGRESSIVE_UPLOAD_BLOCKS)
+    header_end = contents.find(b"\n") + 1
+    if not header_end:
+        return None
+    total = contents.count(b"\n", header_end) + (not contents.endswith(b"\n"))
+    if total <= sample_rows:
+        return None
+
+    per_block = max(1, sample_rows // blocks)
+    step = (len(contents) - header_end) / blocks
+    pieces = [contents[:header_end]]
+    for k in range(blocks):
+        start = header_end + int(k * step)
+        if k:
+            # Skip the partial line the block starts in
+            start = contents.find(b"\n", start) + 1
+            if not start:
+                break
+        block_end = header_end + int((k + 1) * step)
+        end = start
+        for _ in range(per_block):
+            if end >= block_end:
+                break
+            end = contents.find(b"\n", end) + 1 or len(contents)
+        piece = contents[start:end]
+        pieces.append(piece if piece.endswith(b"\n") else piece + b"\n")
+
+    sample_bytes = b"".join(pieces)
+    try:
+        text = sample_bytes.decode('utf-8')
+    except UnicodeDecodeError:
+        text = sample_bytes.decode('latin-1')
+    return pd.read_csv(io.StringIO(text)), total
+
+
+def _approximate_upload(contents: bytes, file_name: str, col_dist_target: str, sample_rows: int):
+    """Approximate sections of an unparsed upload, or None when there is no cheap sample of it."""
+    if os.path.splitext(file_name or "")[1].lower() != ".csv":
+        return None
+    with span("analysis.sample_upload", bytes=len(contents)) as attrs:
+        sampled = sample_csv_upload(contents, sample_rows)
+        if sampled is None:
+            return None
+        sample, total = sampled
+        attrs["sample_rows"] = len(sample)
+    if col_dist_target is not None and col_dist_target not in sample.columns:
+        return None
+    return {**_approximate_sections(sample, total, col_dist_target, None), "totalRowsEstimated": True,
+            "sampledFrom": "upload"}
+
+
+def stream_progressive_analysis(dataset_id: str, emit, cancel_event, col_dist_target: str = None,
+                                col_time_target: str = None, sample_rows: int = None) -> None:
+    """
+    Reports a dashboard through `emit(event)` as it becomes available: one
+    "approximate" event (skipped when the dataset fits in the sample), one
+    "section" event per exact section, then exactly one of "done", "error" or
+    "cancelled". Setting `cancel_event` stops the run before the next section.
+
+    This blocks, so call it from a worker thread, not the event loop.
+    """
+    def check_cancelled(*_):
+        if cancel_event.is_set():
+            raise AnalysisCancelled()
+
+    from fastapi.encoders import jsonable_encoder
+
+    try:
+        sample_rows = sample_rows or PROGRESSIVE_SAMPLE_ROWS
+        if dataset_store.get_metadata(dataset_id)["rows"] > sample_rows:
+            emit({"type": "approximate", **approximate_analysis(dataset_id, col_dist_target, sample_rows)})
+        check_cancelled()
+
+        df = dataset_store.get_dataframe(dataset_id)
+
+        def on_section(section, value):
+            emit({"type": "section", "section": section, "approximate": False, "data": jsonable_encoder(value)})
+
+        run_full_analysis(df, col_dist_target=col_dist_target, col_time_target=col_time_target,
+                          progress=check_cancelled, on_section=on_section)
+        emit({"type": "done", "datasetId": dataset_id})
+    except AnalysisCancelled:
+        logger.info("Progressive analysis of %s cancelled by client", dataset_id)
+        emit({"type": "cancelled"})
+    except Exception as e:
+        logger.exception("Progressive analysis of %s failed: %s", dataset_id, e)
+        emit({"type": "error", "detail": str(e)})
+
+
+def stream_progressive_upload(contents: bytes, file_name: str, store_upload, emit, cancel_event,
+                              col_dist_target: str = None, col_time_target: str = None,
+                              sample_rows: int = None) -> None:
+    """
+    stream_progressive_analysis() for a file that still has to be parsed: emits a
+    "progress" event (stage "parsing") and, for a large CSV, an approximate event
+    sampled from the raw file, then stores it with `store_upload(contents, file_name)`
+    (which returns the dataset id) and continues as for a stored dataset.
+
+    This blocks, so call it from a worker thread, not the event loop.
+    """
+    sample_rows = sample_rows or PROGRESSIVE_SAMPLE_ROWS
+    try:
+        emit({"type": "progress", "stage": "parsing", "bytes": len(contents)})
+        try:
+            preview = _approximate_upload(contents, file_name, col_dist_target, sample_rows)
+        except Exception as e:
+            # The full parse below reports what is wrong with the file
+            logger.info("No preview of upload %s: %s", file_name, e)
+            preview = None
+        if preview is not None:
+            emit({"type": "approximate", **preview})
+        if cancel_event.is_set():
+            raise AnalysisCancelled()
+        dataset_id = store_upload(contents, file_name)
+    except AnalysisCancelled:
+        logger.info("Progressive analysis of upload %s cancelled by client", file_name)
+        emit({"type": "cancelled"})
+        return
+    except Exception as e:
+        logger.exception("Parsing upload %s failed: %s", file_name, e)
+        emit({"type": "error", "detail": str(e)})
+        return
+    stream_progressive_analysis(dataset_id, emit, cancel_event, col_dist_target=col_dist_target,
+                                col_time_target=col_time_target, sample_rows=sample_rows)
@@ -0,0 +1,294 @@
+import ast
+import atexit
+import io
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+from collections import OrderedDict
+from contextlib import redirect_stdout
+
+import numpy as np
+import pandas as pd
+
+from app import dataset_store
+
+logger = logging.getLogger(__name__)
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows; limits are then only enforced by the wall-clock timeout
+    resource = None
+
+# --- Configuration (overridable through the environment) ---
+SANDBOX_WORKERS = int(os.environ.get("SANDBOX_WORKERS", "2"))
+SANDBOX_CPU_SECONDS = int(os.environ.get("SANDBOX_CPU_SECONDS", "30"))
+SANDBOX_MEMORY_MB = int(os.environ.get("SANDBOX_MEMORY_MB", "2048"))
+SANDBOX_TIMEOUT = float(os.environ.get("SANDBOX_TIMEOUT", "60"))
+
+# How many datasets each worker keeps attached
+_WORKER_CACHE_SIZE = 4
+
+
+class SandboxLimitExceeded(Exception):
+    """Raised inside a worker when a call goes over its CPU-time budget."""
+
+
+# ----------------------------
+# Worker process side
+# ----------------------------
+_worker_datasets = OrderedDict()
+_cpu_budget = {"seconds": SANDBOX_CPU_SECONDS}
+
+
+def _on_cpu_limit(signum, frame):
+    raise SandboxLimitExceeded(f"CPU time limit of {_cpu_budget['seconds']}s exceeded.")
+
+
+def _init_worker(memory_mb: int):
+    """Runs once per worker: caps heap memory and installs the CPU-limit handler."""
+    if resource is None:
+        return
+    signal.signal(signal.SIGXCPU, _on_cpu_limit)
+    limit = memory_mb * 1024 * 1024
+    # RLIMIT_DATA counts heap/anonymous memory but not the memory-mapped dataset files
+    _, hard = resource.getrlimit(resource.RLIMIT_DATA)
+    if hard == resource.RLIM_INFINITY or limit < hard:
+        resource.setrlimit(resource.RLIMIT_DATA, (limit, hard))
+
+
+def _attach_dataset(dataset_id: str) -> pd.DataFrame:
+    """Attaches a dataset from the shared store once per worker and keeps it for later calls."""
+    version = dataset_store.get_metadata(dataset_id)["version"]
+    cached = _worker_datasets.get(dataset_id)
+    if cached is not None and cached[0] == version:
+        _worker_datasets.move_to_end(dataset_id)
+        return cached[1]
+
+    df = dataset_store.get_dataframe(dataset_id)
+    _worker_datasets[dataset_id] = (version, df)
+    while len(_worker_datasets) > _WORKER_CACHE_SIZE:
+        _worker_datasets.popitem(last=False)
+    return df
+
+
+def _preload(dataset_id: str) -> int:
+    return len(_attach_dataset(dataset_id))
+
+
+def _set_cpu_budget(seconds: int):
+    _cpu_budget["seconds"] = seconds
+    if resource is None:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = int(usage.ru_utime + usage.ru_stime)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    resource.setrlimit(resource.RLIMIT_CPU, (used + seconds + 1, hard))
+
+
+def _clear_cpu_budget():
+    if resource is None:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+
+
+def _run_code(dataset_id: str, code: str, cpu_seconds: int) -> str:
+    """
+    Executes one agent tool call with the same semantics as PythonAstREPLTool:
+    all statements run, and the value of the last expression (or stdout) is returned.
+    """
+    df = _attach_dataset(dataset_id)
+    # Shallow copy so column assignments don't leak into the cached dataset
+    namespace = {"df": df.copy(deep=False), "pd": pd, "np": np}
+    io_buffer = io.StringIO()
+
+    _set_cpu_budget(cpu_seconds)
+    try:
+        tree = ast.parse(code)
+        body = ast.unparse(ast.Module(tree.body[:-1], type_ignores=[]))
+        last = ast.unparse(ast.Module(tree.body[-1:], type_ignores=[]))
+        with redirect_stdout(io_buffer):
+            exec(body, namespace)
+            try:
+                ret = eval(last, namespace)
+            except SyntaxError:
+                exec(last, namespace)
+                ret = None
+        return io_buffer.getvalue() if ret is None else str(ret)
+    except SandboxLimitExceeded as e:
+        return f"SandboxLimitExceeded: {e}"
+    except MemoryError:
+        return f"MemoryError: memory limit of {SANDBOX_MEMORY_MB} MB exceeded."
+    except Exception as e:
+        return "{}: {}".format(type(e).__name__, str(e))
+    finally:
+        _clear_cpu_budget()
+
+
+def _worker_main(conn, memory_mb: int):
+    """A sandbox worker's loop: runs each (func, args) it receives and sends back (ok, value)."""
+    _init_worker(memory_mb)
+    while True:
+        try:
+            func, args = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            reply = (True, func(*args))
+        except Exception as e:
+            reply = (False, "{}: {}".format(type(e).__name__, str(e)))
+        conn.send(reply)
+
+
+# ----------------------------
+# Pool (web process side)
+# ----------------------------
+class _Worker:
+    """One sandbox process and the pipe to it; used by one call at a time."""
+    def __init__(self, memory_mb: int):
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_worker_main, args=(child_conn, memory_mb), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def call(self, func, args: tuple, timeout: float):
+        """
+        Runs func(*args) in the worker. The timeout starts now, when the worker
+        begins the call; raises TimeoutError when it runs out, EOFError or OSError
+        when the process died.
+        """
+        self.conn.send((func, args))
+        if not self.conn.poll(timeout):
+            raise TimeoutError()
+        return self.conn.recv()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+
+class SandboxPool:
+    """
+    A pool of warm worker processes that run agent-generated code against
+    datasets from the shared store, with per-call CPU, memory and wall-clock limits.
+    A call waits for an idle worker; its wall-clock limit starts when the worker
+    takes it. A call that overruns kills (and replaces) only its own worker.
+    """
+    def __init__(self, max_workers: int = SANDBOX_WORKERS, memory_mb: int = SANDBOX_MEMORY_MB):
+        self.max_workers = max_workers
+        self.memory_mb = memory_mb
+        self._lock = threading.Lock()
+        self._idle = queue.LifoQueue()  # the most recently used worker has the warmest caches
+        self._started = 0
+        self._closed = False
+
+    def _acquire(self) -> _Worker:
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The sandbox pool is shut down.")
+            start = self._idle.empty() and self._started < self.max_workers
+            if start:
+                self._started += 1
+        if start:
+            try:
+                return _Worker(self.memory_mb)
+            except Exception:
+                with self._lock:
+                    self._started -= 1
+                raise
+        return self._idle.get()
+
+    def _release(self, worker: _Worker):
+        with self._lock:
+            closed = self._closed
+        if closed:
+            worker.kill()
+        else:
+            self._idle.put(worker)
+
+    def _discard(self, worker: _Worker):
+        """Kills a worker that is stuck or dead; the next call that needs one starts a fresh one."""
+        worker.kill()
+        with self._lock:
+            self._started -= 1
+
+    def _call(self, func, args: tuple, timeout: float):
+        worker = self._acquire()
+        try:
+            reply = worker.call(func, args, timeout)
+        except BaseException:
+            self._discard(worker)
+            raise
+        self._release(worker)
+        return reply
+
+    def preload(self, dataset_id: str):
+        """Asks the workers to attach the dataset ahead of the first tool call (in the background)."""
+        def attach():
+            try:
+                self._call(_preload, (dataset_id,), SANDBOX_TIMEOUT)
+            except Exception as e:
+                logger.warning("Preloading dataset %s in the sandbox failed: %s", dataset_id, e)
+
+        for _ in range(self.max_workers):
+            threading.Thread(target=attach, name="sandbox-preload", daemon=True).start()
+
+    def run(self, dataset_id: str, code: str, cpu_seconds: int = SANDBOX_CPU_SECONDS,
+            timeout: float = SANDBOX_TIMEOUT) -> str:
+        try:
+            _, value = self._call(_run_code, (dataset_id, code, cpu_seconds), timeout)
+            return value
+        except TimeoutError:
+            return f"SandboxLimitExceeded: execution took longer than {timeout:.0f}s and was stopped."
+        except (EOFError, OSError):
+            # The worker was killed by the OS (e.g. hard memory limit)
+            return "SandboxLimitExceeded: the worker process crashed while running this code."
+
+    def shutdown(self):
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().kill()
+            except queue.Empty:
+                break
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_sandbox_pool() -> SandboxPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = SandboxPool()
+            atexit.register(_pool.shutdown)
+        return _pool
+
+
+def create_sandboxed_tool(dataset_id: str):
+    """
+    Builds a drop-in replacement for the agent's `python_repl_ast` tool that runs
+    code in the sandbox pool instead of the API worker.
+
+    Unlike the in-process REPL, variables defined in one call are not kept for the
+    next one; every call starts from a fresh namespace with `df`, `pd` and `np`.
+    """
+    from langchain_experimental.tools.python.tool import PythonAstREPLTool, sanitize_input
+
+    pool = get_sandbox_pool()
+
+    class SandboxedPythonAstREPLTool(PythonAstREPLTool):
+        def _run(self, query: str, run_manager=None) -> str:
+            if self.sanitize_input:
+                query = sanitize_input(query)
+            return pool.run(dataset_id, query)
+
+    pool.preload(dataset_id)
+    return SandboxedPythonAstREPLTool()
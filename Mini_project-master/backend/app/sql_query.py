@@ -0,0 +1,183 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from app import dataset_store
+from app.metrics import span
+
+logger = logging.getLogger(__name__)
+
+# ----------------------------
+# SQL over stored datasets (DuckDB)
+# ----------------------------
+# Queries run in an embedded DuckDB against the dataset's memory-mapped Arrow
+# table (see dataset_store), exposed as the table `dataset`; nothing is copied
+# into DuckDB first. Only single SELECT / WITH statements are accepted and file
+# system access is disabled, so a query can't read or write anything else.
+#
+# A query's full result (up to SQL_MAX_RESULT_ROWS) is kept in an LRU cache keyed
+# by dataset version and query text; pages are slices of that cached result, so
+# paging through a result runs the query once. Appending to a dataset bumps its
+# version, which retires the cached results.
+
+# --- Configuration (overridable through the environment) ---
+SQL_MAX_RESULT_ROWS = int(os.environ.get("SQL_MAX_RESULT_ROWS", "100000"))
+SQL_MAX_PAGE_SIZE = int(os.environ.get("SQL_MAX_PAGE_SIZE", "5000"))
+SQL_TIMEOUT_SECONDS = float(os.environ.get("SQL_TIMEOUT_SECONDS", "30"))
+SQL_CACHE_MAX_MB = int(os.environ.get("SQL_CACHE_MAX_MB", "256"))
+SQL_THREADS = int(os.environ.get("SQL_THREADS", str(os.cpu_count() or 1)))
+
+TABLE_NAME = "dataset"
+
+
+class QueryTimeout(Exception):
+    """Raised when a query runs longer than SQL_TIMEOUT_SECONDS."""
+
+
+class _ResultCache:
+    """LRU of Arrow results bounded by their total size in bytes."""
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (table, truncated)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, table, truncated: bool):
+        size = table.nbytes
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = (table, truncated)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+
+_cache = _ResultCache(SQL_CACHE_MAX_MB * 1024 * 1024)
+
+
+def validate_query(query: str) -> str:
+    """Returns the query without trailing semicolons; raises ValueError unless it is one SELECT."""
+    import duckdb
+
+    if not query or not query.strip():
+        raise ValueError("Query is empty.")
+    try:
+        statements = duckdb.extract_statements(query)
+    except duckdb.Error as e:
+        raise ValueError(f"Invalid SQL: {e}")
+    if len(statements) != 1:
+        raise ValueError("Send exactly one SQL statement.")
+    if statements[0].type != duckdb.StatementType.SELECT:
+        raise ValueError("Only read-only SELECT (or WITH ... SELECT) queries are allowed.")
+    return query.strip().rstrip(";").strip()
+
+
+def _execute(dataset_id: str, query: str):
+    """Runs the query and returns (arrow table, truncated)."""
+    import duckdb
+
+    con = duckdb.connect(config={"enable_external_access": False, "threads": SQL_THREADS})
+    timer = threading.Timer(SQL_TIMEOUT_SECONDS, con.interrupt)
+    try:
+        con.register(TABLE_NAME, dataset_store.get_table(dataset_id))
+        timer.start()
+        # One row past the cap tells us whether the result was cut off
+        # (on its own lines, so a trailing "-- comment" in the query can't swallow the parenthesis)
+        result = con.execute(f"SELECT * FROM (\n{query}\n) AS q LIMIT {SQL_MAX_RESULT_ROWS + 1}")
+        table = result.fetch_arrow_table()
+    except duckdb.InterruptException:
+        raise QueryTimeout(f"Query took longer than {SQL_TIMEOUT_SECONDS:g}s and was stopped.")
+    except duckdb.Error as e:
+        raise ValueError(f"Query failed: {e}")
+    finally:
+        timer.cancel()
+        con.close()
+
+    truncated = table.num_rows > SQL_MAX_RESULT_ROWS
+    if truncated:
+        table = table.slice(0, SQL_MAX_RESULT_ROWS)
+    return table, truncated
+
+
+def run_query(dataset_id: str, query: str, offset: int = 0, limit: int = 100) -> dict:
+    """
+    Runs a read-only SQL query over a stored dataset (table name `dataset`) and
+    returns one page of the result. Raises KeyError for unknown datasets,
+    ValueError for invalid queries and QueryTimeout for queries that run too long.
+    """
+    if offset < 0 or limit < 1:
+        raise ValueError("offset must be >= 0 and limit >= 1.")
+    limit = min(limit, SQL_MAX_PAGE_SIZE)
+    query = validate_query(query)
+    meta = dataset_store.get_metadata(dataset_id)
+
+    start = time.perf_counter()
+    key = (dataset_id, meta["version"], query)
+    cached = _cache.get(key)
+    with span("sql.query", rows=meta["rows"]) as attrs:
+        attrs["cached"] = cached is not None
+        if cached is None:
+            table, truncated = _execute(dataset_id, query)
+            _cache.put(key, table, truncated)
+        else:
+            table, truncated = cached
+
+    page = table.slice(offset, limit)
+    return {
+        "datasetId": dataset_id,
+        "columns": [{"name": field.name, "type": str(field.type)} for field in table.schema],
+        "rows": page.to_pylist(),
+        "offset": offset,
+        "limit": limit,
+        "totalRows": table.num_rows,
+        "truncated": truncated,
+        "cached": cached is not None,
+        "elapsedMs": round((time.perf_counter() - start) * 1000, 3),
+    }
+
+
+def create_sql_tool(dataset_id: str, max_rows: int = 50):
+    """
+    Builds a LangChain tool that lets the chat agent answer aggregate questions
+    with one SQL query instead of several rounds of generated pandas code.
+    """
+    from langchain_core.tools import Tool
+
+    def run(query: str) -> str:
+        # Models often wrap the query in a markdown code fence
+        query = query.strip().strip("`").strip()
+        if query[:3].lower() == "sql":
+            query = query[3:]
+        try:
+            result = run_query(dataset_id, query, limit=max_rows)
+        except (ValueError, QueryTimeout) as e:
+            return f"Error: {e}"
+        lines = [" | ".join(column["name"] for column in result["columns"])]
+        lines += [" | ".join(str(value) for value in row.values()) for row in result["rows"]]
+        if result["totalRows"] > len(result["rows"]):
+            lines.append(f"... ({result['totalRows']} rows in total; aggregate or add LIMIT to see fewer)")
+        return "\n".join(lines)
+
+    return Tool(
+        name="sql_query",
+        func=run,
+        description=(
+            "Runs one read-only DuckDB SQL SELECT over the full dataset, available as the table "
+            f"`{TABLE_NAME}` with the same columns as df (quote names with spaces in double quotes). "
+            "Fast for filters, GROUP BY aggregates, counts and top-N questions. "
+            "Input: the SQL query only. Output: the result rows, one per line."
+        ),
+    )
@@ -0,0 +1,211 @@
+import atexit
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+from app.analysis_utils import find_date_column
+from app.forecasting import budget_deadline, forecast_series
+from app.metrics import span
+
+# ----------------------------
+# Multi-measure time-series aggregation
+# ----------------------------
+# aggregate_measures() sorts the rows by the date column once and computes every
+# requested aggregate of every measure (plus the record count) in a single
+# resample pass. forecast_many() then forecasts all resulting series at once on a
+# process pool, so the wall time of N series is close to that of the slowest one.
+# All series of a request share one forecasting time budget (see app.forecasting).
+
+# --- Configuration (overridable through the environment) ---
+TS_FORECAST_WORKERS = int(os.environ.get("TS_FORECAST_WORKERS", str(min(8, os.cpu_count() or 1))))
+
+# granularity -> (pandas frequency, seasonal period)
+GRANULARITIES = {
+    "day": ("D", 7),
+    "week": ("W", 52),
+    "month": ("ME", 12),
+    "quarter": ("QE", 4),
+}
+SUPPORTED_AGGS = ("sum", "mean", "count", "min", "max")
+RECORD_COUNT = "Record Count"
+
+
+def aggregate_measures(df: pd.DataFrame, date_col: str = None, measures: list = None,
+                       granularity: str = "month", aggs: list = None):
+    """
+    Aggregates numeric measures per period. Returns (date_col, frame) where frame
+    has one row per period (gaps filled) and one column per series, named
+    "<measure> (<agg>)", plus a "Record Count" column. measures defaults to every
+    numeric column and aggs to ["sum"].
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"Unknown granularity '{granularity}'. Use one of: {', '.join(GRANULARITIES)}.")
+    aggs = list(aggs or ["sum"])
+    unknown = [a for a in aggs if a not in SUPPORTED_AGGS]
+    if unknown:
+        raise ValueError(f"Unsupported aggregations: {unknown}. Use any of: {', '.join(SUPPORTED_AGGS)}.")
+
+    # Only the date column is parsed, on a shallow copy so the caller's frame is left alone
+    frame = df.copy(deep=False)
+    date_col = find_date_column(frame, date_col)
+    if date_col is None:
+        return None, pd.DataFrame()
+
+    if measures is None:
+        measures = [c for c in frame.select_dtypes(include=np.number).columns if c != date_col]
+    else:
+        missing = [m for m in measures if m not in frame.columns]
+        if missing:
+            raise ValueError(f"Measure columns not found: {missing}.")
+        not_numeric = [m for m in measures if not pd.api.types.is_numeric_dtype(frame[m])]
+        if not_numeric:
+            raise ValueError(f"Measure columns must be numeric: {not_numeric}.")
+
+    freq = GRANULARITIES[granularity][0]
+    with span("timeseries.aggregate", rows=len(frame)) as attrs:
+        dates = frame[date_col]
+        valid = dates.notna().to_numpy()
+        values = frame.loc[valid, measures]
+        values.index = pd.DatetimeIndex(dates[valid])
+        # A sorted index lets resample bin the rows without a hash table
+        values = values.sort_index(kind="stable")
+
+        grouped = values.resample(freq)
+        result = grouped[measures].agg(aggs) if measures else pd.DataFrame(index=grouped.size().index)
+        if measures:
+            result.columns = [f"{measure} ({agg})" for measure, agg in result.columns]
+        result[RECORD_COUNT] = grouped.size()
+        attrs["series"] = len(result.columns)
+    return date_col, result
+
+
+# ----------------------------
+# Batch forecasting
+# ----------------------------
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=TS_FORECAST_WORKERS)
+            atexit.register(_shutdown_executor)
+        return _executor
+
+
+def _shutdown_executor():
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _forecast_series(series: pd.Series, freq: str, seasonal_period: int, steps: int,
+                     deadline: float) -> dict:
+    """Worker-side entry point; must stay a module-level function so it can be pickled."""
+    # Periods without rows have no mean/min/max; bridge them so the model sees a full series
+    series = series.astype('float64').interpolate(limit_direction='both')
+    return forecast_series(series, freq=freq, seasonal_period=seasonal_period, steps=steps,
+                           deadline=deadline)
+
+
+def forecast_many(series: dict, granularity: str = "month", steps: int = None,
+                  budget: float = None) -> dict:
+    """
+    Forecasts every series in {name: pd.Series} within one time budget and returns
+    {name: forecast_series() result}. Series are spread over a process pool; a
+    single series runs inline.
+    """
+    freq, seasonal_period = GRANULARITIES[granularity]
+    steps = steps or seasonal_period
+    deadline = budget_deadline(budget)
+    results = {}
+
+    with span("timeseries.forecast", series=len(series)):
+        if len(series) <= 1 or TS_FORECAST_WORKERS <= 1:
+            for name, s in series.items():
+                results[name] = _forecast_series(s, freq, seasonal_period, steps, deadline)
+            return results
+
+        executor = _get_executor()
+        try:
+            futures = {name: executor.submit(_forecast_series, s, freq, seasonal_period, steps, deadline)
+                       for name, s in series.items()}
+            for name, future in futures.items():
+                results[name] = future.result()
+        except BrokenProcessPool:
+            # A worker died (e.g. killed by the OS); drop the pool and finish inline
+            _shutdown_executor()
+            for name, s in series.items():
+                if name not in results:
+                    results[name] = _forecast_series(s, freq, seasonal_period, steps, deadline)
+    return results
+
+
+def _json_values(series: pd.Series) -> list:
+    return [None if pd.isna(v) else float(v) for v in series.tolist()]
+
+
+def build_measures_payload(date_col: str, granularity: str, aggregated: pd.DataFrame,
+                           forecasts: dict = None) -> dict:
+    """Formats aggregated series (and their forecasts) like get_time_series_data does."""
+    if date_col is None or aggregated.empty:
+        return {"timeColumn": date_col, "granularity": granularity, "seriesData": [], "xAxisData": []}
+
+    forecasts = forecasts or {}
+    points = {name: f["points"] for name, f in forecasts.items()}
+    actual_dates = [date.strftime('%Y-%m-%d') for date in aggregated.index]
+    horizon = max((len(p) for p in points.values()), default=0)
+    # Every forecast of one granularity covers the same future periods
+    forecast_dates = next((
+        [item['name'] for item in p] for p in points.values() if len(p) == horizon
+    ), [])
+
+    series_data = []
+    for name in aggregated.columns:
+        series_data.append({
+            "name": f"{name} (Actual)",
+            "type": "line",
+            "smooth": True,
+            "data": _json_values(aggregated[name]) + [None] * horizon
+        })
+        forecast = points.get(name) or []
+        if forecast:
+            values = [float(item['value']) for item in forecast]
+            series_data.append({
+                "name": f"{name} (Forecast)",
+                "type": "line",
+                "smooth": True,
+                "lineStyle": {"type": "dashed"},
+                "data": [None] * len(actual_dates) + values + [None] * (horizon - len(values))
+            })
+
+    return {
+        "timeColumn": date_col,
+        "granularity": granularity,
+        "seriesData": series_data,
+        "xAxisData": actual_dates + forecast_dates,
+        "forecasts": {
+            name: {"model": f["model"], "elapsedMs": f["elapsedMs"], "error": f["error"]}
+            for name, f in forecasts.items()
+        }
+    }
+
+
+def get_measures_time_series(df: pd.DataFrame, date_col: str = None, measures: list = None,
+                             granularity: str = "month", aggs: list = None, forecast: bool = True,
+                             forecast_steps: int = None, forecast_budget: float = None) -> dict:
+    """Aggregates many measures at one granularity and forecasts every resulting series."""
+    date_col, aggregated = aggregate_measures(df, date_col, measures, granularity, aggs)
+    forecasts = None
+    if forecast and not aggregated.empty:
+        forecasts = forecast_many({name: aggregated[name] for name in aggregated.columns},
+                                  granularity, forecast_steps, forecast_budget)
+    return build_measures_payload(date_col, granularity, aggregated, forecasts)
@@ -0,0 +1,81 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+# ----------------------------
+# Synthetic dataset generators
+# ----------------------------
+
+def make_dataframe(rows: int = 10_000, numeric_cols: int = 4, categorical_cols: int = 2,
+                   date_cols: int = 1, cardinality: int = 20, null_rate: float = 0.0,
+                   duplicate_rate: float = 0.0, seed: int = 42) -> pd.DataFrame:
+    """
+    Builds a reproducible DataFrame with the requested shape and value profile.
+
+    cardinality is the number of distinct values per categorical column, null_rate
+    the share of cells blanked out, and duplicate_rate the share of rows that are
+    copies of earlier rows.
+    """
+    rng = np.random.default_rng(seed)
+    data = {}
+
+    for i in range(date_cols):
+        start = pd.Timestamp("2018-01-01") + pd.Timedelta(days=90 * i)
+        offsets = rng.integers(0, 5 * 365 * 24, size=rows)
+        data[f"order_date_{i}" if i else "order_date"] = start + pd.to_timedelta(offsets, unit="h")
+
+    for i in range(numeric_cols):
+        if i % 2 == 0:
+            data[f"amount_{i}"] = rng.normal(100, 25, size=rows).round(2)
+        else:
+            data[f"quantity_{i}"] = rng.integers(0, 1000, size=rows)
+
+    categories = np.array([f"cat_{k}" for k in range(max(cardinality, 1))], dtype=object)
+    for i in range(categorical_cols):
+        data[f"segment_{i}"] = categories[rng.integers(0, len(categories), size=rows)]
+
+    df = pd.DataFrame(data)
+
+    if duplicate_rate > 0 and rows > 1:
+        n_dup = int(rows * duplicate_rate)
+        source = rng.integers(0, rows - n_dup, size=n_dup)
+        df.iloc[rows - n_dup:] = df.iloc[source].to_numpy()
+
+    if null_rate > 0:
+        for col in df.columns:
+            mask = rng.random(rows) < null_rate
+            df.loc[mask, col] = None
+
+    return df
+
+
+def encode(df: pd.DataFrame, fmt: str) -> bytes:
+    """Serialises df as the bytes of an upload in the given format (csv, xlsx or parquet)."""
+    buffer = io.BytesIO()
+    if fmt == "csv":
+        df.to_csv(buffer, index=False)
+    elif fmt == "xlsx":
+        df.to_excel(buffer, index=False, engine="openpyxl")
+    elif fmt == "parquet":
+        df.to_parquet(buffer, index=False)
+    else:
+        raise ValueError(f"Unsupported benchmark format: {fmt}")
+    return buffer.getvalue()
+
+
+# Named size presets used by the runner's --profile option
+PROFILES = {
+    "small": {"rows": 5_000, "xlsx_rows": 2_000, "repeats": 3},
+    "medium": {"rows": 100_000, "xlsx_rows": 20_000, "repeats": 3},
+    "large": {"rows": 1_000_000, "xlsx_rows": 100_000, "repeats": 2},
+}
+
+# Dataset variants benchmarked for every profile (rows come from the profile)
+VARIANTS = {
+    "baseline": {},
+    "wide": {"numeric_cols": 30, "categorical_cols": 10},
+    "high_cardinality": {"cardinality": 50_000},
+    "nulls": {"null_rate": 0.2, "duplicate_rate": 0.05},
+    "no_dates": {"date_cols": 0},
+}
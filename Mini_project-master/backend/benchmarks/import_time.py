@@ -0,0 +1,78 @@
+"""
+Cold-start check for the API process.
+
+Usage (from the backend/ directory):
+
+    python -m benchmarks.import_time --budget 1.5
+
+Imports app.main in fresh interpreters (without GROQ_API_KEY, as an analytics-only
+deployment would) and reports the median wall time. Exits with status 1 if the
+median is over the budget or if any lazily loaded subsystem was imported eagerly.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+# Subsystems that must only be imported on first use
+LAZY_MODULES = (
+    "statsmodels",
+    "networkx",
+    "langchain_core",
+    "langchain_groq",
+    "langchain_experimental",
+    "uvicorn",
+)
+
+_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+print(json.dumps({"seconds": elapsed, "eager": [m for m in %r if m in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+
+def measure_import(repeats: int = 5) -> dict:
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ)
+    env.pop("GROQ_API_KEY", None)
+    env["PYTHONPATH"] = backend_dir + os.pathsep + env.get("PYTHONPATH", "")
+
+    times, eager = [], set()
+    for _ in range(repeats):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE], cwd=backend_dir, env=env,
+            capture_output=True, text=True, check=True,
+        ).stdout
+        probe = json.loads(output.strip().splitlines()[-1])
+        times.append(probe["seconds"])
+        eager.update(probe["eager"])
+    return {"median_s": statistics.median(times), "min_s": min(times), "eager": sorted(eager)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Check the API's cold import time.")
+    parser.add_argument("--budget", type=float, default=float(os.environ.get("IMPORT_BUDGET_SECONDS", "1.5")),
+                        help="Maximum median import time of app.main in seconds")
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    result = measure_import(args.repeats)
+    print(f"import app.main: median {result['median_s']:.3f}s, min {result['min_s']:.3f}s "
+          f"(budget {args.budget:.3f}s)")
+
+    failed = False
+    if result["eager"]:
+        print(f"Imported eagerly, should be lazy: {', '.join(result['eager'])}")
+        failed = True
+    if result["median_s"] > args.budget:
+        print("Import time is over budget")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,370 @@
+"""
+Benchmark runner for API startup, the analysis functions, ingestion, workflow engine,
+workflow transform nodes (against equivalent hand-written pandas) and API.
+
+Usage (from the backend/ directory):
+
+    python -m benchmarks.run --profile small --output results.json
+    python -m benchmarks.run --profile small --baseline results.json --threshold 0.2
+
+Each case is timed over several repeats (median wall time) and then run once more
+under tracemalloc for its peak Python-visible allocation. With --baseline, cases
+whose median got slower than the threshold are reported and the exit code is 1.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.datasets import PROFILES, VARIANTS, encode, make_dataframe
+
+GROUPS = ("startup", "ingestion", "analysis", "workflow", "transforms", "endpoints")
+
+
+class Case:
+    def __init__(self, name: str, group: str, func, setup=None, params: dict = None):
+        self.name = name
+        self.group = group
+        self.func = func
+        # Runs before every repeat, outside the timed region (e.g. to clear caches)
+        self.setup = setup
+        self.params = params or {}
+
+
+def _isolate_caches():
+    """Points every on-disk cache at a throwaway directory before the app is imported."""
+    root = tempfile.mkdtemp(prefix="dap_bench_")
+    os.environ["DATASET_STORE_DIR"] = os.path.join(root, "datasets")
+    os.environ["EXCEL_CACHE_DIR"] = os.path.join(root, "excel_cache")
+    return root
+
+
+def _clear_dir(path: str):
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def measure(case: Case, repeats: int) -> dict:
+    times = []
+    for _ in range(repeats):
+        if case.setup is not None:
+            case.setup()
+        gc.collect()
+        start = time.perf_counter()
+        case.func()
+        times.append(time.perf_counter() - start)
+
+    if case.setup is not None:
+        case.setup()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        case.func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "group": case.group,
+        "params": case.params,
+        "repeats": repeats,
+        "median_s": statistics.median(times),
+        "min_s": min(times),
+        "peak_mb": peak / (1024 * 1024),
+    }
+
+
+# ----------------------------
+# Case builders
+# ----------------------------
+def startup_cases() -> list:
+    from benchmarks.import_time import measure_import
+
+    # Each repeat imports app.main in a fresh interpreter; the peak memory is the parent's
+    return [Case("startup/import_app_main", "startup", lambda: measure_import(repeats=1))]
+
+
+def ingestion_cases(frames: dict, xlsx_frames: dict) -> list:
+    from app.analysis_utils import read_uploaded_file_to_df
+
+    cases = []
+    excel_cache = os.environ["EXCEL_CACHE_DIR"]
+    for variant, df in frames.items():
+        for fmt in ("csv", "parquet"):
+            contents = encode(df, fmt)
+            cases.append(Case(
+                f"ingestion/read_uploaded_file_to_df[{fmt},{variant}]", "ingestion",
+                lambda c=contents, f=fmt: read_uploaded_file_to_df(c, f"bench.{f}"),
+                params={"format": fmt, "variant": variant, "rows": len(df), "bytes": len(contents)},
+            ))
+    for variant, df in xlsx_frames.items():
+        contents = encode(df, "xlsx")
+        cases.append(Case(
+            f"ingestion/read_uploaded_file_to_df[xlsx,{variant}]", "ingestion",
+            lambda c=contents: read_uploaded_file_to_df(c, "bench.xlsx"),
+            setup=lambda: _clear_dir(excel_cache),
+            params={"format": "xlsx", "variant": variant, "rows": len(df), "bytes": len(contents)},
+        ))
+        cases.append(Case(
+            f"ingestion/read_uploaded_file_to_df[xlsx-cached,{variant}]", "ingestion",
+            lambda c=contents: read_uploaded_file_to_df(c, "bench.xlsx"),
+            params={"format": "xlsx", "variant": variant, "rows": len(df), "cached": True},
+        ))
+    return cases
+
+
+def analysis_cases(frames: dict) -> list:
+    from app import analysis_utils as au
+
+    cases = []
+    for variant, df in frames.items():
+        params = {"variant": variant, "rows": len(df), "columns": len(df.columns)}
+        corr = au.get_correlation_matrix(df)
+        kpis = au.get_kpis(df)
+        functions = {
+            "get_kpis": lambda d=df: au.get_kpis(d),
+            "get_correlation_matrix": lambda d=df: au.get_correlation_matrix(d),
+            # get_time_series_data converts the date column in place, so give it a fresh copy
+            "get_time_series_data": lambda d=df: au.get_time_series_data(d.copy()),
+            "get_actionable_insights": lambda d=df, k=kpis, c=corr: au.get_actionable_insights(d, k, c.get('matrix')),
+            "get_data_dictionary": lambda d=df: au.get_data_dictionary(d),
+            "get_column_distribution": lambda d=df: au.get_column_distribution(d),
+            "get_table_data": lambda d=df: au.get_table_data(d),
+            "get_data_health": lambda d=df: au.get_data_health(d),
+            "run_full_analysis": lambda d=df: au.run_full_analysis(d.copy()),
+        }
+        if not corr["columns"]:
+            # No numeric columns: the insights and full analysis need a correlation matrix
+            functions.pop("get_actionable_insights")
+            functions.pop("run_full_analysis")
+        for name, func in functions.items():
+            cases.append(Case(f"analysis/{name}[{variant}]", "analysis", func, params=params))
+    return cases
+
+
+PIPELINES = {
+    "load": ["load_csv"],
+    "load_clean": ["load_csv", "clean_data"],
+    "load_clean_analyze": ["load_csv", "clean_data", "analyze_data"],
+}
+
+
+def pipeline_json(node_types: list) -> dict:
+    nodes = [{"id": str(i), "data": {"node_type": t}} for i, t in enumerate(node_types)]
+    edges = [{"source": str(i), "target": str(i + 1)} for i in range(len(node_types) - 1)]
+    return {"nodes": nodes, "edges": edges}
+
+
+def workflow_cases(frames: dict) -> list:
+    from app.core.workflow.workflow import WorkflowExecutor
+
+    cases = []
+    df = frames["baseline"]
+    contents = encode(df, "csv")
+    for name, node_types in PIPELINES.items():
+        pipeline = pipeline_json(node_types)
+
+        def run(p=pipeline):
+            WorkflowExecutor(p["nodes"], p["edges"], file_contents=contents, file_name="bench.csv").run()
+
+        cases.append(Case(f"workflow/{name}[baseline]", "workflow", run,
+                          params={"nodes": node_types, "rows": len(df)}))
+    return cases
+
+
+def transform_cases(frames: dict) -> list:
+    """Each transform node next to the hand-written pandas it replaces, on the same input."""
+    import numpy as np
+    import pandas as pd
+    from app.core.registry import get_node_class
+
+    def node(node_type, params):
+        return get_node_class(node_type)(node_id="bench", node_type=node_type, params=params)
+
+    df = frames["baseline"]
+    params = {"rows": len(df)}
+    filter_node = node("filter", {"expression": "amount_0 > 100 and segment_0 != 'cat_1'"})
+    select_node = node("select_columns", {"columns": ["segment_0", "amount_0", "quantity_1"]})
+    group_node = node("group_by", {"by": "segment_0",
+                                   "aggregations": {"amount_0": ["sum", "mean"], "quantity_1": "max"}})
+
+    # Join inputs: a small dimension table keyed by segment, and two large tables
+    # sorted on an integer key (the case where 'auto' may pick a sort-merge join)
+    dimension = pd.DataFrame({"segment_0": df["segment_0"].unique()})
+    dimension["segment_rank"] = np.arange(len(dimension))
+    left = df.assign(key=np.arange(len(df)))
+    right = pd.DataFrame({"key": np.arange(0, 2 * len(df), 2), "weight": np.linspace(0, 1, len(df))})
+    lookup_node = node("join", {"on": "segment_0", "how": "left"})
+
+    cases = [
+        Case("transforms/filter[node]", "transforms",
+             lambda: filter_node.execute({"input_1": df}), params=params),
+        Case("transforms/filter[pandas]", "transforms",
+             lambda: df[(df["amount_0"] > 100) & (df["segment_0"] != "cat_1")], params=params),
+        Case("transforms/select_columns[node]", "transforms",
+             lambda: select_node.execute({"input_1": df}), params=params),
+        Case("transforms/select_columns[pandas]", "transforms",
+             lambda: df[["segment_0", "amount_0", "quantity_1"]], params=params),
+        Case("transforms/group_by[node]", "transforms",
+             lambda: group_node.execute({"input_1": df}), params=params),
+        Case("transforms/group_by[pandas]", "transforms",
+             lambda: df.groupby("segment_0", dropna=False, observed=True).agg(
+                 amount_0_sum=("amount_0", "sum"), amount_0_mean=("amount_0", "mean"),
+                 quantity_1_max=("quantity_1", "max")).reset_index(), params=params),
+        Case("transforms/join_lookup[node]", "transforms",
+             lambda: lookup_node.execute({"input_1": df, "input_2": dimension}), params=params),
+        Case("transforms/join_lookup[pandas]", "transforms",
+             lambda: pd.merge(df, dimension, on="segment_0", how="left"), params=params),
+        Case("transforms/join_sorted[pandas]", "transforms",
+             lambda: pd.merge(left, right, on="key"), params=params),
+    ]
+    for strategy in ("auto", "hash", "sort_merge"):
+        join_node = node("join", {"on": "key", "strategy": strategy})
+        cases.append(Case(f"transforms/join_sorted[node,{strategy}]", "transforms",
+                          lambda n=join_node: n.execute({"input_1": left, "input_2": right}),
+                          params=dict(params, strategy=strategy)))
+    return cases
+
+
+def endpoint_cases(frames: dict) -> list:
+    try:
+        from fastapi.testclient import TestClient
+        from app.main import app
+        from app import dataset_store
+    except Exception as e:
+        print(f"Skipping endpoint benchmarks: {type(e).__name__}: {e}")
+        return []
+
+    client = TestClient(app)
+    df = frames["baseline"]
+    contents = encode(df, "csv")
+    dataset_id = dataset_store.dataset_id_for(contents)
+
+    def forget_dataset():
+        # Uploads are content-addressed; drop the stored copy so every repeat parses the file
+        dataset_store.delete_dataset(dataset_id)
+
+    def post(url, data=None, with_file=True):
+        files = {"file": ("bench.csv", contents, "text/csv")} if with_file else None
+        response = client.post(url, files=files, data=data)
+        if response.status_code != 200:
+            raise RuntimeError(f"{url} returned {response.status_code}: {response.text[:200]}")
+
+    pipeline = json.dumps(pipeline_json(PIPELINES["load_clean_analyze"]))
+    params = {"rows": len(df), "bytes": len(contents)}
+    return [
+        Case("endpoints/analyze[upload]", "endpoints",
+             lambda: post("/api/v1/analyze"), setup=forget_dataset, params=params),
+        Case("endpoints/analyze[dataset_id]", "endpoints",
+             lambda: post("/api/v1/analyze", data={"dataset_id": dataset_id}, with_file=False),
+             setup=lambda: dataset_store.put_dataset(contents, "bench.csv"), params=params),
+        Case("endpoints/workflow_run[upload]", "endpoints",
+             lambda: post("/workflow/run/", data={"pipeline_json": pipeline}),
+             setup=forget_dataset, params=params),
+    ]
+
+
+# ----------------------------
+# Baseline comparison
+# ----------------------------
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Returns (name, baseline_s, current_s, ratio) for every case slower than 1 + threshold."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None or previous["median_s"] <= 0:
+            continue
+        ratio = current["median_s"] / previous["median_s"]
+        if ratio > 1 + threshold:
+            regressions.append((name, previous["median_s"], current["median_s"], ratio))
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the backend benchmark suite.")
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="small")
+    parser.add_argument("--groups", default=",".join(GROUPS),
+                        help=f"Comma-separated subset of: {', '.join(GROUPS)}")
+    parser.add_argument("--variants", default=",".join(VARIANTS),
+                        help=f"Comma-separated subset of: {', '.join(VARIANTS)}")
+    parser.add_argument("--filter", default=None, help="Only run cases whose name contains this text")
+    parser.add_argument("--repeats", type=int, default=None, help="Override the profile's repeat count")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", default=None, help="Results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="Allowed slowdown before a case counts as a regression (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    cache_root = _isolate_caches()
+    profile = PROFILES[args.profile]
+    repeats = args.repeats or profile["repeats"]
+    groups = [g for g in args.groups.split(",") if g]
+    variants = [v for v in args.variants.split(",") if v]
+    if "baseline" not in variants:
+        variants.insert(0, "baseline")
+
+    frames = {v: make_dataframe(rows=profile["rows"], **VARIANTS[v]) for v in variants}
+    xlsx_frames = {"baseline": make_dataframe(rows=profile["xlsx_rows"])}
+
+    builders = {
+        "startup": startup_cases,
+        "ingestion": lambda: ingestion_cases(frames, xlsx_frames),
+        "analysis": lambda: analysis_cases(frames),
+        "workflow": lambda: workflow_cases(frames),
+        "transforms": lambda: transform_cases(frames),
+        "endpoints": lambda: endpoint_cases(frames),
+    }
+    cases = [case for group in groups for case in builders[group]()]
+    if args.filter:
+        cases = [case for case in cases if args.filter in case.name]
+
+    results = {}
+    try:
+        for case in cases:
+            results[case.name] = measure(case, repeats)
+            r = results[case.name]
+            print(f"{case.name:<70} {r['median_s'] * 1000:>10.1f} ms {r['peak_mb']:>9.1f} MB")
+    finally:
+        shutil.rmtree(cache_root, ignore_errors=True)
+
+    import numpy
+    import pandas
+    report = {
+        "meta": {
+            "profile": args.profile,
+            "repeats": repeats,
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pandas": pandas.__version__,
+            "numpy": numpy.__version__,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, default=str)
+    print(f"\nWrote {len(results)} results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("profile") != args.profile:
+            print(f"Warning: baseline was recorded with profile '{baseline.get('meta', {}).get('profile')}'")
+        regressions = compare(results, baseline.get("results", {}), args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for name, before, after, ratio in regressions:
+                print(f"  {name}: {before * 1000:.1f} ms -> {after * 1000:.1f} ms ({ratio:.2f}x)")
+            return 1
+        print(f"No regressions over {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,7 @@
+import os
+import sys
+import tempfile
+
+# Run from backend/ or the repo root alike, and keep test datasets out of the real store
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("DATASET_STORE_DIR", tempfile.mkdtemp(prefix="dap_test_store_"))
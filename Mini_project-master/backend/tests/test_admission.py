@@ -0,0 +1,155 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.admission import AdmissionController, AdmissionRejected
+from app.jobs import CANCELLED, FAILED, RUNNING, SUCCEEDED, JobManager
+
+MB = 1024 * 1024
+
+
+def _controller(memory_mb=100, cpu_slots=2, queue_timeout=1.0, max_waiting=4):
+    return AdmissionController(memory_budget_bytes=memory_mb * MB, cpu_slots=cpu_slots,
+                               queue_timeout=queue_timeout, max_waiting=max_waiting, retry_after=7)
+
+
+def test_admits_and_releases():
+    async def scenario():
+        controller = _controller()
+        with await controller.admit("test", 40 * MB) as ticket:
+            assert controller.stats()["busySlots"] == 1
+            assert controller.reserved_bytes == 40 * MB
+        ticket.release()  # idempotent
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["busySlots"] == 0 and stats["reservedMb"] == 0
+
+
+def test_request_above_the_budget_is_rejected_with_413():
+    async def scenario():
+        await _controller().admit("test", 101 * MB)
+
+    with pytest.raises(AdmissionRejected) as excinfo:
+        asyncio.run(scenario())
+    assert excinfo.value.status_code == 413 and excinfo.value.retry_after is None
+
+
+def test_waiting_requests_are_admitted_in_arrival_order():
+    async def scenario():
+        controller = _controller(cpu_slots=1)
+        admitted = []
+
+        async def request(name, nbytes):
+            ticket = await controller.admit("test", nbytes)
+            admitted.append(name)
+            await asyncio.sleep(0.01)
+            ticket.release()
+
+        first = await controller.admit("test", 10 * MB)
+        waiting = [asyncio.create_task(request(name, nbytes))
+                   for name, nbytes in (("big", 90 * MB), ("small", 1 * MB), ("medium", 20 * MB))]
+        await asyncio.sleep(0.01)
+        assert controller.stats()["waiting"] == 3
+        first.release()
+        await asyncio.gather(*waiting)
+        return admitted, controller.stats()
+
+    admitted, stats = asyncio.run(scenario())
+    assert admitted == ["big", "small", "medium"]
+    assert stats == {"memoryBudgetMb": 100, "reservedMb": 0, "cpuSlots": 1, "busySlots": 0, "waiting": 0}
+
+
+def test_full_queue_and_timeout_are_rejected_with_429():
+    async def scenario():
+        controller = _controller(cpu_slots=1, queue_timeout=0.05, max_waiting=1)
+        held = await controller.admit("test", 10 * MB)
+        waiter = asyncio.create_task(controller.admit("test", 10 * MB))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected) as queue_full:
+            await controller.admit("test", 10 * MB)
+        with pytest.raises(AdmissionRejected) as timed_out:
+            await waiter
+        held.release()
+        return queue_full.value, timed_out.value, controller.stats()
+
+    queue_full, timed_out, stats = asyncio.run(scenario())
+    assert queue_full.status_code == 429 and queue_full.retry_after == 7
+    assert timed_out.status_code == 429
+    assert stats["waiting"] == 0 and stats["busySlots"] == 0
+
+
+def test_cancelled_waiter_lets_the_next_one_in():
+    async def scenario():
+        controller = _controller(cpu_slots=1)
+        held = await controller.admit("test", 10 * MB)
+        cancelled = asyncio.create_task(controller.admit("test", 10 * MB))
+        queued = asyncio.create_task(controller.admit("test", 10 * MB))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        held.release()
+        ticket = await asyncio.wait_for(queued, 0.5)
+        ticket.release()
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["waiting"] == 0 and stats["busySlots"] == 0
+
+
+@pytest.fixture
+def loop():
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    yield loop
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+    loop.close()
+
+
+def _wait_for(predicate, timeout=5):
+    deadline = time.time() + timeout
+    while not predicate() and time.time() < deadline:
+        time.sleep(0.01)
+    assert predicate()
+
+
+def _submit(manager, controller, loop, nbytes):
+    def admit(report):
+        return controller.admit_from_thread(loop, "job", nbytes, on_wait=lambda: report("admission", 0, None))
+    return manager.submit("analyze", lambda report: "done", admit=admit)
+
+
+def test_job_past_the_budget_waits_for_memory(loop):
+    controller = _controller(cpu_slots=0, queue_timeout=0.1)
+    controller.retry_after = 0
+    held = asyncio.run_coroutine_threadsafe(controller.admit("test", 90 * MB), loop).result()
+
+    job = _submit(JobManager(workers=1), controller, loop, 20 * MB)
+    time.sleep(0.5)
+    assert job.status == RUNNING and job.stage == "admission"
+
+    loop.call_soon_threadsafe(held.release)
+    _wait_for(lambda: job.status == SUCCEEDED)
+    _wait_for(lambda: controller.reserved_bytes == 0)
+
+
+def test_job_above_the_whole_budget_fails(loop):
+    job = _submit(JobManager(workers=1), _controller(), loop, 200 * MB)
+    _wait_for(lambda: job.status == FAILED)
+    assert "more than the 100 MB" in job.error
+
+
+def test_job_cancelled_while_waiting_for_admission_reserves_nothing(loop):
+    controller = _controller(cpu_slots=1, queue_timeout=10)
+    held = asyncio.run_coroutine_threadsafe(controller.admit("test", 10 * MB), loop).result()
+    manager = JobManager(workers=1)
+    job = _submit(manager, controller, loop, 10 * MB)
+    _wait_for(lambda: job.stage == "admission")
+
+    manager.cancel(job.id)
+    _wait_for(lambda: job.status == CANCELLED)
+    loop.call_soon_threadsafe(held.release)
+    _wait_for(lambda: controller.reserved_bytes == 0 and controller.busy_slots == 0)
@@ -0,0 +1,42 @@
+import os
+import time
+
+from app import batch
+from app.jobs import JobManager
+
+
+def _make_batch(root, name, age):
+    results = os.path.join(root, name, "results")
+    os.makedirs(results)
+    manifest = os.path.join(results, batch.MANIFEST_FILE)
+    open(manifest, "w").close()
+    stamp = time.time() - age
+    for path in (manifest, results, os.path.join(root, name)):
+        os.utime(path, (stamp, stamp))
+
+
+def test_stale_batch_outputs_are_removed(tmp_path):
+    _make_batch(str(tmp_path), "old", age=7200)
+    _make_batch(str(tmp_path), "recent", age=60)
+    # Queued for longer than the TTL: no results yet, and its inputs are still there
+    pending = tmp_path / "pending"
+    (pending / "inputs").mkdir(parents=True)
+    stamp = time.time() - 7200
+    os.utime(pending, (stamp, stamp))
+    assert batch.remove_stale_outputs(3600, root=str(tmp_path)) == 1
+    assert sorted(os.listdir(tmp_path)) == ["pending", "recent"]
+    assert batch.remove_stale_outputs(3600, root=str(tmp_path / "missing")) == 0
+
+
+def test_expired_job_runs_its_cleanup_hook(tmp_path):
+    manager = JobManager(workers=1, result_ttl=0)
+    expired = []
+    job = manager.submit("batch", lambda report: "done", on_expire=lambda: expired.append(True))
+    deadline = time.time() + 5
+    while job.finished_at is None and time.time() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.01)
+    manager._purge_expired()
+    assert expired == [True]
+    manager._purge_expired()
+    assert expired == [True]
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.compare import compare_frames, detect_key
+
+
+def test_keyed_diff_reports_added_removed_and_changed_rows():
+    base = pd.DataFrame({"id": [1, 2, 3, 4], "price": [10.0, 20.0, 30.0, 40.0], "city": ["a", "b", "c", "d"]})
+    new = pd.DataFrame({"id": [2, 3, 4, 5], "price": [20.0, 35.0, 40.0, 50.0], "city": ["b", "c", "x", "e"]})
+
+    result = compare_frames(base, new)
+    rows = result["rows"]
+    assert rows["key"] == ["id"] and rows["keyDetected"]
+    assert (rows["added"], rows["removed"], rows["changed"], rows["unchanged"]) == (1, 1, 2, 1)
+    assert rows["changedColumns"] == {"price": 1, "city": 1}
+    assert [e["id"] for e in result["examples"]["added"]] == [5]
+    assert [e["id"] for e in result["examples"]["removed"]] == [1]
+    assert result["examples"]["changed"] == [
+        {"key": {"id": 3}, "changes": {"price": {"from": 30.0, "to": 35.0}}},
+        {"key": {"id": 4}, "changes": {"city": {"from": "d", "to": "x"}}},
+    ]
+
+
+def test_key_with_different_types_matches_on_its_text_form():
+    base = pd.DataFrame({"id": [1, 2, 3, 4], "value": ["a", "b", "c", "d"]})
+    new = pd.DataFrame({"id": ["1", "2", "3", "4"], "value": ["a", "b", "c", "z"]})
+
+    result = compare_frames(base, new)
+    rows = result["rows"]
+    assert rows["key"] == ["id"]
+    assert (rows["added"], rows["removed"], rows["changed"]) == (0, 0, 1)
+    assert rows["changedColumns"] == {"value": 1}
+    [change] = result["schema"]["typeChanged"]
+    assert change["column"] == "id" and change["key"] is True
+
+
+def test_numeric_key_types_still_match():
+    base = pd.DataFrame({"id": [1, 2], "v": ["a", "b"]})
+    new = pd.DataFrame({"id": [1.0, 2.0], "v": ["a", "b"]})
+    rows = compare_frames(base, new, key=["id"])["rows"]
+    assert (rows["added"], rows["removed"], rows["changed"]) == (0, 0, 0)
+
+
+def test_unkeyed_duplicates_are_counted_per_occurrence():
+    base = pd.DataFrame({"x": [1.5, 1.5, 2.5]})
+    new = pd.DataFrame({"x": [1.5, 2.5, 2.5]})
+
+    result = compare_frames(base, new)
+    rows = result["rows"]
+    assert rows["key"] is None and rows["changed"] is None
+    assert (rows["added"], rows["removed"], rows["unchanged"]) == (1, 1, 2)
+    assert result["examples"]["added"] == [{"x": 2.5}]
+    assert result["examples"]["removed"] == [{"x": 1.5}]
+
+
+def test_given_key_must_exist_and_be_unique():
+    base = pd.DataFrame({"k": [1, 1], "v": [1, 2]})
+    with pytest.raises(ValueError):
+        compare_frames(base, base, key=["missing"])
+    with pytest.raises(ValueError):
+        compare_frames(base, base, key=["k"])
+
+
+def test_detect_key_prefers_id_columns_and_skips_non_unique_ones():
+    base = pd.DataFrame({"code": ["a", "b", "c"], "order_id": [1, 1, 2], "n": [1, 2, 3]})
+    assert detect_key(base, base, list(base.columns)) == ["code"]
+    base["order_id"] = [1, 2, 3]
+    assert detect_key(base, base, list(base.columns)) == ["order_id"]
+    assert detect_key(base[["n"]].astype(float), base[["n"]].astype(float), ["n"]) is None
+
+
+def test_distribution_shift_is_flagged():
+    rng = np.random.default_rng(0)
+    base = pd.DataFrame({"v": rng.normal(0, 1, 2000)})
+    new = pd.DataFrame({"v": rng.normal(3, 1, 2000)})
+    result = compare_frames(base, new)
+    assert result["shiftedColumns"] == ["v"]
@@ -0,0 +1,92 @@
+import os
+import shutil
+import time
+
+import pandas as pd
+import pytest
+
+from app import dataset_store
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_store, "DATASET_STORE_DIR", str(tmp_path))
+    dataset_store._attached.clear()
+    dataset_store._frames.clear()
+    dataset_store._accessed.clear()
+    yield
+    dataset_store._attached.clear()
+    dataset_store._frames.clear()
+
+
+def _put(name, rows=3):
+    return dataset_store.put_dataframe(pd.DataFrame({"a": range(rows), "b": ["x"] * rows}), name, f"{name}.csv")
+
+
+def test_attached_tables_are_bounded(monkeypatch):
+    monkeypatch.setattr(dataset_store, "DATASET_ATTACH_MAX", 2)
+    for name in ("d1", "d2", "d3"):
+        dataset_store.get_table(_put(name))
+    assert list(dataset_store._attached) == ["d2", "d3"]
+
+
+def test_dataset_deleted_by_another_worker_is_unmapped():
+    dataset_store.get_table(_put("gone"))
+    dataset_store.get_table(_put("kept"))
+    # Another worker removes the files; this process only sees meta.json disappear
+    shutil.rmtree(os.path.join(dataset_store.DATASET_STORE_DIR, "gone"))
+    with pytest.raises(KeyError):
+        dataset_store.get_table("gone")
+    assert "gone" not in dataset_store._attached
+
+    shutil.rmtree(os.path.join(dataset_store.DATASET_STORE_DIR, "kept"))
+    dataset_store.get_table(_put("other"))
+    assert list(dataset_store._attached) == ["other"]
+
+
+def test_append_invalidates_attached_table():
+    dataset_id = dataset_store.fork_dataset(_put("base"))
+    assert dataset_store.get_table(dataset_id).num_rows == 3
+    with dataset_store.dataset_lock(dataset_id):
+        dataset_store.append_dataframe(dataset_id, pd.DataFrame({"a": [9], "b": ["y"]}))
+    assert dataset_store.get_table(dataset_id).num_rows == 4
+
+
+def test_converted_frame_is_cached_and_protected_from_callers():
+    dataset_id = _put("frame")
+    first = dataset_store.get_dataframe(dataset_id)
+    first["b"] = "changed"
+    first.loc[0, "a"] = 100
+    second = dataset_store.get_dataframe(dataset_id)
+    assert second["b"].tolist() == ["x", "x", "x"]
+    assert second["a"].tolist() == [0, 1, 2]
+    # Both came from the one cached conversion
+    assert dataset_store._frames[dataset_id][1]["a"].tolist() == [0, 1, 2]
+
+
+def test_frame_cache_follows_dataset_version():
+    dataset_id = dataset_store.fork_dataset(_put("versioned"))
+    assert len(dataset_store.get_dataframe(dataset_id)) == 3
+    with dataset_store.dataset_lock(dataset_id):
+        dataset_store.append_dataframe(dataset_id, pd.DataFrame({"a": [9], "b": ["y"]}))
+    assert len(dataset_store.get_dataframe(dataset_id)) == 4
+    dataset_store.delete_dataset(dataset_id)
+    assert dataset_id not in dataset_store._frames
+
+
+def test_eviction_drops_least_recently_used_uploads_but_never_forks(monkeypatch):
+    old, used, forked_from = _put("old"), _put("used"), _put("forked_from")
+    fork = dataset_store.fork_dataset(forked_from)
+    for age, dataset_id in ((400, old), (300, used), (200, forked_from), (500, fork)):
+        stamp = time.time() - age
+        os.utime(os.path.join(dataset_store.DATASET_STORE_DIR, dataset_id), (stamp, stamp))
+    # "old" was uploaded before "used", but "used" was read since
+    dataset_store.get_table(used)
+
+    size = dataset_store.get_metadata(old)["bytes"]
+    monkeypatch.setattr(dataset_store, "DATASET_STORE_MAX_MB", 2.5 * size / (1024 * 1024))
+    _put("new")
+
+    remaining = sorted(name for name in os.listdir(dataset_store.DATASET_STORE_DIR) if not name.startswith("."))
+    assert remaining == sorted(["used", "new", fork])
+    assert dataset_store.get_table(fork).num_rows == 3
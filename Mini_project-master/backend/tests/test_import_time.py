@@ -0,0 +1,12 @@
+import os
+
+from benchmarks.import_time import LAZY_MODULES, measure_import
+
+IMPORT_BUDGET_SECONDS = float(os.environ.get("IMPORT_BUDGET_SECONDS", "1.5"))
+
+
+def test_app_imports_within_budget_without_lazy_subsystems():
+    result = measure_import(repeats=3)
+    assert result["eager"] == [], f"imported at startup, should be lazy: {result['eager']} (of {LAZY_MODULES})"
+    assert result["median_s"] <= IMPORT_BUDGET_SECONDS, (
+        f"import app.main took {result['median_s']:.3f}s, budget {IMPORT_BUDGET_SECONDS:.3f}s")
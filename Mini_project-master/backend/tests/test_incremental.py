@@ -0,0 +1,77 @@
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import dataset_store
+from app import incremental
+from app.analysis_utils import get_data_health
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_store, "DATASET_STORE_DIR", str(tmp_path))
+    dataset_store._attached.clear()
+    dataset_store._frames.clear()
+    yield
+    dataset_store._attached.clear()
+    dataset_store._frames.clear()
+
+
+def _frame(values):
+    return pd.DataFrame({"a": values, "b": [f"v{v % 3}" for v in values]})
+
+
+def _hash_parts(dataset_id):
+    return glob.glob(os.path.join(dataset_store.DATASET_STORE_DIR, dataset_id, f"{incremental.HASHES_SIDECAR}-*.npy"))
+
+
+def test_update_matches_a_full_pass():
+    batches = [_frame([1, 2, 2, 3]), _frame([3, 4, 1]), _frame([5, 5, 6, 2])]
+    aggregates = incremental.DashboardAggregates.from_dataframe(batches[0])
+    for batch in batches[1:]:
+        aggregates.update(batch)
+
+    full = pd.concat(batches, ignore_index=True)
+    expected = np.unique(incremental.hash_rows(full))
+    np.testing.assert_array_equal(np.sort(np.concatenate(aggregates.unsaved_hashes)), expected)
+    assert aggregates.unique_rows == len(expected)
+    assert aggregates.duplicates == int(full.duplicated().sum())
+
+
+def test_appends_write_only_the_new_hashes():
+    dataset_id = dataset_store.put_dataframe(_frame([1, 2, 3]), "base", "base.csv")
+
+    first = incremental.append_rows(dataset_id, _frame([3, 4]))
+    dataset_id = first["datasetId"]
+    assert len(_hash_parts(dataset_id)) == 1
+
+    second = incremental.append_rows(dataset_id, _frame([4, 5, 1]))
+    parts = _hash_parts(dataset_id)
+    assert len(parts) == 2
+    # The seed part holds 4 distinct rows; the second append adds only row 5
+    assert sorted(len(np.load(part)) for part in parts) == [1, 4]
+
+    full = dataset_store.get_dataframe(dataset_id)
+    assert second["totalRows"] == len(full) == 8
+    assert second["dataHealth"] == get_data_health(full)
+
+
+@pytest.mark.parametrize("parts_max", [16, 3])
+def test_hash_parts_stay_bounded_across_many_appends(monkeypatch, parts_max):
+    monkeypatch.setattr(incremental, "INCREMENTAL_HASH_PARTS_MAX", parts_max)
+    dataset_id = incremental.append_rows(dataset_store.put_dataframe(_frame([0]), "many", "many.csv"),
+                                         _frame([1]))["datasetId"]
+    for i in range(2, 130):
+        # Every third append repeats an earlier row
+        result = incremental.append_rows(dataset_id, _frame([i if i % 3 else i // 3]))
+        aggregates = dataset_store.read_sidecar(dataset_id, incremental.AGGREGATES_SIDECAR)
+        assert len(aggregates.hash_parts) <= min(parts_max, 9)
+        assert len(_hash_parts(dataset_id)) == len(aggregates.hash_parts)
+
+    full = dataset_store.get_dataframe(dataset_id)
+    assert result["dataHealth"] == get_data_health(full)
+    stored = np.concatenate([np.load(part) for part in _hash_parts(dataset_id)])
+    np.testing.assert_array_equal(np.sort(stored), np.unique(incremental.hash_rows(full)))
@@ -0,0 +1,34 @@
+import threading
+import time
+
+import pytest
+
+from app.jobs import CANCELLED, RUNNING, SUCCEEDED, JobManager, JobQueueFull
+
+
+def _wait_for(job, status, timeout=5):
+    deadline = time.time() + timeout
+    while job.status != status and time.time() < deadline:
+        time.sleep(0.01)
+    assert job.status == status
+
+
+def test_cancelled_jobs_free_their_queue_slot():
+    manager = JobManager(workers=1, max_queued=2)
+    release = threading.Event()
+    running = manager.submit("block", lambda report: release.wait(5))
+    _wait_for(running, RUNNING)
+
+    first = manager.submit("queued", lambda report: "first")
+    manager.submit("queued", lambda report: "second")
+    with pytest.raises(JobQueueFull):
+        manager.submit("queued", lambda report: "third")
+
+    manager.cancel(first.id)
+    assert first.status == CANCELLED
+    third = manager.submit("queued", lambda report: "third")
+
+    release.set()
+    _wait_for(third, SUCCEEDED)
+    assert third.result == "third"
+    assert manager._pending == 0
@@ -0,0 +1,67 @@
+import io
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app import dataset_store
+from app import progressive
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_store, "DATASET_STORE_DIR", str(tmp_path))
+    dataset_store._attached.clear()
+    dataset_store._frames.clear()
+    yield
+    dataset_store._attached.clear()
+    dataset_store._frames.clear()
+
+
+def _csv(rows):
+    rng = np.random.default_rng(0)
+    frame = pd.DataFrame({"x": rng.normal(size=rows), "city": rng.choice(["a", "b", "c"], rows)})
+    # The file is sorted, so its head alone would only show city "a"
+    return frame.sort_values("city").to_csv(index=False).encode()
+
+
+def test_csv_upload_is_sampled_across_the_file():
+    sample, total = progressive.sample_csv_upload(_csv(5000), sample_rows=500, blocks=10)
+    assert total == 5000
+    assert 400 <= len(sample) <= 500
+    assert list(sample.columns) == ["x", "city"]
+    assert set(sample["city"]) == {"a", "b", "c"}
+    assert progressive.sample_csv_upload(_csv(100), sample_rows=500) is None
+
+
+def test_upload_stream_reports_parsing_before_the_file_is_stored():
+    events = []
+    stored = []
+
+    def store_upload(contents, file_name):
+        stored.append(len(events))
+        return dataset_store.put_dataframe(pd.read_csv(io.BytesIO(contents)), "upload", file_name)
+
+    progressive.stream_progressive_upload(_csv(3000), "big.csv", store_upload, events.append,
+                                          threading.Event(), sample_rows=500)
+
+    types = [event["type"] for event in events]
+    assert types[:2] == ["progress", "approximate"] and types[-1] == "done"
+    assert stored == [2]
+    assert events[1]["sampledFrom"] == "upload" and events[1]["totalRowsEstimated"]
+    assert events[1]["totalRows"] == 3000
+    # Once stored, the stratified estimate and the exact sections follow as for a dataset_id
+    assert types[2] == "approximate" and "sampledFrom" not in events[2]
+    assert "section" in types
+
+
+def test_upload_that_fails_to_parse_ends_the_stream_with_an_error():
+    events = []
+
+    def store_upload(contents, file_name):
+        raise ValueError("Unsupported file type: .txt")
+
+    progressive.stream_progressive_upload(b"a\n1\n", "data.txt", store_upload, events.append, threading.Event())
+    assert [event["type"] for event in events] == ["progress", "error"]
+    assert "Unsupported" in events[-1]["detail"]
@@ -0,0 +1,56 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from app import dataset_store
+from app.sandbox import SandboxPool
+
+
+@pytest.fixture
+def dataset_id(tmp_path, monkeypatch):
+    monkeypatch.setattr(dataset_store, "DATASET_STORE_DIR", str(tmp_path))
+    return dataset_store.put_dataframe(pd.DataFrame({"a": [1, 2, 3]}), "sandbox", "sandbox.csv")
+
+
+@pytest.fixture
+def pool():
+    pool = SandboxPool(max_workers=2, memory_mb=1024)
+    yield pool
+    pool.shutdown()
+
+
+def _run_together(pool, dataset_id, calls):
+    """Runs (code, timeout) calls concurrently and returns their results."""
+    results = [None] * len(calls)
+
+    def call(i, code, timeout):
+        results[i] = pool.run(dataset_id, code, timeout=timeout)
+
+    threads = [threading.Thread(target=call, args=(i, code, timeout)) for i, (code, timeout) in enumerate(calls)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_only_the_overrunning_call_is_stopped(pool, dataset_id):
+    # The stuck call is killed at 1s while the other one is still running
+    stuck, normal = _run_together(pool, dataset_id, [
+        ("import time\ntime.sleep(30)", 1),
+        ("import time\ntime.sleep(2)\nlen(df)", 10),
+    ])
+    assert stuck == "SandboxLimitExceeded: execution took longer than 1s and was stopped."
+    assert normal == "3"
+    # The killed worker is replaced
+    assert _run_together(pool, dataset_id, [("df['a'].sum()", 10)] * 2) == ["6", "6"]
+
+
+def test_time_spent_waiting_for_a_worker_does_not_count(dataset_id):
+    pool = SandboxPool(max_workers=1, memory_mb=1024)
+    try:
+        results = _run_together(pool, dataset_id, [("import time\ntime.sleep(0.7)\nlen(df)", 1)] * 2)
+    finally:
+        pool.shutdown()
+    assert results == ["3", "3"]
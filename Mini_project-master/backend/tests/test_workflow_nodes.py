@@ -0,0 +1,156 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.core.workflow.nodes.filter_node import FilterNode
+from app.core.workflow.nodes.group_by_node import GroupByNode
+from app.core.workflow.nodes.join_node import JoinNode
+from app.core.workflow.nodes.select_columns_node import SelectColumnsNode
+from app.core.workflow.workflow import WorkflowExecutor
+
+
+@pytest.fixture
+def sales():
+    return pd.DataFrame({
+        "region": ["EU", "US", "EU", "APAC", None],
+        "amount": [120.0, 80.0, 300.0, np.nan, 50.0],
+        "unit price": [1.0, 2.0, 6.0, 3.0, 4.0],
+        "product": ["apple", "banana", "apricot", "cherry", "avocado"],
+    })
+
+
+def _filter(expression, df):
+    return FilterNode("f", "filter", {"expression": expression}).execute({"input_1": df})
+
+
+# --- filter ---
+def test_filter_comparisons_and_boolean_logic(sales):
+    assert _filter("amount > 100 and region == 'EU'", sales)["amount"].tolist() == [120.0, 300.0]
+    assert _filter("`unit price` < 2 or region in ['US']", sales)["product"].tolist() == ["apple", "banana"]
+    assert _filter("not (amount * 2 > 200)", sales)["product"].tolist() == ["banana", "cherry", "avocado"]
+
+
+def test_filter_allowed_methods(sales):
+    assert _filter("amount.isna()", sales)["product"].tolist() == ["cherry"]
+    assert _filter("product.str.startswith('ap')", sales)["product"].tolist() == ["apple", "apricot"]
+
+
+@pytest.mark.parametrize("expression", [
+    "amount.__class__.__init__.__globals__['sys'].modules['os'].system('touch /tmp/x') == 0",
+    "amount.__class__ == 1",
+    "__import__('os').system('true') == 0",
+    "amount.apply(print) == 1",
+    "product.str.contains(region)",
+    "amount > @threshold",
+    "[x for x in amount]",
+    "(lambda: 1)() == 1",
+    "amount[0] > 1",
+    "product == 'x' * 500000000",
+    "product == 500000000 * 'x'",
+    "amount in [0] * 500000000",
+    "amount > 2 * 3",
+])
+def test_filter_rejects_anything_but_columns_and_constants(expression):
+    with pytest.raises(ValueError):
+        FilterNode("f", "filter", {"expression": expression})
+
+
+def test_filter_rejects_multiplying_text_columns(sales):
+    assert _filter("amount * 2 > 300", sales)["product"].tolist() == ["apricot"]
+    with pytest.raises(ValueError, match="non-numeric"):
+        _filter("product * 500000000 == 'x'", sales)
+
+
+def test_filter_code_execution_payload_is_never_run(tmp_path):
+    marker = tmp_path / "pwned"
+    expression = (f"amount.__class__.__init__.__globals__['sys'].modules['os']"
+                  f".system('touch {marker}') == 0")
+    pipeline = {
+        "nodes": [
+            {"id": "load", "data": {"node_type": "load_csv"}},
+            {"id": "filter", "data": {"node_type": "filter", "params": {"expression": expression}}},
+        ],
+        "edges": [{"source": "load", "target": "filter"}],
+    }
+    with pytest.raises(ValueError):
+        WorkflowExecutor(pipeline["nodes"], pipeline["edges"], file_contents=b"amount\n1\n", file_name="a.csv").run()
+    assert not marker.exists()
+
+
+def test_filter_unknown_column(sales):
+    with pytest.raises(ValueError, match="unknown columns"):
+        _filter("nope > 1", sales)
+
+
+# --- select / group by ---
+def test_select_columns_orders_and_renames(sales):
+    node = SelectColumnsNode("s", "select_columns", {"columns": ["amount", "region"], "rename": {"amount": "revenue"}})
+    assert list(node.execute({"input_1": sales}).columns) == ["revenue", "region"]
+    with pytest.raises(ValueError):
+        SelectColumnsNode("s", "select_columns", {"columns": ["missing"]}).execute({"input_1": sales})
+
+
+def test_group_by_named_aggregations(sales):
+    node = GroupByNode("g", "group_by", {"by": "region", "aggregations": {"amount": ["sum", "count"]}})
+    result = node.execute({"input_1": sales}).set_index("region")
+    assert result.loc["EU", "amount_sum"] == 420.0
+    assert result.loc["EU", "amount_count"] == 2
+    counts = GroupByNode("g", "group_by", {"by": ["region"]}).execute({"input_1": sales})
+    assert counts["count"].sum() == len(sales)
+    with pytest.raises(ValueError):
+        GroupByNode("g", "group_by", {"by": "region", "aggregations": {"amount": "explode"}})
+
+
+# --- join ---
+@pytest.mark.parametrize("how", ["inner", "left", "right", "outer"])
+def test_sort_merge_join_matches_hash_join(how):
+    rng = np.random.default_rng(0)
+    left = pd.DataFrame({"k": np.sort(rng.integers(0, 50, 400)), "v": rng.random(400)})
+    right = pd.DataFrame({"k": np.sort(rng.integers(25, 75, 300)), "v": rng.random(300), "w": 1})
+
+    def join(strategy):
+        node = JoinNode("j", "join", {"on": "k", "how": how, "strategy": strategy})
+        result = node.execute({"input_1": left, "input_2": right})
+        assert node.used_strategy == strategy
+        return result.sort_values(list(result.columns)).reset_index(drop=True)
+
+    pd.testing.assert_frame_equal(join("sort_merge"), join("hash"), check_dtype=False)
+
+
+def test_join_validates_params():
+    with pytest.raises(ValueError):
+        JoinNode("j", "join", {"how": "inner"})
+    with pytest.raises(ValueError):
+        JoinNode("j", "join", {"on": "k", "how": "sideways"})
+
+
+def test_pipeline_runs_transforms_end_to_end():
+    csv = b"region,amount\nEU,10\nEU,30\nUS,5\n"
+    nodes = [
+        {"id": "load", "data": {"node_type": "load_csv"}},
+        {"id": "filter", "data": {"node_type": "filter", "params": {"expression": "amount > 6"}}},
+        {"id": "group", "data": {"node_type": "group_by",
+                                 "params": {"by": "region", "aggregations": {"amount": "sum"}}}},
+    ]
+    edges = [{"source": "load", "target": "filter"}, {"source": "filter", "target": "group"}]
+    result = json.loads(WorkflowExecutor(nodes, edges, file_contents=csv, file_name="a.csv").run())
+    assert result == [{"region": "EU", "amount_sum": 40}]
+
+
+def test_bound_pipelines_do_not_share_nodes():
+    nodes = [
+        {"id": "load", "data": {"node_type": "load_csv"}},
+        {"id": "filter", "data": {"node_type": "filter", "params": {"expression": "amount > 6"}}},
+    ]
+    template = WorkflowExecutor(nodes, [{"source": "load", "target": "filter"}])
+    first = template.bind(file_contents=b"amount\n10\n20\n", file_name="a.csv")
+    second = template.bind(file_contents=b"amount\n30\n", file_name="b.csv")
+    assert first.execute()["amount"].tolist() == [10, 20]
+    assert second.execute()["amount"].tolist() == [30]
+
+    assert first.node_instances["filter"] is not second.node_instances["filter"]
+    assert first.node_instances["filter"].params is not second.node_instances["filter"].params
+    assert first.node_instances["filter"].data["amount"].tolist() == [10, 20]
+    assert template.node_instances["filter"].data is None